@@ -0,0 +1,237 @@
+"""
+AI 자문 이력 로컬 전문 검색 색인 (SQLite FTS5).
+
+구글 시트 'AI자문이력'이 원본이고, 이 색인은 조회용 사본이다.
+- 한국어 검색: 단어마다 글자 2-gram(바이그램)을 토큰으로 색인하고, 질의 단어는 바이그램 구(phrase)로 바꿔
+  부분 문자열 일치를 색인만으로 찾는다. (예: '강남구' → "강남 남구", 2글자 '학군'도 색인 조회)
+  FTS5 trigram 토크나이저는 3글자 미만 질의를 색인으로 처리하지 못해 2글자 단어가 많은 한국어에는 맞지 않는다.
+- 동기화: 행 내용 해시로 시트 스냅샷과 비교해 새 행만 추가하고, 시트에서 사라진 행만 지운다.
+  저장 시에는 add_advisory()로 바로 반영한다.
+- 조회: 목록은 메타데이터(일시·유형·대상)만 페이지 단위로 읽고, 본문은 load_advisory_body()로 한 건씩 읽는다.
+"""
+import hashlib
+import operator
+import re
+import unicodedata
+
+import pandas as pd
+
+from local_store import connect
+
+# 시트 컬럼 → 색인 컬럼
+ADVISORY_COLUMNS = {
+    "저장일시": "saved_at", "자문유형": "kind", "대상": "target",
+    "사용자조건": "conditions", "AI분석내용": "content", "사용자질문": "question",
+}
+_WORD = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS advisory_log (
+    id INTEGER PRIMARY KEY,
+    row_hash TEXT NOT NULL UNIQUE,
+    saved_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    conditions TEXT NOT NULL,
+    content TEXT NOT NULL,
+    question TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS advisory_log_saved_at ON advisory_log (saved_at DESC, id DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS advisory_fts USING fts5(
+    target, conditions, content, question, content='', tokenize='unicode61'
+);
+"""
+
+
+def _normalize(text):
+    return unicodedata.normalize("NFKC", str(text)).lower()
+
+
+def bigram_text(text):
+    """
+    색인용 토큰 문자열. 단어마다 겹치는 2-gram을 이어 쓰고, 끝 글자를 1-gram으로 덧붙인다.
+    (끝 글자 토큰은 1글자 접두 질의가 단어 끝 글자도 찾도록 하기 위한 것이다.)
+    """
+    converted, tokens = {}, []
+    for word in _WORD.findall(_normalize(text)):
+        # 본문에 반복되는 단어(단지명·지역명)는 한 번만 변환한다.
+        token = converted.get(word)
+        if token is None:
+            token = converted[word] = " ".join([*map(operator.add, word, word[1:]), word[-1]])
+        tokens.append(token)
+    return " ".join(tokens)
+
+
+def build_match_query(query):
+    """
+    검색어 → FTS5 MATCH 식. 공백으로 나뉜 단어는 모두 포함(AND)해야 하고,
+    단어는 연속된 바이그램 구로, 1글자 단어는 접두 질의로 바꾼다. 검색할 단어가 없으면 None.
+    """
+    terms = []
+    for word in _WORD.findall(_normalize(query)):
+        if len(word) == 1:
+            terms.append(f'"{word}"*')
+        else:
+            terms.append('"' + " ".join(word[i:i + 2] for i in range(len(word) - 1)) + '"')
+    return " AND ".join(terms) if terms else None
+
+
+def _records(df_sheet):
+    """시트 프레임 → 정규화된 (row_hash, saved_at, kind, target, conditions, content, question) 목록."""
+    df = pd.DataFrame({dst: (df_sheet[src] if src in df_sheet.columns else "") for src, dst in ADVISORY_COLUMNS.items()})
+    df = df[df["saved_at"].notna() & (df["saved_at"].astype(str).str.strip() != "")]
+    df = df.fillna("").astype(str).apply(lambda col: col.str.strip())
+    records = []
+    for row in df.itertuples(index=False):
+        # 시트 왕복 시 생기는 공백 차이로 같은 자문이 중복 색인되지 않도록 공백을 접어서 해시한다.
+        key = "\x1f".join(" ".join(v.split()) for v in (row.saved_at, row.kind, row.target, row.content))
+        records.append((hashlib.sha1(key.encode("utf-8")).hexdigest(), row.saved_at, row.kind, row.target,
+                        row.conditions, row.content, row.question))
+    return records
+
+
+def _index_rows(con, rows):
+    """advisory_log에 들어간 (id, target, conditions, content, question) 행들을 FTS에 추가한다."""
+    con.executemany(
+        "INSERT INTO advisory_fts (rowid, target, conditions, content, question) VALUES (?, ?, ?, ?, ?)",
+        [(rid, *(bigram_text(v) for v in texts)) for rid, *texts in rows],
+    )
+
+
+def _insert_records(con, records):
+    inserted = []
+    for rec in records:
+        cur = con.execute(
+            "INSERT OR IGNORE INTO advisory_log (row_hash, saved_at, kind, target, conditions, content, question) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rec,
+        )
+        if cur.rowcount == 1:
+            inserted.append((cur.lastrowid, *rec[3:]))
+    _index_rows(con, inserted)
+    return len(inserted)
+
+
+def sync_advisory_rows(db_path, df_sheet):
+    """
+    시트 스냅샷과 색인을 맞춘다. 새 행은 추가하고, 시트에서 사라진 행은 지운다.
+    스냅샷을 읽은 뒤 저장된 자문이 지워지지 않도록, 스냅샷의 마지막 저장일시보다 이전 행만 삭제 대상으로 본다.
+    반환: {"added": int, "removed": int, "total": int}
+    """
+    df_sheet = df_sheet if df_sheet is not None else pd.DataFrame()
+    con = connect(db_path, _SCHEMA)
+    try:
+        with con:
+            # 시트는 보통 뒤에 추가만 되므로, 행 수가 같고 첫·마지막 행이 이미 색인돼 있으면 전체 비교를 건너뛴다.
+            total = con.execute("SELECT COUNT(*) FROM advisory_log").fetchone()[0]
+            edge = _records(df_sheet.iloc[[0, -1]]) if len(df_sheet) else []
+            if total and len(df_sheet) == total and len(edge) == 2 and all(
+                con.execute("SELECT 1 FROM advisory_log WHERE row_hash = ?", (rec[0],)).fetchone() for rec in edge
+            ):
+                return {"added": 0, "removed": 0, "total": total}
+
+            records = _records(df_sheet) if not df_sheet.empty else []
+            existing = dict(con.execute("SELECT row_hash, id FROM advisory_log").fetchall())
+            sheet_hashes = {rec[0] for rec in records}
+            added = _insert_records(con, [rec for rec in records if rec[0] not in existing])
+
+            latest = max((rec[1] for rec in records), default=None)
+            stale = [rid for h, rid in existing.items() if h not in sheet_hashes]
+            removed = 0
+            if stale and latest is not None:
+                marks = ",".join("?" * len(stale))
+                rows = con.execute(
+                    f"SELECT id, target, conditions, content, question FROM advisory_log WHERE id IN ({marks}) AND saved_at < ?",
+                    (*stale, latest),
+                ).fetchall()
+                # contentless FTS는 색인 때와 같은 토큰 값을 넘겨 삭제한다.
+                con.executemany(
+                    "INSERT INTO advisory_fts (advisory_fts, rowid, target, conditions, content, question) "
+                    "VALUES ('delete', ?, ?, ?, ?, ?)",
+                    [(rid, *(bigram_text(v) for v in texts)) for rid, *texts in rows],
+                )
+                con.executemany("DELETE FROM advisory_log WHERE id = ?", [(r[0],) for r in rows])
+                removed = len(rows)
+            total = con.execute("SELECT COUNT(*) FROM advisory_log").fetchone()[0]
+    finally:
+        con.close()
+    return {"added": added, "removed": removed, "total": total}
+
+
+def add_advisory(db_path, record):
+    """저장 직후 한 건을 색인에 추가한다. record는 시트 컬럼명(저장일시, 자문유형, ...) dict. 반환: 추가 건수(0/1)."""
+    con = connect(db_path, _SCHEMA)
+    try:
+        with con:
+            return _insert_records(con, _records(pd.DataFrame([record])))
+    finally:
+        con.close()
+
+
+def advisory_kinds(db_path):
+    """색인된 자문 유형 목록과 전체 건수. 반환: (유형 리스트, 건수)"""
+    con = connect(db_path, _SCHEMA)
+    try:
+        kinds = [r[0] for r in con.execute("SELECT DISTINCT kind FROM advisory_log WHERE kind != '' ORDER BY kind")]
+        total = con.execute("SELECT COUNT(*) FROM advisory_log").fetchone()[0]
+    finally:
+        con.close()
+    return kinds, total
+
+
+def _filter_clause(query, kind):
+    where, params = [], []
+    if kind:
+        where.append("kind = ?")
+        params.append(kind)
+    match = build_match_query(query) if query else None
+    if match:
+        where.append("id IN (SELECT rowid FROM advisory_fts WHERE advisory_fts MATCH ?)")
+        params.append(match)
+    return (f"WHERE {' AND '.join(where)}" if where else ""), params
+
+
+def count_advisories(db_path, query="", kind=None):
+    """검색어·유형 조건에 맞는 자문 건수."""
+    clause, params = _filter_clause(query, kind)
+    con = connect(db_path, _SCHEMA)
+    try:
+        return con.execute(f"SELECT COUNT(*) FROM advisory_log {clause}", params).fetchone()[0]
+    finally:
+        con.close()
+
+
+def search_advisories(db_path, query="", kind=None, page=1, page_size=20):
+    """
+    최신순 자문 목록의 한 페이지(본문 제외). query는 대상·사용자조건·AI분석내용·사용자질문 전체에서 찾는다.
+    반환 컬럼: id, saved_at, kind, target
+    """
+    clause, params = _filter_clause(query, kind)
+    con = connect(db_path, _SCHEMA)
+    try:
+        return pd.read_sql_query(
+            f"SELECT id, saved_at, kind, target FROM advisory_log {clause} ORDER BY saved_at DESC, id DESC LIMIT ? OFFSET ?",
+            con, params=(*params, page_size, (max(int(page), 1) - 1) * page_size),
+        )
+    finally:
+        con.close()
+
+
+def recent_advisory_targets(db_path, since):
+    """since('YYYY-MM-DD HH:MM' 이후) 저장된 자문의 일시·유형·대상. 캐시 예열 대상 선정(prewarm)에 쓴다."""
+    con = connect(db_path, _SCHEMA)
+    try:
+        return pd.read_sql_query("SELECT saved_at, kind, target FROM advisory_log WHERE saved_at >= ?", con, params=(since,))
+    finally:
+        con.close()
+
+
+def load_advisory_body(db_path, advisory_id):
+    """자문 한 건의 본문(conditions, content, question). 없으면 None."""
+    con = connect(db_path, _SCHEMA)
+    try:
+        row = con.execute(
+            "SELECT conditions, content, question FROM advisory_log WHERE id = ?", (int(advisory_id),)
+        ).fetchone()
+    finally:
+        con.close()
+    return dict(zip(("conditions", "content", "question"), row)) if row else None
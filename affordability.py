@@ -0,0 +1,100 @@
+"""
+자금 조달 가능성(LTV·DSR) 판정 엔진.
+
+사용자 자금(현금·연소득·금리)으로 후보 단지 전체의 필요 대출·LTV·DSR·월 상환액을 한 번의 벡터 연산으로 계산한다.
+사용자 값은 단지와 무관하므로 한 번만 계산하고, 단지마다 달라지는 것(추정시세, 규제지역 여부)만 열 단위로 계산한다.
+추천 후보는 이 결과로 먼저 거른 뒤 프롬프트에 넣는다.
+
+은행권 주택담보대출 기준으로 단순화한 규칙이다(2025-10-16 시행 주택시장 안정화 대책 기준).
+- LTV: 규제지역 무주택 40%·생애최초 70%, 그 밖의 지역 70%. 유주택자는 규제지역 신규 주담대 불가(0%)로 본다.
+- 규제지역 주담대 금액 상한: 시가 15억 이하 6억, 25억 이하 4억, 25억 초과 2억.
+- DSR: 40% 이내. 심사 금리는 입력 금리 + 스트레스 금리(규제지역 3.0%p, 그 밖 1.5%p), 30년 원리금균등 상환.
+- 기존 부채·취득세 등 부대비용은 입력이 없어 반영하지 않는다.
+- 규제지역: subscription_rules.REGULATED_DISTRICTS (서울 전역 + 경기 12곳).
+최종 한도는 금융기관 심사로 확인해야 한다.
+"""
+import numpy as np
+import pandas as pd
+
+from subscription_rules import regulated_mask
+
+DSR_LIMIT_PCT = 40.0
+LOAN_TERM_YEARS = 30
+# 스트레스 DSR 가산 금리(%p): 규제지역 / 그 밖의 지역
+STRESS_RATE_ADDON = {True: 3.0, False: 1.5}
+# LTV 상한(%): (규제지역 여부, 생애최초 여부) — 무주택자 기준
+LTV_LIMIT_PCT = {(True, False): 40.0, (True, True): 70.0, (False, False): 70.0, (False, True): 70.0}
+# 규제지역 주담대 금액 상한: (시가 상한(억), 대출 상한(억)). 마지막 구간은 상한 없음.
+REGULATED_LOAN_CAPS = ((15.0, 6.0), (25.0, 4.0), (np.inf, 2.0))
+AFFORDABILITY_COLUMNS = ('필요대출(억)', '대출한도(억)', 'LTV(%)', 'DSR(%)', '월상환액(만원)', '자금판정')
+# 자금판정 라벨. 한도 초과는 가장 먼저 걸리는 제약을 표시한다.
+VERDICT_NO_LOAN = "현금 매수"
+VERDICT_OK = "대출 한도 내"
+VERDICT_OVER = {"LTV": "LTV 초과", "금액상한": "대출 금액상한 초과", "DSR": "DSR 초과"}
+# 억 단위 비교 오차 허용치(만 원 미만)
+_EPS = 1e-4
+
+
+def annuity_factor(annual_rate_pct, years=LOAN_TERM_YEARS):
+    """원리금균등 상환의 월 상환액 / 원금 비율. 금리는 %(스칼라 또는 배열)."""
+    r = np.asarray(annual_rate_pct, dtype=float) / 100 / 12
+    n = years * 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = r / (1 - (1 + r) ** -n)
+    return np.where(r > 0, factor, 1 / n)
+
+
+def assess_affordability(df_candidates, user_cash, user_income, loan_rate_pct,
+                         is_homeless=True, is_first_time=False, region_col='지역'):
+    """
+    후보 단지 전체에 AFFORDABILITY_COLUMNS를 붙여 반환한다. 원본은 변경하지 않는다.
+    user_cash는 억 원, user_income은 연 천만 원, loan_rate_pct는 %(앱 사이드바 입력 단위 그대로).
+    - 필요대출: 추정현재시세 − 현금 (0 미만이면 0)
+    - 대출한도: min(LTV 한도, 규제지역 금액 상한, DSR 40% 한도)
+    - LTV·DSR: 필요대출 기준. DSR은 스트레스 금리로, 월상환액은 입력 금리로 계산한다.
+    규제지역은 region_col로 판정한다. 시군구('경기 안양')로는 동안·만안을 가를 수 없어 기본값은 지역('경기 안양 동안 …')이다.
+    """
+    df = df_candidates.copy()
+    if df.empty:
+        for col in AFFORDABILITY_COLUMNS:
+            df[col] = pd.Series(dtype=object if col == '자금판정' else float)
+        return df
+
+    price = df['추정현재시세(억)'].to_numpy(dtype=float)
+    regulated = regulated_mask(df[region_col])
+    loan_needed = np.clip(price - user_cash, 0, None)
+
+    ltv_pct = np.where(regulated, LTV_LIMIT_PCT[(True, bool(is_first_time))], LTV_LIMIT_PCT[(False, bool(is_first_time))])
+    if not is_homeless:
+        ltv_pct = np.where(regulated, 0.0, ltv_pct)
+    ltv_limit = price * ltv_pct / 100
+
+    bounds, caps = zip(*REGULATED_LOAN_CAPS)
+    amount_cap = np.where(regulated, np.asarray(caps)[np.searchsorted(bounds, price, side='left')], np.inf)
+
+    # DSR 한도: 연 원리금(스트레스 금리) ≤ 연소득 × 40%
+    income_eok = user_income / 10
+    stress_factor = annuity_factor(loan_rate_pct + np.where(regulated, STRESS_RATE_ADDON[True], STRESS_RATE_ADDON[False]))
+    dsr_limit = income_eok * DSR_LIMIT_PCT / 100 / 12 / stress_factor
+    loan_limit = np.minimum(np.minimum(ltv_limit, amount_cap), dsr_limit)
+
+    df['필요대출(억)'] = loan_needed
+    df['대출한도(억)'] = loan_limit
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['LTV(%)'] = np.where(price > 0, loan_needed / price * 100, 0.0)
+        df['DSR(%)'] = np.where(income_eok > 0, loan_needed * stress_factor * 12 / income_eok * 100,
+                                np.where(loan_needed > 0, np.inf, 0.0))
+    df['월상환액(만원)'] = loan_needed * annuity_factor(loan_rate_pct) * 1e4
+
+    over = loan_needed > loan_limit + _EPS
+    df['자금판정'] = np.select(
+        [loan_needed <= 0, ~over, loan_needed > ltv_limit + _EPS, loan_needed > amount_cap + _EPS],
+        [VERDICT_NO_LOAN, VERDICT_OK, VERDICT_OVER["LTV"], VERDICT_OVER["금액상한"]],
+        default=VERDICT_OVER["DSR"],
+    )
+    return df
+
+
+def affordable_mask(df_assessed):
+    """assess_affordability() 결과에서 현금 + 대출 한도로 매수 가능한 행."""
+    return df_assessed['자금판정'].isin((VERDICT_NO_LOAN, VERDICT_OK))
@@ -1,28 +1,102 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import requests
-import xml.etree.ElementTree as ET
-from streamlit_gsheets import GSheetsConnection
-# [CHANGED] 폐기된 google-generativeai → 신형 google-genai SDK로 마이그레이션
-from google import genai
-from google.genai import types
-from google.genai import errors as genai_errors  # [CHANGED] APIError(429/503 포함) 분기 처리용
+# google-genai·streamlit_gsheets SDK는 import 비용이 커서(각각 수백 ms) 처음 쓰는 함수 안에서 불러온다.
+# (get_gemini_client / ask_gemini / get_sheet_connection 참고. 예산 점검: python importtime_report.py)
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime, timedelta
 from urllib.parse import unquote
+import os
+import threading
+import functools
+from collections import OrderedDict, deque
 import time
 import random  # 지수 백오프 지터(jitter)용
 
+from affordability import AFFORDABILITY_COLUMNS, assess_affordability, affordable_mask
+from applyhome_store import APPLYHOME_URL, sync_applyhome, load_applyhome_display
+from collect_pipeline import (parse_trade_xml, parse_rent_xml, parse_reb_rows, clean_trades, merge_rent_averages,
+                              estimate_prices)
+from complex_summary import prepare_trades, trade_fingerprints, build_complex_summary, update_complex_summary
+from scoring import compute_purpose_scores, weighted_top_n
+from subscription_rules import (URBAN_MONTHLY_INCOME, SHORTLIST_SIZE, evaluate_announcements, shortlist_announcements,
+                                describe_applicant)
+from rank_index import ALL_REGIONS, build_rank_index, available_regions, query_rankings
+from rent_store import ingest_rent_month, load_rent_averages, recent_since_ym
+from registry import resolve_complex_ids, resolve_complex_ids_by_region
+from sheet_sync import SHEET_COLUMNS, apply_master_info, upsert_sheet_rows
+from dataset import compact_frame, to_plain_frame, session_memory_bytes, format_bytes
+from search_index import build_search_index, search
+from paging import TABLE_PAGE_SIZE, page_count, page_slice
+from advisory_index import (sync_advisory_rows, add_advisory, advisory_kinds, count_advisories, search_advisories,
+                            load_advisory_body, recent_advisory_targets)
+from tracing import (span, traced, current_span, traced_sleep, incr, observe, span_summary, counter_summary,
+                     recent_spans, metrics_json, metrics_prometheus, write_metrics_file)
+from prewarm import (DEMAND_WINDOW_DAYS, PREWARM_MAX_DISTRICTS, PREWARM_QUOTA_SHARE, record_district_requests,
+                     load_district_requests, match_districts, district_demand, prewarm_budget, plan_prewarm, next_run_at)
+from profiler import PROFILE_MODES, start_profile, stop_profile, take_unfinished_profile
+
 # --------------------------------------------------------------------------
 # [1] 설정 및 초기화
 # --------------------------------------------------------------------------
 st.set_page_config(page_title="AI 부동산 자산 관리", layout="wide")
+_script_started = time.perf_counter()  # 전체 재실행 지연 측정용
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def requested_profile_mode():
+    """
+    이번 실행을 프로파일할 모드('sample'/'cprofile'). 꺼져 있으면 None.
+    - secrets의 PROFILE_MODE: 모든 실행을 프로파일한다(스테이징 등).
+    - URL의 ?profile=sample|cprofile: 이 세션만 프로파일한다. secrets에 PROFILER_TOKEN이 있고 &profile_token=이 일치할 때만
+      받는다(토큰이 없으면 URL 요청은 무시한다).
+    """
+    mode = st.secrets.get("PROFILE_MODE")
+    if mode is None and "profile" in st.query_params:
+        token = st.secrets.get("PROFILER_TOKEN")
+        if token and st.query_params.get("profile_token") == str(token):
+            mode = st.query_params["profile"] or "sample"
+    return mode if mode in PROFILE_MODES else None
+
+# 프로파일은 요청한 경우에만 시작한다. 끄면 이 판정 외에는 아무 코드도 끼어들지 않는다. (결과는 [8] 참고)
+PROFILE_MODE = requested_profile_mode()
+_run_profile = _unfinished_report = None
+if PROFILE_MODE:
+    # 직전 전체 실행이 st.rerun()/st.stop()으로 끝나 [8]까지 오지 못했으면, 그 프로파일을 여기서 닫아 결과로 남긴다.
+    if (_unfinished := take_unfinished_profile()) is not None:
+        _unfinished_report = stop_profile(_unfinished, "전체 실행 (st.rerun 등으로 중단)", APP_DIR)
+    _run_profile = start_profile(PROFILE_MODE)
 
 if "GOOGLE_API_KEY" not in st.secrets or "PUBLIC_DATA_KEY" not in st.secrets:
     st.error("🚨 secrets.toml 오류: 키가 설정되지 않았습니다.")
     st.stop()
 
 # [CHANGED] genai.configure() → 신형 SDK의 Client 인스턴스 생성
-client = genai.Client(api_key=st.secrets["GOOGLE_API_KEY"])
+# 클라이언트와 시트 연결은 rerun·세션마다 새로 만들지 않고 프로세스당 한 번만 만든다.
+@st.cache_resource(show_spinner=False)
+def get_gemini_client(api_key):
+    """프로세스 공유 Gemini 클라이언트. google-genai SDK는 첫 AI 호출 때 로드된다."""
+    from google import genai
+    return genai.Client(api_key=api_key)
+
+@st.cache_resource(show_spinner=False)
+def get_sheet_connection():
+    """프로세스 공유 구글 시트 연결. streamlit_gsheets는 처음 시트에 접근할 때 로드된다."""
+    from streamlit_gsheets import GSheetsConnection
+    return st.connection("gsheets", type=GSheetsConnection)
+
+# 시트 입출력은 모두 아래 두 함수를 거쳐 구간 추적(sheet.read / sheet.write)에 기록된다.
+def read_sheet(worksheet=None):
+    """시트를 캐시 없이 읽는다. worksheet=None이면 기본(첫) 시트."""
+    with span("sheet.read", worksheet=worksheet or "기본") as attrs:
+        df = get_sheet_connection().read(worksheet=worksheet, ttl=0)
+        attrs["rows"] = 0 if df is None else len(df)
+    return df
+
+def write_sheet(data, worksheet=None):
+    """시트 전체를 data로 덮어쓴다. worksheet=None이면 기본(첫) 시트."""
+    with span("sheet.write", worksheet=worksheet or "기본", rows=len(data)):
+        get_sheet_connection().update(worksheet=worksheet, data=data)
 
 # 별칭(gemini-flash-latest)은 구글이 가리키는 실제 모델이 바뀌면 할당량/도구 정책도 흔들린다.
 # 명시적 버전을 고정해 동작과 한도를 예측 가능하게 한다. (필요 시 secrets로 오버라이드)
@@ -47,9 +121,23 @@ GEMINI_MAX_RETRIES = 4
 
 api_key_decoded = unquote(st.secrets["PUBLIC_DATA_KEY"])
 
+# 청약 공고 등 API 결과를 재사용하기 위한 로컬 SQLite 저장소 경로 (secrets로 오버라이드 가능)
+LOCAL_STORE_PATH = st.secrets.get("LOCAL_STORE_PATH", os.path.join(APP_DIR, ".appdata", "local_store.sqlite3"))
+
+# 특별공급 소득 기준(도시근로자 월평균소득 100%, 원). 매년 공고 기준이 바뀌면 secrets로 갱신한다.
+URBAN_MONTHLY_INCOME_WON = st.secrets.get("URBAN_MONTHLY_INCOME", URBAN_MONTHLY_INCOME)
+
+# 설정하면 구간 추적 지표(Prometheus 텍스트)를 이 파일로 주기적으로 내보낸다(node_exporter textfile collector 등).
+METRICS_EXPORT_PATH = st.secrets.get("METRICS_EXPORT_PATH")
+
 # R-ONE(한국부동산원) API 키는 별도 신청이 필요할 수 있음.
 reb_api_key = unquote(st.secrets.get("REB_API_KEY", st.secrets["PUBLIC_DATA_KEY"]))
 
+# 외부 API 주소. 부하 테스트(loadtest/)처럼 로컬 대역 서버로 돌릴 때만 secrets로 바꾼다.
+MOLIT_API_BASE = st.secrets.get("MOLIT_API_BASE", "http://apis.data.go.kr/1613000")
+REB_API_URL = st.secrets.get("REB_API_URL", "https://www.reb.or.kr/r-one/openapi/SttsApiTblData.do")
+APPLYHOME_API_URL = st.secrets.get("APPLYHOME_API_URL", APPLYHOME_URL)
+
 st.title("🏙️ AI 부동산 통합 솔루션 (Ultimate Ver. 2.4)")
 st.caption("실거래가 + R-ONE 지수 시세 + 상승장 보정 + AI 실시간 호가 검증 + 모델 폴백 + 청약 컨설팅")
 st.markdown("---")
@@ -78,6 +166,17 @@ def _build_followup_prompt(context_prompt: str, messages: list, user_question: s
     )
 
 
+def _record_usage(attrs, model_name, response):
+    """응답의 usage_metadata 토큰 수를 호출 구간 속성과 모델별 토큰 카운터에 기록한다."""
+    usage = getattr(response, "usage_metadata", None)
+    for kind in ("prompt", "candidates", "thoughts", "tool_use_prompt", "total"):
+        count = getattr(usage, f"{kind}_token_count", None) if usage is not None else None
+        if count:
+            attrs[f"{kind}_tokens"] = count
+            incr("gemini.tokens", count, model=model_name, kind=kind)
+
+
+@traced("gemini.ask")
 def ask_gemini(prompt: str, force_search: bool = False):
     """
     Gemini 호출의 단일 진입점 (google-genai SDK 기준).
@@ -86,8 +185,16 @@ def ask_gemini(prompt: str, force_search: bool = False):
       GEMINI_FALLBACK_MODELS의 다음 모델로 자동 전환한다.
     - 429(RESOURCE_EXHAUSTED): 개인 할당량 문제이므로 모델을 바꿔도 소용없다. 백오프 후 즉시 안내.
     - 반환: (response_text, error_message). 성공 시 error_message는 None.
+    - 구간 추적: 호출 전체(gemini.ask: 최종 모델·재시도 횟수·백오프 대기 합계)와
+      시도마다(gemini.attempt: 모델·시도 번호·토큰 수), 백오프 대기(gemini.backoff)를 기록한다.
     """
+    # [CHANGED] APIError(429/503 포함) 분기 처리용 errors 모듈. 첫 호출 이후에는 sys.modules에서 바로 가져온다.
+    from google.genai import types
+    from google.genai import errors as genai_errors
+
     use_search = force_search or _should_use_search(prompt)
+    call = current_span()
+    call.update(search=use_search, prompt_chars=len(prompt), retries=0, backoff_s=0.0)
 
     # [CHANGED] 구형 'google_search_retrieval' → 신형 types.Tool(google_search=types.GoogleSearch())
     config = None
@@ -106,14 +213,19 @@ def ask_gemini(prompt: str, force_search: bool = False):
         for attempt in range(GEMINI_MAX_RETRIES):
             try:
                 # [CHANGED] client.models.generate_content() — 폴백 체인의 현재 모델로 호출
-                response = client.models.generate_content(
-                    model=model_name,
-                    contents=prompt,
-                    config=config,
-                )
+                with span("gemini.attempt", model=model_name, attempt=attempt + 1, search=use_search) as attempt_attrs:
+                    response = get_gemini_client(st.secrets["GOOGLE_API_KEY"]).models.generate_content(
+                        model=model_name,
+                        contents=prompt,
+                        config=config,
+                    )
+                    _record_usage(attempt_attrs, model_name, response)
+                call["model"] = model_name
                 return response.text, None
             except genai_errors.APIError as e:  # ServerError(5xx)·ClientError(4xx) 모두 이 타입의 하위
                 code = getattr(e, "code", None)
+                call["model"] = model_name
+                incr("gemini.api_errors", model=model_name, code=code)
 
                 # 429(할당량)은 모델 전환으로 해결 불가 → 백오프만 하고, 마지막엔 즉시 안내 반환.
                 if code == 429:
@@ -124,8 +236,11 @@ def ask_gemini(prompt: str, force_search: bool = False):
                             f"⏳ API 한도 도달(429). {wait:.0f}초 후 재시도합니다... "
                             f"({attempt + 1}/{GEMINI_MAX_RETRIES})"
                         )
-                        time.sleep(wait)
+                        call["retries"] += 1
+                        call["backoff_s"] = round(call["backoff_s"] + wait, 3)
+                        traced_sleep(wait, "gemini.backoff")
                         continue
+                    call["error"] = "429 RESOURCE_EXHAUSTED"
                     return None, (
                         "🚨 Gemini 무료 등급 한도를 초과했습니다.\n\n"
                         "- 분당 한도(RPM)라면 1~2분 후 다시 시도하세요.\n"
@@ -143,7 +258,9 @@ def ask_gemini(prompt: str, force_search: bool = False):
                             f"⏳ `{model_name}` 과부하(503). {wait:.0f}초 후 재시도... "
                             f"({attempt + 1}/{GEMINI_MAX_RETRIES})"
                         )
-                        time.sleep(wait)
+                        call["retries"] += 1
+                        call["backoff_s"] = round(call["backoff_s"] + wait, 3)
+                        traced_sleep(wait, "gemini.backoff")
                         continue
                     last_error = (
                         "🚨 모든 모델이 일시적으로 과부하 상태입니다(503 UNAVAILABLE).\n\n"
@@ -153,101 +270,177 @@ def ask_gemini(prompt: str, force_search: bool = False):
                     break  # 이 모델 단념 → 다음 폴백 모델로
 
                 # 그 외 API 에러(400/404 등)는 재시도·전환 무의미 → 즉시 반환.
+                call["error"] = f"APIError {code}"
                 return None, f"AI 호출 오류: {e}"
             except Exception as e:  # noqa: BLE001 - 그 외 호출 오류는 사용자에게 그대로 전달
+                call["error"] = type(e).__name__
                 return None, f"AI 호출 오류: {e}"
 
+    call["error"] = "503 UNAVAILABLE (모든 모델)"
     return None, last_error
 
 # --------------------------------------------------------------------------
 # [함수 그룹 A] 국토부 실거래가 API
+#   - 호출은 API별 일일 호출 수로 센다. 사용자 수집과 캐시 예열([함수 그룹 I])이 같은 한도를 나눠 쓴다.
+#   - 받은 (구, 월) 응답은 MOLIT_CACHE_TTL 동안 프로세스 공유 캐시에 두고, 같은 (구, 월) 수집은 호출 없이 재사용한다.
 # --------------------------------------------------------------------------
+# 수집 대상 구 → 국토부 법정동 코드(LAWD_CD 5자리)
+DISTRICT_CODES = {
+    "서울 강남구": "11680", "서울 강동구": "11740", "서울 강북구": "11305", "서울 강서구": "11500", "서울 관악구": "11620",
+    "서울 광진구": "11215", "서울 구로구": "11530", "서울 금천구": "11545", "서울 노원구": "11350", "서울 도봉구": "11320",
+    "서울 동대문구": "11230", "서울 동작구": "11590", "서울 마포구": "11440", "서울 서대문구": "11410", "서울 서초구": "11650",
+    "서울 성동구": "11200", "서울 성북구": "11290", "서울 송파구": "11710", "서울 양천구": "11470", "서울 영등포구": "11560",
+    "서울 용산구": "11170", "서울 은평구": "11380", "서울 종로구": "11110", "서울 중구": "11140", "서울 중랑구": "11260",
+    "경기 과천시": "41290", "경기 광명시": "41210", "경기 하남시": "41450",
+    "경기 성남 분당": "41135", "경기 성남 수정": "41131", "경기 성남 중원": "41133",
+    "경기 안양 동안": "41173", "경기 안양 만안": "41171",
+    "경기 수원 영통": "41117", "경기 수원 팔달": "41115",
+    "경기 용인 수지": "41465", "경기 용인 기흥": "41463",
+    "경기 고양 일산동": "41285", "경기 고양 일산서": "41287", "경기 고양 덕양": "41281",
+    "경기 화성시": "41590", "경기 김포시": "41570", "경기 남양주시": "41360",
+    "경기 구리시": "41310", "경기 부천시": "41190", "경기 군포시": "41410", "경기 의왕시": "41430"
+}
+
+# 공공데이터포털·R-ONE 키당 API별 일일 호출 한도(개발계정 기본 10,000회). 운영계정으로 늘렸으면 secrets로 갱신한다.
+API_DAILY_LIMIT = int(st.secrets.get("API_DAILY_LIMIT", 10_000))
+API_DAILY_LIMITS = {api: API_DAILY_LIMIT for api in ("molit.trade", "molit.rent", "rone.weekly_index")}
+# 국토부 (구, 월) 응답 캐시 유지 시간(초)과 최대 보관 개수. 실거래 신고는 하루 단위로 갱신되므로 반나절 재사용한다.
+MOLIT_CACHE_TTL = int(st.secrets.get("MOLIT_CACHE_TTL", 12 * 3600))
+MOLIT_CACHE_LIMIT = 400
+
+@st.cache_resource
+def _api_call_counter():
+    return {"lock": threading.Lock(), "day": None, "counts": {}}
+
+def count_api_call(api):
+    """외부 API 호출 1회를 오늘 호출 수에 더한다(자정에 초기화). 같은 값이 api.calls 카운터에도 쌓인다."""
+    store = _api_call_counter()
+    today = datetime.now().date()
+    with store["lock"]:
+        if store["day"] != today:
+            store["day"], store["counts"] = today, {}
+        store["counts"][api] = store["counts"].get(api, 0) + 1
+    incr("api.calls", api=api)
+
+def api_calls_today():
+    """{API: 오늘 호출 수}"""
+    store = _api_call_counter()
+    with store["lock"]:
+        return dict(store["counts"]) if store["day"] == datetime.now().date() else {}
+
+@st.cache_resource
+def _molit_cache():
+    return {"lock": threading.Lock(), "entries": OrderedDict()}
+
+def molit_cache_get(api, lawd_cd, ym):
+    """캐시된 (구, 월) 응답. 없거나 MOLIT_CACHE_TTL이 지났으면 None."""
+    store = _molit_cache()
+    with store["lock"]:
+        entry = store["entries"].get((api, lawd_cd, ym))
+        if entry is None or time.time() - entry[0] > MOLIT_CACHE_TTL:
+            return None
+        store["entries"].move_to_end((api, lawd_cd, ym))
+    incr("molit.cache_hits", api=api)
+    return entry[1]
+
+def molit_cache_put(api, lawd_cd, ym, value):
+    store = _molit_cache()
+    with store["lock"]:
+        store["entries"][(api, lawd_cd, ym)] = (time.time(), value)
+        store["entries"].move_to_end((api, lawd_cd, ym))
+        while len(store["entries"]) > MOLIT_CACHE_LIMIT:
+            store["entries"].popitem(last=False)
+
+def molit_cached_keys():
+    """유효한 캐시 항목의 (API, 법정동 코드, 월) 집합."""
+    store = _molit_cache()
+    now = time.time()
+    with store["lock"]:
+        return {key for key, (saved_at, _) in store["entries"].items() if now - saved_at <= MOLIT_CACHE_TTL}
+
+def collect_months(now, count):
+    """now가 속한 달부터 거꾸로 count개 계약월('YYYYMM')."""
+    months, cursor = [], now
+    for _ in range(count):
+        months.append(cursor.strftime("%Y%m"))
+        cursor = (cursor.replace(day=1) - timedelta(days=1))
+    return months
+
+@traced("molit.trade")
 def fetch_trade_data(lawd_cd, deal_ymd, service_key):
-    url = "http://apis.data.go.kr/1613000/RTMSDataSvcAptTradeDev/getRTMSDataSvcAptTradeDev"
+    url = f"{MOLIT_API_BASE}/RTMSDataSvcAptTradeDev/getRTMSDataSvcAptTradeDev"
     params = {"serviceKey": service_key, "LAWD_CD": lawd_cd, "DEAL_YMD": deal_ymd, "numOfRows": 1000, "pageNo": 1}
+    attrs = current_span()
+    attrs.update(lawd_cd=lawd_cd, ym=deal_ymd)
     try:
-        response = requests.get(url, params=params, timeout=10)
+        count_api_call("molit.trade")
+        with span("molit.trade.http"):
+            response = requests.get(url, params=params, timeout=10)
+        attrs["http_status"] = response.status_code
         if response.status_code == 200:
-            root = ET.fromstring(response.content)
-            if root.findtext(".//resultCode") in ["00", "000"]:
-                items = root.findall(".//item")
-                data_list = []
-                for item in items:
-                    data_list.append({
-                        "아파트": item.findtext("아파트") or item.findtext("aptNm") or "",
-                        "전용면적": item.findtext("전용면적") or item.findtext("excluUseAr") or "0",
-                        "거래금액": item.findtext("거래금액") or item.findtext("dealAmount") or "0",
-                        "층": item.findtext("층") or item.findtext("floor") or "",
-                        "건축년도": item.findtext("건축년도") or item.findtext("buildYear") or "",
-                        "법정동": item.findtext("법정동") or item.findtext("umdNm") or "",
-                        "년": (item.findtext("년") or item.findtext("dealYear") or "").strip(),
-                        "월": (item.findtext("월") or item.findtext("dealMonth") or "").strip(),
-                        "일": (item.findtext("일") or item.findtext("dealDay") or "").strip(),
-                    })
-                return pd.DataFrame(data_list)
-    except Exception:
+            with span("molit.trade.xml_parse", bytes=len(response.content)) as parse_attrs:
+                result_code, df = parse_trade_xml(response.content)
+                if df is None:
+                    attrs["error"] = f"resultCode {result_code}"
+                    return None
+                parse_attrs["rows"] = attrs["rows"] = len(df)
+                return df
+        attrs["error"] = f"HTTP {response.status_code}"
+    except Exception as e:
+        attrs["error"] = type(e).__name__
         return None
     return None
 
+@traced("molit.rent")
 def fetch_rent_data(lawd_cd, deal_ymd, service_key):
-    url = "http://apis.data.go.kr/1613000/RTMSDataSvcAptRent/getRTMSDataSvcAptRent"
+    url = f"{MOLIT_API_BASE}/RTMSDataSvcAptRent/getRTMSDataSvcAptRent"
     params = {"serviceKey": service_key, "LAWD_CD": lawd_cd, "DEAL_YMD": deal_ymd, "numOfRows": 1000, "pageNo": 1}
+    attrs = current_span()
+    attrs.update(lawd_cd=lawd_cd, ym=deal_ymd)
     try:
-        response = requests.get(url, params=params, timeout=10)
+        count_api_call("molit.rent")
+        with span("molit.rent.http"):
+            response = requests.get(url, params=params, timeout=10)
+        attrs["http_status"] = response.status_code
         if response.status_code == 200:
-            root = ET.fromstring(response.content)
-            if root.findtext(".//resultCode") in ["00", "000"]:
-                items = root.findall(".//item")
-                data_list = []
-                for item in items:
-                    data_list.append({
-                        "아파트": item.findtext("아파트") or item.findtext("aptNm") or "",
-                        "전용면적": item.findtext("전용면적") or item.findtext("excluUseAr") or "0",
-                        "보증금액": item.findtext("보증금액") or item.findtext("deposit") or "0",
-                        "월세금액": item.findtext("월세금액") or item.findtext("monthlyRent") or "0",
-                        "년": (item.findtext("년") or item.findtext("dealYear") or "").strip(),
-                        "월": (item.findtext("월") or item.findtext("dealMonth") or "").strip(),
-                        "일": (item.findtext("일") or item.findtext("dealDay") or "").strip(),
-                    })
-                return pd.DataFrame(data_list)
-    except Exception:
+            with span("molit.rent.xml_parse", bytes=len(response.content)) as parse_attrs:
+                result_code, df = parse_rent_xml(response.content)
+                if df is None:
+                    attrs["error"] = f"resultCode {result_code}"
+                    return None
+                parse_attrs["rows"] = attrs["rows"] = len(df)
+                return df
+        attrs["error"] = f"HTTP {response.status_code}"
+    except Exception as e:
+        attrs["error"] = type(e).__name__
         return None
     return None
 
 def fetch_applyhome_data(service_key):
-    url = "https://api.odcloud.kr/api/ApplyhomeInfoDetailSvc/v1/getAPTLttotPblancDetail"
-    params = {"page": 1, "perPage": 100, "serviceKey": service_key}
-    try:
-        # [CHANGED] verify=False 제거 — SSL 검증 비활성화는 MITM 위험. 정상 인증서 검증으로 복원.
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            if "data" in data:
-                df = pd.DataFrame(data["data"])
-                if not df.empty:
-                    df_seoul = df[df['SUBSCRPT_AREA_CODE_NM'].astype(str).str.contains('서울', na=False)]
-                    if df_seoul.empty:
-                        return pd.DataFrame()
-                    res_df = pd.DataFrame()
-                    res_df['아파트명(청약단지)'] = df_seoul['HOUSE_NM']
-                    res_df['지역(공급위치)'] = df_seoul['HSSPLY_ADRES']
-                    res_df['공급규모(세대)'] = df_seoul['TOT_SUPLY_HSHLDCO']
-                    res_df['모집공고일'] = df_seoul['RCRIT_PBLANC_DE']
-                    res_df['청약시작일'] = df_seoul['RCEPT_BGNDE']
-                    res_df['청약종료일'] = df_seoul['RCEPT_ENDDE']
-                    res_df['당첨자발표일'] = df_seoul['PRZWNER_PRESNATN_DE']
-                    res_df = res_df.sort_values('모집공고일', ascending=False)
-                    return res_df
-    except Exception:
-        return None
-    return pd.DataFrame()
+    """
+    청약홈 공고를 로컬 저장소로 증분 동기화한 뒤, 저장소의 최근 1년 공고를 표시용 DataFrame으로 반환한다.
+    - 서울 필터·공고일 필터는 API 쿼리 조건으로 처리하고 전 페이지를 순회한다(applyhome_store 참고).
+    - API 실패 시 None. 화면은 실패를 알리되 저장소에 있던 공고는 계속 보여 준다.
+    """
+    with span("applyhome.sync", area="서울") as attrs:
+        synced = sync_applyhome(LOCAL_STORE_PATH, service_key, area_name="서울", url=APPLYHOME_API_URL)
+        if synced is None:
+            attrs["error"] = "API 실패"
+            return None
+        attrs["upserted"] = synced
+    load_shared_applyhome.clear()
+    return load_shared_applyhome()
 
 # --------------------------------------------------------------------------
 # [함수 그룹 B] 한국부동산원(R-ONE) 주간 지수 기반 추정 시세 산출
 # --------------------------------------------------------------------------
-@st.cache_data(ttl=3600)
+# 주간 지수는 주 1회 공표되므로 반나절 재사용한다. 새벽 예열([함수 그룹 I]) 결과가 낮 시간까지 살아 있어야 한다.
+REB_CACHE_TTL = int(st.secrets.get("REB_CACHE_TTL", 12 * 3600))
+
+@st.cache_data(ttl=REB_CACHE_TTL)
+@traced("rone.weekly_index")  # 캐시 안쪽이므로 실제 API 호출(캐시 미스)만 기록된다.
 def fetch_reb_weekly_index(sigungu_name, weeks_back, service_key):
-    url = "https://www.reb.or.kr/r-one/openapi/SttsApiTblData.do"
+    url = REB_API_URL
     end_date = datetime.now()
     start_date = end_date - timedelta(weeks=weeks_back + 2)
 
@@ -262,62 +455,30 @@ def fetch_reb_weekly_index(sigungu_name, weeks_back, service_key):
         "START_WRTTIME": start_date.strftime("%Y%m%d"),
         "END_WRTTIME": end_date.strftime("%Y%m%d"),
     }
+    attrs = current_span()
+    attrs.update(sigungu=sigungu_name, weeks=weeks_back)
     try:
+        count_api_call("rone.weekly_index")
         r = requests.get(url, params=params, timeout=10)
+        attrs["http_status"] = r.status_code
         if r.status_code == 200:
-            data = r.json()
-            rows = data.get("SttsApiTblData", [{}, {}])
-            if len(rows) > 1 and "row" in rows[1]:
-                return pd.DataFrame(rows[1]["row"])
-    except Exception:
+            df_idx = parse_reb_rows(r.json())
+            attrs["rows"] = len(df_idx)
+            return df_idx
+        else:
+            attrs["error"] = f"HTTP {r.status_code}"
+    except Exception as e:
+        attrs["error"] = type(e).__name__
         return pd.DataFrame()
     return pd.DataFrame()
 
-def estimate_today_price(last_price_eok, last_deal_date_str, sigungu_name, service_key):
-    try:
-        last_deal_date = pd.to_datetime(last_deal_date_str)
-    except Exception:
-        return last_price_eok, 0.0
-
-    days_gap = (datetime.now() - last_deal_date).days
-    if days_gap <= 7:
-        return last_price_eok, 0.0
-
-    weeks_gap = max(1, days_gap // 7)
-    df_idx = fetch_reb_weekly_index(sigungu_name, weeks_gap, service_key)
-    if df_idx.empty or "DTA_VAL" not in df_idx.columns:
-        return last_price_eok, None
-
-    weekly_changes = pd.to_numeric(df_idx["DTA_VAL"], errors="coerce").dropna() / 100
-    if weekly_changes.empty:
-        return last_price_eok, None
-
-    cumulative_factor = (1 + weekly_changes).prod()
-    estimated = round(last_price_eok * cumulative_factor, 2)
-    change_pct = round((cumulative_factor - 1) * 100, 2)
-    return estimated, change_pct
-
-def freshness_label(deal_date_str):
-    try:
-        days = (datetime.now() - pd.to_datetime(deal_date_str)).days
-    except Exception:
-        return "❓ 미확인"
-    if days <= 7:
-        return "🟢 실시간급(1주)"
-    if days <= 30:
-        return "🟡 최신(1개월)"
-    if days <= 90:
-        return "🟠 보통(3개월)"
-    return "🔴 참고용(3개월+)"
-
 # --------------------------------------------------------------------------
 # [함수 그룹 C] AI 자문 이력 저장/조회
 # --------------------------------------------------------------------------
 def save_advisory_log(advisory_type, target, conditions, ai_content, user_question=""):
     try:
-        conn_log = st.connection("gsheets", type=GSheetsConnection)
         try:
-            df_log = conn_log.read(worksheet="AI자문이력", ttl=0)
+            df_log = read_sheet("AI자문이력")
             if df_log is None or df_log.empty:
                 df_log = pd.DataFrame(columns=["저장일시", "자문유형", "대상", "사용자조건", "AI분석내용", "사용자질문"])
         except Exception:
@@ -333,11 +494,26 @@ def save_advisory_log(advisory_type, target, conditions, ai_content, user_questi
         }])
 
         df_updated = pd.concat([df_log, new_row], ignore_index=True)
-        conn_log.update(worksheet="AI자문이력", data=df_updated)
+        write_sheet(df_updated, "AI자문이력")
+        load_shared_sheet.clear()
+        # 시트 저장이 끝난 자문은 로컬 검색 색인에도 바로 반영한다. 색인 실패는 저장 결과에 영향을 주지 않는다.
+        try: add_advisory(LOCAL_STORE_PATH, new_row.iloc[0].to_dict())
+        except Exception: pass
         return True, len(df_updated)
     except Exception as e:
         return False, str(e)
 
+ADVISORY_SYNC_TTL = 600  # 시트 → 로컬 색인 동기화 주기(초). 이 앱에서 저장한 자문은 즉시 반영된다.
+
+@st.cache_resource(ttl=ADVISORY_SYNC_TTL, show_spinner=False)
+def sync_advisory_index():
+    """AI자문이력 시트를 로컬 전문 검색 색인과 맞춘다(변경분만). 다른 기기에서 저장한 자문은 주기마다 반영된다."""
+    df_log = read_sheet("AI자문이력")
+    with span("advisory.sync") as attrs:
+        result = sync_advisory_rows(LOCAL_STORE_PATH, df_log)
+        attrs.update(result)
+    return result
+
 def export_chat_to_markdown(messages, title="AI 자문 기록"):
     md = f"# {title}\n\n"
     md += f"**저장일시**: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n---\n\n"
@@ -346,6 +522,389 @@ def export_chat_to_markdown(messages, title="AI 자문 기록"):
         md += f"## {role}\n\n{m['content']}\n\n---\n\n"
     return md
 
+# --------------------------------------------------------------------------
+# [함수 그룹 D] 단지×평형 요약 테이블 (랭킹·매물 선택·추천 점수 공용)
+# --------------------------------------------------------------------------
+@st.cache_resource
+def _complex_summary_state():
+    """프로세스 전체가 공유하는 요약 테이블과, 집계에 반영된 거래 지문(fingerprint) 목록."""
+    return {"lock": threading.Lock(), "summary": None, "fingerprints": None, "version": 0, "source": None}
+
+def get_complex_summary(df_sheet):
+    """
+    시트의 거래 행을 단지×평형 요약으로 변환한다.
+    - 이전 집계 이후 새로 추가된 거래가 속한 그룹만 다시 집계한다(증분 갱신).
+    - 기존 거래가 삭제/수정된 경우에만 전체를 다시 만든다.
+    """
+    state = _complex_summary_state()
+    # 공유 시트 데이터셋이 그대로면(같은 객체) 지문 계산 없이 바로 반환한다.
+    if state["source"] is df_sheet and state["summary"] is not None:
+        return state["summary"], state["version"]
+    source = df_sheet
+    with span("summary.prepare", rows=len(df_sheet)):
+        df_sheet = df_sheet.assign(단지ID=resolve_complex_ids_by_region(LOCAL_STORE_PATH, df_sheet['아파트명'], df_sheet['지역']))
+        df_trades = prepare_trades(df_sheet)
+        fps = pd.Index(trade_fingerprints(df_trades))
+    with state["lock"]:
+        prev = state["fingerprints"]
+        if prev is None or state["summary"] is None or not prev.isin(fps).all():
+            with span("summary.build", rows=len(df_trades)):
+                summary = build_complex_summary(df_trades)
+        else:
+            with span("summary.update", rows=len(df_trades)):
+                summary = update_complex_summary(state["summary"], df_trades, ~fps.isin(prev))
+        if summary is not state["summary"]:
+            state["version"] += 1
+        state["summary"], state["fingerprints"], state["source"] = summary, fps, source
+        return summary, state["version"]
+
+@st.cache_resource(max_entries=4)
+def get_rank_index(summary_version, _df_summary):
+    """데이터 버전별 Tab 2 랭킹 필터 인덱스. 슬라이더 조작은 이 인덱스의 이진 탐색 슬라이스로 처리된다."""
+    with span("rank.build_index", rows=len(_df_summary)):
+        return build_rank_index(_df_summary)
+
+@st.cache_resource(max_entries=4)
+def get_summary_search_index(summary_version, _df_summary):
+    """데이터 버전별 매물 검색 인덱스(단지명·지역, 초성 포함). 문서 번호 = 요약 테이블 행 위치."""
+    return build_search_index(_df_summary['아파트명'].tolist(), _df_summary['지역'].tolist())
+
+# 지역 추천 조건 기본값. 캐시 예열은 이 조건의 점수를 미리 계산해 둔다.
+REC_DEFAULT_PYUNG_RANGE = (20, 30)
+REC_DEFAULT_BUDGET = 9.0
+
+@st.cache_resource(max_entries=16)
+def get_scored_candidates(summary_version, pyung_range, budget_max, _df_summary):
+    """
+    요약 버전·평형·예산 조건별로 모든 지역의 목적 점수를 한 번에 계산해 프로세스 전체가 공유한다.
+    지역 전환·가중치·추천 수 변경은 이 결과를 재사용하고 weighted_top_n()만 다시 수행한다.
+    """
+    mask = ((_df_summary['평형'] >= pyung_range[0]) & (_df_summary['평형'] <= pyung_range[1])
+            & (_df_summary['추정현재시세(억)'] <= budget_max) & (_df_summary['추정현재시세(억)'] > 0))
+    with span("recommend.score", rows=int(mask.sum())):
+        return compute_purpose_scores(_df_summary[mask])
+
+# --------------------------------------------------------------------------
+# [함수 그룹 E] 프로세스 공유 데이터셋
+#   - 시트·청약 공고·수집 결과를 세션마다 복사해 들고 있지 않고, 압축 dtype의 읽기 전용 공유본 하나만 둔다.
+#   - 세션에는 공유본을 가리키는 키와 필터 상태만 남는다.
+# --------------------------------------------------------------------------
+SHARED_COLLECTION_LIMIT = 8  # 프로세스에 보관할 수집 결과 개수 (가장 오래 안 쓴 것부터 제거)
+
+@st.cache_resource(ttl=60, show_spinner=False)
+def load_shared_sheet(worksheet=None):
+    """모든 세션이 공유하는 시트 데이터(압축 dtype). 반환: (df, 크기 정보). 시트에 쓰면 clear()로 무효화한다."""
+    return compact_frame(read_sheet(worksheet))
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def load_shared_applyhome():
+    """로컬 저장소의 서울 청약 공고 표시용 프레임. 동기화 후 clear()로 무효화한다."""
+    return load_applyhome_display(LOCAL_STORE_PATH, area_name="서울")
+
+@st.cache_resource
+def _shared_collections():
+    return {"lock": threading.Lock(), "frames": OrderedDict()}
+
+def _build_collection_search(df):
+    """수집 결과의 (단지명, 지역) 조합별 검색 인덱스와 조합별 행 위치."""
+    groups = df.groupby(['아파트명', '지역'], observed=True, sort=False).indices
+    keys = list(groups)
+    return {
+        "index": build_search_index([k[0] for k in keys], [k[1] for k in keys]),
+        "rows": [groups[k] for k in keys],
+    }
+
+def put_shared_collection(key, df):
+    """수집 결과를 압축해 검색 인덱스와 함께 공유 보관하고 키를 반환한다. 같은 조건의 수집은 최신 결과로 교체된다."""
+    store = _shared_collections()
+    df_compact, meta = compact_frame(df)
+    entry = (df_compact, meta, _build_collection_search(df_compact))
+    with store["lock"]:
+        store["frames"][key] = entry
+        store["frames"].move_to_end(key)
+        while len(store["frames"]) > SHARED_COLLECTION_LIMIT:
+            store["frames"].popitem(last=False)
+    return key
+
+def get_shared_collection(key):
+    """키에 해당하는 (df, 크기 정보, 검색 인덱스). 보관 한도 초과로 밀려났으면 None."""
+    store = _shared_collections()
+    with store["lock"]:
+        entry = store["frames"].get(key)
+        if entry is not None:
+            store["frames"].move_to_end(key)
+    return entry
+
+# --------------------------------------------------------------------------
+# [함수 그룹 F] 결과 테이블 렌더링
+#   - 셀마다 Python에서 문자열을 만드는 Styler 대신 column_config(브라우저 측 서식)를 쓴다.
+#   - 정렬·페이지 나누기는 서버에서 하고, 현재 페이지 행만 브라우저로 보낸다.
+# --------------------------------------------------------------------------
+def number_columns(formats):
+    """{컬럼: printf 서식} → st.column_config 숫자 컬럼 설정."""
+    return {c: st.column_config.NumberColumn(c, format=fmt) for c, fmt in formats.items()}
+
+def render_paged_table(df, key, columns, column_config=None, sortable=None, page_size=TABLE_PAGE_SIZE, height=None):
+    """
+    df[columns]를 한 페이지씩 렌더링한다. sortable에 있는 컬럼은 서버 측 정렬 대상이 된다.
+    정렬을 고르지 않으면 df의 현재 순서(랭킹 순서 등)를 그대로 쓴다.
+    """
+    total_pages = page_count(len(df), page_size)
+    sort_by, ascending, page = None, True, 1
+    ctrl1, ctrl2, ctrl3 = st.columns([2, 1, 1])
+    if sortable:
+        with ctrl1: sort_by = st.selectbox("정렬 기준", sortable, index=None, placeholder="기본 순서", key=f"{key}_sort")
+        with ctrl2: ascending = st.radio("정렬 방향", ["오름차순", "내림차순"], horizontal=True, key=f"{key}_dir") == "오름차순"
+    with ctrl3:
+        if total_pages > 1:
+            page = st.number_input(f"페이지 (총 {total_pages})", min_value=1, max_value=total_pages, value=1, step=1, key=f"{key}_page")
+
+    df_page, page, total_pages = page_slice(df, page, sort_by=sort_by, ascending=ascending, page_size=page_size)
+    st.dataframe(df_page[columns], column_config=column_config, use_container_width=True, hide_index=True, height=height)
+    if len(df):
+        start = (page - 1) * page_size
+        st.caption(f"총 {len(df):,}건 중 {start + 1:,}–{start + len(df_page):,}번째")
+
+# --------------------------------------------------------------------------
+# [함수 그룹 G] 부분 재실행 패널 (st.fragment) + 재실행 지연 측정
+#   - 랭킹·채팅·추천·이력·구 선택은 각각 fragment로, 패널 안의 조작은 그 패널만 다시 실행한다.
+#   - 사이드바 재정 조건처럼 여러 패널이 쓰는 입력이 바뀌면 전체가 다시 실행된다.
+#   - 실행 유형별(전체 / 패널별 부분 재실행) 소요 시간을 프로세스 단위로 모아 사이드바에 보여준다.
+# --------------------------------------------------------------------------
+RERUN_SAMPLE_LIMIT = 200  # 유형별로 보관할 최근 측정 개수
+FULL_RUN_LABEL = "전체 실행"
+
+@st.cache_resource
+def _rerun_latency_store():
+    return {"lock": threading.Lock(), "samples": {}}
+
+def record_rerun_latency(label, seconds):
+    """실행 유형별 소요 시간(초)을 기록한다. 같은 값이 구간 히스토그램(rerun.<유형>)에도 들어가 내보내기에 포함된다."""
+    store = _rerun_latency_store()
+    with store["lock"]:
+        store["samples"].setdefault(label, deque(maxlen=RERUN_SAMPLE_LIMIT)).append(seconds)
+    observe(f"rerun.{label}", seconds)
+
+def rerun_latency_summary():
+    """실행 유형별 횟수·중앙값·p95(ms) 표."""
+    store = _rerun_latency_store()
+    with store["lock"]:
+        samples = {label: list(values) for label, values in store["samples"].items()}
+    rows = [
+        {"실행 유형": label, "횟수": len(values),
+         "중앙값(ms)": float(np.median(values)) * 1000, "p95(ms)": float(np.percentile(values, 95)) * 1000}
+        for label, values in samples.items() if values
+    ]
+    return pd.DataFrame(rows, columns=["실행 유형", "횟수", "중앙값(ms)", "p95(ms)"])
+
+def is_fragment_rerun():
+    """현재 실행이 fragment만 다시 실행하는 부분 재실행인지 여부."""
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+def rerun_panel():
+    """부분 재실행 중이면 현재 패널만, 전체 실행 중이면 앱 전체를 다시 실행한다."""
+    st.rerun(scope="fragment" if is_fragment_rerun() else "app")
+
+def panel(label):
+    """
+    함수를 st.fragment로 만들고, 부분 재실행될 때의 소요 시간을 label로 기록한다.
+    프로파일 모드에서는 부분 재실행도 따로 프로파일하고 결과를 패널 아래에 보여 준다.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            fragment_rerun = is_fragment_rerun()
+            profile = start_profile(PROFILE_MODE) if PROFILE_MODE and fragment_rerun else None
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                if fragment_rerun:
+                    record_rerun_latency(label, time.perf_counter() - started)
+                if profile is not None:
+                    report = keep_profile_report(stop_profile(profile, label, APP_DIR))
+            if profile is not None:
+                with st.expander(f"🔬 프로파일: {label}", expanded=True):
+                    render_profile_report(report, key=f"fragment_{label}")
+            return result
+        return st.fragment(timed)
+    return decorator
+
+# --------------------------------------------------------------------------
+# [함수 그룹 H] 온디맨드 프로파일 결과
+#   - 최근 PROFILE_KEEP개 결과를 세션에 보관한다. 부분 재실행 도중 st.rerun()으로 끊긴 실행의 결과도 남는다.
+# --------------------------------------------------------------------------
+PROFILE_KEEP = 5
+
+def keep_profile_report(report):
+    """프로파일 결과를 세션의 최근 결과 목록에 추가하고 그대로 반환한다."""
+    reports = st.session_state.setdefault('profile_reports', [])
+    reports.append(report)
+    del reports[:-PROFILE_KEEP]
+    return report
+
+def render_profile_report(report, key):
+    """앱 코드 핫스팟(포함 시간)·전체 핫스팟(자체 시간) 표와 프로파일 파일 내려받기."""
+    is_sample = report['mode'] == "sample"
+    size_text = f"표본 {report['size']}개" if is_sample else f"함수 {report['size']}개"
+    st.caption(f"{report['label']} · {report['mode']} · {report['seconds'] * 1000:,.0f}ms · {size_text} · "
+               f"{datetime.fromtimestamp(report['started_at']).strftime('%H:%M:%S')}")
+    formats = number_columns({'자체(%)': '%.1f', '포함(%)': '%.1f', '자체(ms)': '%.1f', '누적(ms)': '%.1f'})
+    st.markdown("**앱 코드 줄별 포함 시간**" if is_sample else "**앱 코드 함수별 누적 시간**")
+    st.dataframe(pd.DataFrame(report['app_lines']), hide_index=True, use_container_width=True, column_config=formats)
+    st.markdown("**전체 자체 시간 상위**")
+    st.dataframe(pd.DataFrame(report['hotspots']), hide_index=True, use_container_width=True, column_config=formats)
+    st.download_button(
+        "📥 프로파일 파일 (speedscope/flamegraph)" if is_sample else "📥 프로파일 파일 (pstats/snakeviz)",
+        data=report['data'],
+        file_name=f"profile_{datetime.fromtimestamp(report['started_at']).strftime('%Y%m%d_%H%M%S')}.{report['file_ext']}",
+        key=f"dl_profile_{key}",
+    )
+
+# --------------------------------------------------------------------------
+# [함수 그룹 I] 캐시 예열 (prewarm)
+#   - 매일 PREWARM_HOUR시(한가한 시간)에 수요가 많은 구의 국토부 (구, 월) 응답과 R-ONE 지수를 미리 받아 캐시에 넣고,
+#     시트 요약·랭킹/검색 인덱스·기본 조건 추천 점수를 미리 만들어 둔다. 그날 첫 사용자도 캐시된 결과를 받는다.
+#   - 대상 선정·호출 계획은 prewarm 모듈이 하고, 호출은 사용자 수집과 같은 함수·같은 일일 한도(API_DAILY_LIMITS)를 쓴다.
+#   - 실행은 prewarm.* 구간으로 기록되고, 최근 실행 결과·오늘 호출 수·구별 수요는 사이드바 [7]에 표시된다.
+# --------------------------------------------------------------------------
+# secrets 값은 문자열일 수 있어("false") 명시적으로 해석한다. 기본은 꺼짐.
+PREWARM_ENABLED = str(st.secrets.get("PREWARM_ENABLED", "")).strip().lower() in ("1", "true", "yes")
+PREWARM_HOUR = int(st.secrets.get("PREWARM_HOUR", 5))
+# 사이드바 수집 기본값(조회 월 범위 2개월, 상승장 안전마진 5%)과 같은 조건으로 예열해야 같은 캐시 키가 채워진다.
+PREWARM_MONTHS = 2
+PREWARM_MARKET_BUFFER = 5
+# 한가한 시간이라 서두를 필요가 없으므로 사용자 수집 기본값(0.5초)보다 천천히 호출한다.
+PREWARM_CALL_INTERVAL = 1.0
+PREWARM_HISTORY_LIMIT = 10
+
+@st.cache_resource
+def _prewarm_state():
+    return {"lock": threading.Lock(), "running": False, "next_run": None, "history": deque(maxlen=PREWARM_HISTORY_LIMIT)}
+
+def prewarm_demand(now=None):
+    """최근 구 선택 기록·AI자문이력 대상 기준 구별 수요 점수(prewarm.district_demand 결과)."""
+    now = now or datetime.now()
+    since = now - timedelta(days=DEMAND_WINDOW_DAYS)
+    return district_demand(load_district_requests(LOCAL_STORE_PATH, since),
+                           recent_advisory_targets(LOCAL_STORE_PATH, since.strftime("%Y-%m-%d %H:%M")),
+                           DISTRICT_CODES, now=now)
+
+def _prewarm_district(item, months, now):
+    """
+    한 구의 계획된 (API, 월)만 호출해 캐시에 넣고, 수집 파이프라인(정제 → 시세 추정)을 돌려 R-ONE 지수 캐시를 채운다.
+    반환: 실패한 호출 수. 실패한 (구, 월)은 캐시에 넣지 않으므로 사용자 수집 때 다시 호출된다.
+    """
+    name, code = item["구"], item["코드"]
+    failures, trades = 0, {}
+    for ym in item["fetch"]["molit.trade"]:
+        df_raw_trade = fetch_trade_data(code, ym, api_key_decoded)
+        if df_raw_trade is None:
+            failures += 1
+            incr("prewarm.failed_calls", api="trade")
+        else:
+            molit_cache_put("molit.trade", code, ym, df_raw_trade)
+            trades[ym] = df_raw_trade
+        traced_sleep(PREWARM_CALL_INTERVAL, "prewarm.interval")
+    for ym in item["fetch"]["molit.rent"]:
+        df_raw_rent = fetch_rent_data(code, ym, api_key_decoded)
+        if df_raw_rent is None:
+            failures += 1
+            incr("prewarm.failed_calls", api="rent")
+        else:
+            with span("rent.ingest", district=name, ym=ym, rows=len(df_raw_rent)):
+                rent_ids = resolve_complex_ids(LOCAL_STORE_PATH, df_raw_rent['아파트'], name, df_raw_rent['법정동']) if not df_raw_rent.empty else []
+                ingest_rent_month(LOCAL_STORE_PATH, name, ym, df_raw_rent, rent_ids)
+            molit_cache_put("molit.rent", code, ym, len(df_raw_rent))
+        traced_sleep(PREWARM_CALL_INTERVAL, "prewarm.interval")
+
+    for ym in months:
+        if ym not in trades and (cached := molit_cache_get("molit.trade", code, ym)) is not None:
+            trades[ym] = cached
+    frames = [df.assign(구=name) for df in trades.values() if not df.empty]
+    if frames:
+        # 시세 추정이 거래마다 부르는 fetch_reb_weekly_index(구, 경과 주)가 사용자 수집 때와 같은 키로 캐시된다.
+        with span("prewarm.estimate", district=name, rows=sum(len(f) for f in frames)):
+            df_clean = clean_trades(pd.concat(frames, ignore_index=True), LOCAL_STORE_PATH, now=now)
+            estimate_prices(df_clean, functools.partial(fetch_reb_weekly_index, service_key=reb_api_key), PREWARM_MARKET_BUFFER)
+    return failures
+
+def _prebuild_views():
+    """시트 요약·랭킹/검색 인덱스·기본 조건 추천 점수를 만들어 둔다. 반환: 요약 행 수(시트가 비었으면 0)."""
+    df_sheet = load_shared_sheet()[0]
+    if df_sheet.empty or '매매가(억)' not in df_sheet.columns:
+        return 0
+    df_summary, summary_version = get_complex_summary(df_sheet)
+    get_rank_index(summary_version, df_summary)
+    get_summary_search_index(summary_version, df_summary)
+    get_scored_candidates(summary_version, REC_DEFAULT_PYUNG_RANGE, REC_DEFAULT_BUDGET, df_summary)
+    return len(df_summary)
+
+def run_prewarm(trigger):
+    """
+    캐시 예열 1회. 이미 실행 중이면 None, 아니면 실행 결과 dict를 반환하고 최근 실행 목록에도 남긴다.
+    호출 예산은 API별로 일일 한도의 PREWARM_QUOTA_SHARE와 오늘 남은 호출 수 중 작은 값이다(prewarm.prewarm_budget).
+    """
+    state = _prewarm_state()
+    with state["lock"]:
+        if state["running"]:
+            return None
+        state["running"] = True
+    now = datetime.now()
+    calls_before = api_calls_today()
+    report = {"시작": now.strftime("%m-%d %H:%M:%S"), "트리거": trigger, "예열 구": "", "건너뜀": 0,
+              "API 호출": "", "실패 호출": 0, "요약 행": 0, "소요(s)": 0.0, "상태": "완료"}
+    started = time.perf_counter()
+    try:
+        with span("prewarm.run", trigger=trigger) as attrs:
+            # 다른 기기에서 저장한 자문도 수요에 반영되도록 색인을 먼저 맞춘다. 시트를 못 읽으면 로컬 색인만 쓴다.
+            try: sync_advisory_index()
+            except Exception: incr("prewarm.advisory_sync_failed")
+            months = collect_months(now, PREWARM_MONTHS)
+            plan, skipped = plan_prewarm(prewarm_demand(now), DISTRICT_CODES, months,
+                                         prewarm_budget(API_DAILY_LIMITS, calls_before), molit_cached_keys())
+            report["예열 구"] = ", ".join(item["구"] for item in plan)
+            report["건너뜀"] = len(skipped)
+            attrs.update(districts=len(plan), skipped=len(skipped))
+            for item in plan:
+                with span("prewarm.district", district=item["구"], planned_calls=sum(item["calls"].values())):
+                    report["실패 호출"] += _prewarm_district(item, months, now)
+            with span("prewarm.views") as view_attrs:
+                report["요약 행"] = view_attrs["rows"] = _prebuild_views()
+            attrs["failed_calls"] = report["실패 호출"]
+    except Exception as e:  # noqa: BLE001 - 스케줄러 스레드가 죽지 않도록 결과에 남기고 끝낸다.
+        report["상태"] = f"오류: {type(e).__name__}: {e}"
+    finally:
+        calls_after = api_calls_today()
+        report["API 호출"] = ", ".join(f"{api} {n}" for api in API_DAILY_LIMITS
+                                      if (n := calls_after.get(api, 0) - calls_before.get(api, 0)) > 0) or "없음"
+        report["소요(s)"] = round(time.perf_counter() - started, 1)
+        with state["lock"]:
+            state["running"] = False
+            state["history"].append(report)
+    return report
+
+@st.cache_resource
+def start_prewarm_scheduler(hour):
+    """프로세스당 한 번 예열 스케줄러 스레드(데몬)를 띄운다. 매일 hour시에 run_prewarm("예약")을 실행한다."""
+    state = _prewarm_state()
+
+    def loop():
+        while True:
+            state["next_run"] = next_run_at(datetime.now(), hour)
+            # 절전 복귀·시계 변경 뒤에도 예약 시각을 놓치지 않도록 한 번에 길게 자지 않는다.
+            while (wait := (state["next_run"] - datetime.now()).total_seconds()) > 0:
+                time.sleep(min(wait, 60))
+            run_prewarm("예약")
+
+    thread = threading.Thread(target=loop, name="prewarm-scheduler", daemon=True)
+    thread.start()
+    return thread
+
+if PREWARM_ENABLED:
+    start_prewarm_scheduler(PREWARM_HOUR)
+
 # --------------------------------------------------------------------------
 # [2] 사이드바
 # --------------------------------------------------------------------------
@@ -367,264 +926,220 @@ with st.sidebar:
 
     st.divider()
 
-    st.header("🔍 실거래가 자동 수집 (배치 모드)")
-    st.caption("⚠️ 한 번에 5개 구 이하 선택을 권장합니다. 다수 선택 시 정부 API 트래픽 제한으로 실패 가능성이 높아집니다.")
-
-    district_code = {
-        "서울 강남구": "11680", "서울 강동구": "11740", "서울 강북구": "11305", "서울 강서구": "11500", "서울 관악구": "11620",
-        "서울 광진구": "11215", "서울 구로구": "11530", "서울 금천구": "11545", "서울 노원구": "11350", "서울 도봉구": "11320",
-        "서울 동대문구": "11230", "서울 동작구": "11590", "서울 마포구": "11440", "서울 서대문구": "11410", "서울 서초구": "11650",
-        "서울 성동구": "11200", "서울 성북구": "11290", "서울 송파구": "11710", "서울 양천구": "11470", "서울 영등포구": "11560",
-        "서울 용산구": "11170", "서울 은평구": "11380", "서울 종로구": "11110", "서울 중구": "11140", "서울 중랑구": "11260",
-        "경기 과천시": "41290", "경기 광명시": "41210", "경기 하남시": "41450",
-        "경기 성남 분당": "41135", "경기 성남 수정": "41131", "경기 성남 중원": "41133",
-        "경기 안양 동안": "41173", "경기 안양 만안": "41171",
-        "경기 수원 영통": "41117", "경기 수원 팔달": "41115",
-        "경기 용인 수지": "41465", "경기 용인 기흥": "41463",
-        "경기 고양 일산동": "41285", "경기 고양 일산서": "41287", "경기 고양 덕양": "41281",
-        "경기 화성시": "41590", "경기 김포시": "41570", "경기 남양주시": "41360",
-        "경기 구리시": "41310", "경기 부천시": "41190", "경기 군포시": "41410", "경기 의왕시": "41430"
-    }
-
-    district_groups = {
-        "🏙️ 서울 강남권": ["서울 강남구", "서울 서초구", "서울 송파구", "서울 강동구"],
-        "🏛️ 서울 도심권": ["서울 종로구", "서울 중구", "서울 용산구", "서울 성동구", "서울 광진구"],
-        "🌳 서울 동북권": ["서울 강북구", "서울 노원구", "서울 도봉구", "서울 동대문구", "서울 성북구", "서울 중랑구"],
-        "🌉 서울 서남권": ["서울 강서구", "서울 관악구", "서울 구로구", "서울 금천구", "서울 동작구", "서울 영등포구", "서울 양천구"],
-        "🌲 서울 서북권": ["서울 마포구", "서울 서대문구", "서울 은평구"],
-        "🏞️ 경기 1기 신도시": ["경기 성남 분당", "경기 고양 일산동", "경기 고양 일산서", "경기 안양 동안", "경기 부천시", "경기 군포시"],
-        "🏗️ 경기 2기/3기": ["경기 과천시", "경기 광명시", "경기 하남시", "경기 화성시", "경기 김포시", "경기 남양주시"],
-        "🌆 경기 기타": ["경기 성남 수정", "경기 성남 중원", "경기 안양 만안", "경기 수원 영통", "경기 수원 팔달",
-                       "경기 용인 수지", "경기 용인 기흥", "경기 고양 덕양", "경기 구리시", "경기 의왕시"],
-    }
-
-    if 'selected_districts' not in st.session_state:
-        st.session_state['selected_districts'] = []
-    if 'failed_districts' not in st.session_state:
-        st.session_state['failed_districts'] = []
+    @panel("구 선택·수집")
+    def district_panel():
+        """구 선택·호출 설정·수집. 체크박스를 바꿔도 사이드바의 이 영역만 다시 실행된다."""
+        st.header("🔍 실거래가 자동 수집 (배치 모드)")
+        st.caption("⚠️ 한 번에 5개 구 이하 선택을 권장합니다. 다수 선택 시 정부 API 트래픽 제한으로 실패 가능성이 높아집니다.")
+        if notice := st.session_state.pop('fetch_notice', None):
+            st.success(notice)
+
+        district_groups = {
+            "🏙️ 서울 강남권": ["서울 강남구", "서울 서초구", "서울 송파구", "서울 강동구"],
+            "🏛️ 서울 도심권": ["서울 종로구", "서울 중구", "서울 용산구", "서울 성동구", "서울 광진구"],
+            "🌳 서울 동북권": ["서울 강북구", "서울 노원구", "서울 도봉구", "서울 동대문구", "서울 성북구", "서울 중랑구"],
+            "🌉 서울 서남권": ["서울 강서구", "서울 관악구", "서울 구로구", "서울 금천구", "서울 동작구", "서울 영등포구", "서울 양천구"],
+            "🌲 서울 서북권": ["서울 마포구", "서울 서대문구", "서울 은평구"],
+            "🏞️ 경기 1기 신도시": ["경기 성남 분당", "경기 고양 일산동", "경기 고양 일산서", "경기 안양 동안", "경기 부천시", "경기 군포시"],
+            "🏗️ 경기 2기/3기": ["경기 과천시", "경기 광명시", "경기 하남시", "경기 화성시", "경기 김포시", "경기 남양주시"],
+            "🌆 경기 기타": ["경기 성남 수정", "경기 성남 중원", "경기 안양 만안", "경기 수원 영통", "경기 수원 팔달",
+                           "경기 용인 수지", "경기 용인 기흥", "경기 고양 덕양", "경기 구리시", "경기 의왕시"],
+        }
 
-    col_btn1, col_btn2 = st.columns(2)
-    with col_btn1:
-        if st.button("✅ 모두 해제", use_container_width=True):
+        if 'selected_districts' not in st.session_state:
             st.session_state['selected_districts'] = []
-            st.rerun()
-    with col_btn2:
-        if st.button("🎯 강남4구만", use_container_width=True):
-            st.session_state['selected_districts'] = ["서울 강남구", "서울 서초구", "서울 송파구", "서울 강동구"]
-            st.rerun()
-
-    selected = []
-    for group_name, districts in district_groups.items():
-        with st.expander(group_name, expanded=False):
-            for d in districts:
-                checked = d in st.session_state['selected_districts']
-                if st.checkbox(d, value=checked, key=f"chk_{d}"):
-                    selected.append(d)
-
-    st.session_state['selected_districts'] = selected
-    sel_count = len(selected)
-
-    if sel_count == 0:
-        st.warning("⚠️ 선택된 구가 없습니다.")
-    elif sel_count <= 5:
-        st.success(f"✅ {sel_count}개 구 선택됨 (권장 범위)")
-    elif sel_count <= 10:
-        st.warning(f"⚠️ {sel_count}개 구 선택됨 (실패 가능성 있음)")
-    else:
-        st.error(f"🚨 {sel_count}개 구 선택됨 (강력히 비권장)")
-
-    with st.expander("⚙️ 고급 호출 설정", expanded=False):
-        call_interval = st.slider("호출 간격(초)", 0.1, 2.0, 0.5, 0.1)
-        max_retries = st.slider("실패 시 자동 재시도 횟수", 0, 3, 2)
-        months_to_fetch = st.slider("조회 월 범위", 1, 6, 2)
-
-    apply_estimation = st.checkbox("🌟 추정 현재시세 자동 산출", value=True)
-    # [추가/해결책2] 상승장 보정: 실거래·지수의 후행성을 보완하기 위한 안전마진.
-    # 추정시세에 이 비율을 더해 필터링·표시한다. 상승장에서 실제 호가와의 괴리를 줄인다.
-    market_buffer = st.slider(
-        "📈 상승장 안전마진 (%)",
-        0, 15, 5,
-        help="실거래가(최대 1개월 시차)·R-ONE 지수(1~2주 시차)의 후행성 탓에 상승장에서는 "
-             "추정시세가 실제 호가보다 낮게 나옵니다. 이 비율만큼 추정시세를 상향 보정해 "
-             "보수적으로 필터링합니다."
-    )
-    rent_recent_only = st.checkbox("📅 전월세 최근 30일 데이터만 사용", value=False)
-
-    fetch_clicked = st.button(f"📥 선택된 {sel_count}개 구 데이터 수집", type="primary", disabled=(sel_count == 0), use_container_width=True)
-
-    if st.session_state['failed_districts']:
-        st.divider()
-        st.error(f"❌ 이전 시도에서 {len(st.session_state['failed_districts'])}개 구 실패")
-        with st.expander("실패 목록 보기", expanded=True):
-            for fd in st.session_state['failed_districts']:
-                st.write(f"- {fd}")
-        if st.button("🔄 실패한 구만 재시도", use_container_width=True):
-            st.session_state['selected_districts'] = st.session_state['failed_districts'].copy()
+        if 'failed_districts' not in st.session_state:
             st.session_state['failed_districts'] = []
-            st.rerun()
-
-    if fetch_clicked and sel_count > 0:
-        target_districts = {d: district_code[d] for d in selected if d in district_code}
-        progress_bar = st.progress(0, text="정부 서버 연결 중...")
-        status_box = st.empty()
-        df_trade_list, df_rent_list, failed_list = [], [], []
-
-        now = datetime.now()
-        months = []
-        cursor = now
-        for _ in range(months_to_fetch):
-            months.append(cursor.strftime("%Y%m"))
-            cursor = (cursor.replace(day=1) - timedelta(days=1))
-
-        total_steps = len(target_districts) * len(months) * 2
-        step, success_streak = 0, 0
-        current_interval = call_interval
-
-        for name, code in target_districts.items():
-            district_success = True
-            district_records = 0
-
-            for ym in months:
-                step += 1
-                trade_ok = False
-                for attempt in range(max_retries + 1):
-                    progress_bar.progress(step / total_steps, text=f"[{name}] {ym} 매매 수신 중... (시도 {attempt+1}/{max_retries+1})")
-                    df_raw_trade = fetch_trade_data(code, ym, api_key_decoded)
-                    if df_raw_trade is not None:
-                        if not df_raw_trade.empty:
-                            df_raw_trade['구'] = name
-                            df_trade_list.append(df_raw_trade)
+
+        col_btn1, col_btn2 = st.columns(2)
+        with col_btn1:
+            if st.button("✅ 모두 해제", use_container_width=True):
+                st.session_state['selected_districts'] = []
+                rerun_panel()
+        with col_btn2:
+            if st.button("🎯 강남4구만", use_container_width=True):
+                st.session_state['selected_districts'] = ["서울 강남구", "서울 서초구", "서울 송파구", "서울 강동구"]
+                rerun_panel()
+
+        selected = []
+        for group_name, districts in district_groups.items():
+            with st.expander(group_name, expanded=False):
+                for d in districts:
+                    checked = d in st.session_state['selected_districts']
+                    if st.checkbox(d, value=checked, key=f"chk_{d}"):
+                        selected.append(d)
+
+        st.session_state['selected_districts'] = selected
+        sel_count = len(selected)
+
+        if sel_count == 0:
+            st.warning("⚠️ 선택된 구가 없습니다.")
+        elif sel_count <= 5:
+            st.success(f"✅ {sel_count}개 구 선택됨 (권장 범위)")
+        elif sel_count <= 10:
+            st.warning(f"⚠️ {sel_count}개 구 선택됨 (실패 가능성 있음)")
+        else:
+            st.error(f"🚨 {sel_count}개 구 선택됨 (강력히 비권장)")
+
+        with st.expander("⚙️ 고급 호출 설정", expanded=False):
+            call_interval = st.slider("호출 간격(초)", 0.1, 2.0, 0.5, 0.1)
+            max_retries = st.slider("실패 시 자동 재시도 횟수", 0, 3, 2)
+            months_to_fetch = st.slider("조회 월 범위", 1, 6, 2)
+
+        apply_estimation = st.checkbox("🌟 추정 현재시세 자동 산출", value=True)
+        # [추가/해결책2] 상승장 보정: 실거래·지수의 후행성을 보완하기 위한 안전마진.
+        # 추정시세에 이 비율을 더해 필터링·표시한다. 상승장에서 실제 호가와의 괴리를 줄인다.
+        market_buffer = st.slider(
+            "📈 상승장 안전마진 (%)",
+            0, 15, 5,
+            help="실거래가(최대 1개월 시차)·R-ONE 지수(1~2주 시차)의 후행성 탓에 상승장에서는 "
+                 "추정시세가 실제 호가보다 낮게 나옵니다. 이 비율만큼 추정시세를 상향 보정해 "
+                 "보수적으로 필터링합니다."
+        )
+        rent_recent_only = st.checkbox(
+            "📅 전월세 최근 30일 데이터만 사용", value=False,
+            help="전월세 평균은 최근 계약일수록 비중이 큰 시간 가중 평균입니다. "
+                 "체크하면 최근 30일에 걸친 계약월 데이터만 사용합니다."
+        )
+
+        fetch_clicked = st.button(f"📥 선택된 {sel_count}개 구 데이터 수집", type="primary", disabled=(sel_count == 0), use_container_width=True)
+
+        if st.session_state['failed_districts']:
+            st.divider()
+            st.error(f"❌ 이전 시도에서 {len(st.session_state['failed_districts'])}개 구 실패")
+            with st.expander("실패 목록 보기", expanded=True):
+                for fd in st.session_state['failed_districts']:
+                    st.write(f"- {fd}")
+            if st.button("🔄 실패한 구만 재시도", use_container_width=True):
+                st.session_state['selected_districts'] = st.session_state['failed_districts'].copy()
+                st.session_state['failed_districts'] = []
+                rerun_panel()
+
+        if fetch_clicked and sel_count > 0:
+            target_districts = {d: DISTRICT_CODES[d] for d in selected if d in DISTRICT_CODES}
+            progress_bar = st.progress(0, text="정부 서버 연결 중...")
+            status_box = st.empty()
+            df_trade_list, failed_list = [], []
+
+            now = datetime.now()
+            months = collect_months(now, months_to_fetch)
+            # 많이 찾는 구를 캐시 예열([함수 그룹 I]) 대상으로 고르는 데 쓴다. 기록 실패는 수집에 영향을 주지 않는다.
+            try: record_district_requests(LOCAL_STORE_PATH, list(target_districts), "수집")
+            except Exception: pass
+
+            total_steps = len(target_districts) * len(months) * 2
+            step, success_streak = 0, 0
+            current_interval = call_interval
+
+            # API 호출(molit.*)·재시도 대기(collect.retry_wait)·호출 간격(collect.interval)은 이 구간의 자식으로 기록된다.
+            with span("collect.fetch", districts=len(target_districts), months=len(months)) as fetch_attrs:
+                for name, code in target_districts.items():
+                    district_success = True
+                    district_records = 0
+
+                    for ym in months:
+                        step += 1
+                        # 캐시(예열 포함)에 있는 (구, 월)은 호출·호출 간격 대기 없이 그대로 쓴다.
+                        df_raw_trade = molit_cache_get("molit.trade", code, ym)
+                        trade_cached = df_raw_trade is not None
+                        if trade_cached:
+                            progress_bar.progress(step / total_steps, text=f"[{name}] {ym} 매매 (캐시)")
+                        for attempt in range(0 if trade_cached else max_retries + 1):
+                            progress_bar.progress(step / total_steps, text=f"[{name}] {ym} 매매 수신 중... (시도 {attempt+1}/{max_retries+1})")
+                            df_raw_trade = fetch_trade_data(code, ym, api_key_decoded)
+                            if df_raw_trade is not None:
+                                molit_cache_put("molit.trade", code, ym, df_raw_trade)
+                                break
+                            incr("collect.failed_calls", api="trade")
+                            traced_sleep(current_interval * (attempt + 2), "collect.retry_wait")
+                        if df_raw_trade is None: district_success = False
+                        elif not df_raw_trade.empty:
+                            df_trade_list.append(df_raw_trade.assign(구=name))
                             district_records += len(df_raw_trade)
-                        trade_ok = True
-                        break
-                    time.sleep(current_interval * (attempt + 2))
-                if not trade_ok: district_success = False
-                time.sleep(current_interval)
-
-                step += 1
-                rent_ok = False
-                for attempt in range(max_retries + 1):
-                    progress_bar.progress(step / total_steps, text=f"[{name}] {ym} 전월세 수신 중... (시도 {attempt+1}/{max_retries+1})")
-                    df_raw_rent = fetch_rent_data(code, ym, api_key_decoded)
-                    if df_raw_rent is not None:
-                        if not df_raw_rent.empty:
-                            df_raw_rent['구'] = name
-                            df_rent_list.append(df_raw_rent)
-                        rent_ok = True
-                        break
-                    time.sleep(current_interval * (attempt + 2))
-                if not rent_ok: district_success = False
-                time.sleep(current_interval)
-
-            if district_success:
-                success_streak += 1
-                status_box.info(f"✅ {name} 완료 ({district_records}건). 누적 성공: {success_streak}")
-                if success_streak >= 5 and current_interval > 0.2:
-                    current_interval = max(0.2, current_interval * 0.8)
-            else:
-                failed_list.append(name)
-                success_streak = 0
-                current_interval = min(2.0, current_interval * 1.5)
-                status_box.warning(f"⚠️ {name} 실패. 간격 {current_interval:.1f}초로 조정")
-
-        progress_bar.empty()
-        status_box.empty()
-        st.session_state['failed_districts'] = failed_list
-
-        if df_trade_list:
-            df_all_trade = pd.concat(df_trade_list, ignore_index=True)
-            df_clean = pd.DataFrame()
-            df_clean['아파트명'] = df_all_trade['아파트']
-            df_clean['지역'] = df_all_trade['구'] + " " + df_all_trade['법정동']
-            df_clean['시군구'] = df_all_trade['구']
-            df_clean['평형'] = pd.to_numeric(df_all_trade['전용면적'], errors='coerce').fillna(0).apply(lambda x: round(x / 3.3, 1))
-            df_clean['층'] = df_all_trade['층']
-            df_clean['건축년도'] = df_all_trade['건축년도']
-            df_clean['매매가(억)'] = pd.to_numeric(df_all_trade['거래금액'].astype(str).str.replace(',', '').str.strip(), errors='coerce').fillna(0).astype(int) / 10000
-
-            df_clean['년'] = df_all_trade['년'].astype(str).str.zfill(4)
-            df_clean['월'] = df_all_trade['월'].astype(str).str.zfill(2)
-            df_clean['일'] = df_all_trade['일'].astype(str).str.zfill(2)
-            df_clean['거래일'] = df_clean.apply(lambda x: f"{x['년']}-{x['월']}-{x['일']}" if x['년'] != '0000' else now.strftime("%Y-%m-%d"), axis=1)
-
-            df_clean['조인키_아파트'] = df_clean['아파트명'].astype(str).str.replace(' ', '')
-            df_clean['조인키_평형'] = df_clean['평형'].apply(lambda x: round(x))
-
-            if df_rent_list:
-                df_all_rent = pd.concat(df_rent_list, ignore_index=True)
-                df_all_rent['평형'] = pd.to_numeric(df_all_rent['전용면적'], errors='coerce').fillna(0).apply(lambda x: round(x / 3.3, 1))
-                df_all_rent['보증금(억)'] = pd.to_numeric(df_all_rent['보증금액'].astype(str).str.replace(',', '').str.strip(), errors='coerce').fillna(0).astype(int) / 10000
-                df_all_rent['월세(만)'] = pd.to_numeric(df_all_rent['월세금액'].astype(str).str.replace(',', '').str.strip(), errors='coerce').fillna(0).astype(int)
-
-                if rent_recent_only:
-                    df_all_rent['년'] = df_all_rent['년'].astype(str).str.zfill(4)
-                    df_all_rent['월'] = df_all_rent['월'].astype(str).str.zfill(2)
-                    df_all_rent['일'] = df_all_rent['일'].astype(str).str.zfill(2)
-                    df_all_rent['신고일'] = pd.to_datetime(df_all_rent['년'] + "-" + df_all_rent['월'] + "-" + df_all_rent['일'], errors='coerce')
-                    cutoff = datetime.now() - timedelta(days=30)
-                    df_all_rent = df_all_rent[df_all_rent['신고일'] >= cutoff]
-
-                df_all_rent['조인키_아파트'] = df_all_rent['아파트'].astype(str).str.replace(' ', '')
-                df_all_rent['조인키_평형'] = df_all_rent['평형'].apply(lambda x: round(x))
-
-                df_jeonse = df_all_rent[df_all_rent['월세(만)'] == 0]
-                df_monthly = df_all_rent[df_all_rent['월세(만)'] > 0]
-
-                jeonse_avg = df_jeonse.groupby(['조인키_아파트', '조인키_평형'])['보증금(억)'].mean().reset_index()
-                jeonse_avg.rename(columns={'보증금(억)': '평균전세가(억)'}, inplace=True)
-
-                monthly_avg = df_monthly.groupby(['조인키_아파트', '조인키_평형'])[['보증금(억)', '월세(만)']].mean().reset_index()
-                monthly_avg.rename(columns={'보증금(억)': '평균월세보증금(억)', '월세(만)': '평균월세액(만)'}, inplace=True)
-
-                df_clean = pd.merge(df_clean, jeonse_avg, how='left', on=['조인키_아파트', '조인키_평형'])
-                df_clean = pd.merge(df_clean, monthly_avg, how='left', on=['조인키_아파트', '조인키_평형'])
-
-                df_clean['전세가(억)'] = df_clean['평균전세가(억)'].fillna(df_clean['매매가(억)'] * 0.6)
-                df_clean['월세보증금(억)'] = df_clean['평균월세보증금(억)'].fillna(0)
-                df_clean['월세액(만원)'] = df_clean['평균월세액(만)'].fillna(0)
-            else:
-                df_clean['전세가(억)'] = df_clean['매매가(억)'] * 0.6
-                df_clean['월세보증금(억)'] = 0
-                df_clean['월세액(만원)'] = 0
-
-            df_clean['데이터신선도'] = df_clean['거래일'].apply(freshness_label)
-
-            if apply_estimation:
-                with st.spinner("🌟 한국부동산원 지수 기반 추정 시세 계산 중..."):
-                    est_prices, cum_changes = [], []
-                    for _, row in df_clean.iterrows():
-                        est, chg = estimate_today_price(row['매매가(억)'], row['거래일'], row['시군구'], reb_api_key)
-                        est_prices.append(est)
-                        cum_changes.append(chg if chg is not None else 0.0)
-                    df_clean['추정현재시세(억)'] = est_prices
-                    df_clean['누적변동률(%)'] = cum_changes
-                    # [추가/해결책2] 안전마진 반영 — 후행 데이터의 상승장 과소평가를 보정.
-                    # 보정 전 원본은 별도 컬럼에 보관해 AI 호가 검증 시 비교 근거로 쓴다.
-                    df_clean['지수추정시세(억)'] = df_clean['추정현재시세(억)']
-                    if market_buffer > 0:
-                        df_clean['추정현재시세(억)'] = (
-                            df_clean['추정현재시세(억)'] * (1 + market_buffer / 100)
-                        ).round(2)
+                        if not trade_cached: traced_sleep(current_interval, "collect.interval")
+
+                        step += 1
+                        # 전월세는 받은 즉시 저장소에 반영되므로 캐시에는 반영한 행 수만 둔다.
+                        rent_cached = molit_cache_get("molit.rent", code, ym) is not None
+                        rent_ok = rent_cached
+                        if rent_cached:
+                            progress_bar.progress(step / total_steps, text=f"[{name}] {ym} 전월세 (캐시)")
+                        for attempt in range(0 if rent_cached else max_retries + 1):
+                            progress_bar.progress(step / total_steps, text=f"[{name}] {ym} 전월세 수신 중... (시도 {attempt+1}/{max_retries+1})")
+                            df_raw_rent = fetch_rent_data(code, ym, api_key_decoded)
+                            if df_raw_rent is not None:
+                                # 월 단위로 전월세 집계 저장소에 반영(같은 월 재수집 시 교체). 원본 행은 보관하지 않는다.
+                                with span("rent.ingest", district=name, ym=ym, rows=len(df_raw_rent)):
+                                    rent_ids = resolve_complex_ids(LOCAL_STORE_PATH, df_raw_rent['아파트'], name, df_raw_rent['법정동']) if not df_raw_rent.empty else []
+                                    ingest_rent_month(LOCAL_STORE_PATH, name, ym, df_raw_rent, rent_ids)
+                                molit_cache_put("molit.rent", code, ym, len(df_raw_rent))
+                                rent_ok = True
+                                break
+                            incr("collect.failed_calls", api="rent")
+                            traced_sleep(current_interval * (attempt + 2), "collect.retry_wait")
+                        if not rent_ok: district_success = False
+                        if not rent_cached: traced_sleep(current_interval, "collect.interval")
+
+                    if district_success:
+                        success_streak += 1
+                        status_box.info(f"✅ {name} 완료 ({district_records}건). 누적 성공: {success_streak}")
+                        if success_streak >= 5 and current_interval > 0.2:
+                            current_interval = max(0.2, current_interval * 0.8)
+                    else:
+                        failed_list.append(name)
+                        success_streak = 0
+                        current_interval = min(2.0, current_interval * 1.5)
+                        status_box.warning(f"⚠️ {name} 실패. 간격 {current_interval:.1f}초로 조정")
+
+                fetch_attrs.update(records=sum(len(d) for d in df_trade_list), failed=len(failed_list))
+
+            progress_bar.empty()
+            status_box.empty()
+            st.session_state['failed_districts'] = failed_list
+
+            if df_trade_list:
+                with span("collect.clean", rows=sum(len(d) for d in df_trade_list)):
+                    df_all_trade = pd.concat(df_trade_list, ignore_index=True)
+                    df_clean = clean_trades(df_all_trade, LOCAL_STORE_PATH, now=now)
+
+                with span("collect.rent_merge", rows=len(df_clean)):
+                    # 전월세 평균은 저장소의 (단지, 평형)별 시간 가중 합계에서 바로 조회한다(원본 전월세 재집계 없음).
+                    rent_avg = load_rent_averages(LOCAL_STORE_PATH, since_ym=recent_since_ym(30) if rent_recent_only else None)
+                    df_clean = merge_rent_averages(df_clean, rent_avg)
+
+                if apply_estimation:
+                    # R-ONE 지수 API 호출(캐시 미스)은 rone.weekly_index 구간으로 이 구간 아래에 기록된다.
+                    with st.spinner("🌟 한국부동산원 지수 기반 추정 시세 계산 중..."), span("collect.estimate", rows=len(df_clean)):
+                        # [추가/해결책2] 안전마진 반영 — 후행 데이터의 상승장 과소평가를 보정(보정 전 값은 지수추정시세에 보관).
+                        df_clean = estimate_prices(df_clean, functools.partial(fetch_reb_weekly_index, service_key=reb_api_key),
+                                                   market_buffer)
+                else:
+                    df_clean['추정현재시세(억)'] = df_clean['매매가(억)']
+                    df_clean['지수추정시세(억)'] = df_clean['매매가(억)']
+                    df_clean['누적변동률(%)'] = 0.0
+
+                df_clean['전고점(억)'] = 0.0
+                df_clean['입지점수'] = 0
+                df_clean = df_clean.sort_values(by='거래일', ascending=False)
+
+                cols_to_keep = [
+                    '단지ID', '아파트명', '지역', '평형', '층', '건축년도',
+                    '매매가(억)', '추정현재시세(억)', '지수추정시세(억)', '누적변동률(%)', '데이터신선도',
+                    '전세가(억)', '월세보증금(억)', '월세액(만원)',
+                    '거래일', '전고점(억)', '입지점수'
+                ]
+                # 수집 결과는 프로세스 공유본으로 보관하고 세션에는 키만 남긴다.
+                collection_key = (tuple(sorted(target_districts)), months_to_fetch, apply_estimation, market_buffer, rent_recent_only)
+                with span("collect.store", rows=len(df_clean)):
+                    st.session_state['fetched_key'] = put_shared_collection(collection_key, df_clean[cols_to_keep])
+                st.session_state['applied_buffer'] = market_buffer
+                # 탭 1이 새 수집 결과를 보여주도록 앱 전체를 다시 실행한다. 완료 메시지는 다음 실행에서 표시한다.
+                st.session_state['fetch_notice'] = f"✅ 수집 완료! 총 {len(df_clean)}건 (안전마진 {market_buffer}% 적용)"
+                st.rerun()
             else:
-                df_clean['추정현재시세(억)'] = df_clean['매매가(억)']
-                df_clean['지수추정시세(억)'] = df_clean['매매가(억)']
-                df_clean['누적변동률(%)'] = 0.0
-
-            df_clean['전고점(억)'] = 0.0
-            df_clean['입지점수'] = 0
-            df_clean = df_clean.sort_values(by='거래일', ascending=False)
-
-            cols_to_keep = [
-                '아파트명', '지역', '평형', '층', '건축년도',
-                '매매가(억)', '추정현재시세(억)', '지수추정시세(억)', '누적변동률(%)', '데이터신선도',
-                '전세가(억)', '월세보증금(억)', '월세액(만원)',
-                '거래일', '전고점(억)', '입지점수'
-            ]
-            st.session_state['fetched_data'] = df_clean[cols_to_keep]
-            st.session_state['applied_buffer'] = market_buffer
-            st.success(f"✅ 수집 완료! 총 {len(df_clean)}건 (안전마진 {market_buffer}% 적용)")
-        else:
-            st.error("⚠️ 수집된 데이터가 없습니다.")
+                st.error("⚠️ 수집된 데이터가 없습니다.")
+
+    district_panel()
 
 # --------------------------------------------------------------------------
 # [3] 메인 화면 (4개 탭)
@@ -636,11 +1151,6 @@ tab1, tab2, tab3, tab4 = st.tabs([
     "📚 자문 이력 조회"
 ])
 
-try:
-    conn = st.connection("gsheets", type=GSheetsConnection)
-except Exception:
-    pass
-
 # --- TAB 1: 데이터 저장 ---
 with tab1:
     st.subheader("📡 실시간 실거래 시세 + 추정 현재시세")
@@ -650,35 +1160,46 @@ with tab1:
             f"📈 현재 표시된 '추정현재시세(억)'에는 상승장 안전마진 **{applied_buffer}%**가 반영되어 있습니다. "
             "이는 실거래·지수의 후행성을 보완한 보수적 추정치이며, 실제 호가와는 차이가 있을 수 있습니다."
         )
-    if 'fetched_data' in st.session_state:
-        df_new = st.session_state['fetched_data']
-        search_apt = st.text_input("아파트 검색", placeholder="예: 래미안")
-        df_display = df_new[df_new['아파트명'].astype(str).str.contains(search_apt)] if search_apt else df_new
-        display_fmt = {
-            '매매가(억)': '{:.2f}', '추정현재시세(억)': '{:.2f}', '누적변동률(%)': '{:+.2f}%',
-            '전세가(억)': '{:.2f}', '월세보증금(억)': '{:.2f}'
-        }
-        if '지수추정시세(억)' in df_display.columns:
-            display_fmt['지수추정시세(억)'] = '{:.2f}'
-        st.dataframe(df_display.style.format(display_fmt), use_container_width=True)
+    fetched_entry = get_shared_collection(st.session_state['fetched_key']) if 'fetched_key' in st.session_state else None
+    if 'fetched_key' in st.session_state and fetched_entry is None:
+        st.warning("⏳ 이전 수집 결과가 서버 메모리에서 정리되었습니다. 다시 수집해 주세요.")
+        del st.session_state['fetched_key']
+    if fetched_entry is not None:
+        df_new = fetched_entry[0]
+        @panel("수집 결과 표")
+        def collection_table_panel(df_new, collection_search):
+            """수집 결과 검색·정렬·페이지. 검색어나 페이지를 바꾸면 이 표만 다시 실행된다."""
+            search_apt = st.text_input("아파트 검색", placeholder="예: 래미안, 대치 래미, ㄹㅁㅇ (초성)")
+            if search_apt:
+                # 전체 행 문자열 검색 대신 미리 만든 (단지명, 지역) 인덱스로 일치 조합을 찾고 해당 행만 고른다.
+                doc_ids = search(collection_search["index"], search_apt, k=None)
+                positions = np.sort(np.concatenate([collection_search["rows"][i] for i in doc_ids])) if len(doc_ids) else []
+                df_display = df_new.iloc[positions]
+            else:
+                df_display = df_new
+            display_cols = [c for c in df_display.columns if c != '단지ID']
+            display_config = number_columns({
+                '매매가(억)': '%.2f', '추정현재시세(억)': '%.2f', '지수추정시세(억)': '%.2f', '누적변동률(%)': '%+.2f%%',
+                '전세가(억)': '%.2f', '월세보증금(억)': '%.2f', '월세액(만원)': '%.0f', '전고점(억)': '%.2f'
+            })
+            display_config['거래일'] = st.column_config.DateColumn('거래일', format="YYYY-MM-DD")
+            render_paged_table(
+                df_display, "tbl_tab1", display_cols, display_config,
+                sortable=[c for c in ['거래일', '매매가(억)', '추정현재시세(억)', '누적변동률(%)', '평형', '건축년도', '전세가(억)'] if c in display_cols],
+            )
+
+        collection_table_panel(df_new, fetched_entry[2])
 
         if st.button("💾 구글 시트에 저장 (기준정보 반영)"):
             try:
-                try:
-                    df_master = conn.read(worksheet="기준정보", ttl=0)
-                    master_dict = {str(row['아파트명']).replace(" ", "").strip(): {'전고점': row.get('전고점(억)', 0), '점수': row.get('입지점수', 0)} for _, row in df_master.iterrows()}
-                except Exception: master_dict = {}
-
-                for idx, row in df_new.iterrows():
-                    name = str(row['아파트명']).replace(" ", "").strip()
-                    if name in master_dict:
-                        df_new.at[idx, '전고점(억)'] = master_dict[name]['전고점']
-                        df_new.at[idx, '입지점수'] = master_dict[name]['점수']
-
-                try: df_current = conn.read(ttl=0)
+                try: df_master = read_sheet("기준정보")
+                except Exception: df_master = pd.DataFrame()
+                df_new = apply_master_info(to_plain_frame(df_new), df_master)
+
+                try: df_current = to_plain_frame(load_shared_sheet()[0])
                 except Exception: df_current = pd.DataFrame()
 
-                cols = ['아파트명', '지역', '평형', '층', '건축년도', '매매가(억)', '추정현재시세(억)', '지수추정시세(억)', '누적변동률(%)', '데이터신선도', '전세가(억)', '월세보증금(억)', '월세액(만원)', '거래일', '전고점(억)', '입지점수']
+                cols = SHEET_COLUMNS
 
                 # 원본 df_new에 일부 컬럼이 없을 수 있으므로 방어적으로 채운다.
                 for c in cols:
@@ -689,23 +1210,16 @@ with tab1:
                     for c in cols:
                         if c not in df_current.columns:
                             df_current[c] = "-" if c in ['층', '건축년도', '거래일', '데이터신선도'] else 0
-
-                if df_current.empty: final_df = df_new[cols].copy()
+                    current_ids = resolve_complex_ids_by_region(LOCAL_STORE_PATH, df_current['아파트명'], df_current['지역'])
                 else:
-                    current_dict = {f"{str(r['아파트명']).replace(' ', '').strip()}_{r['평형']}": r.to_dict() for _, r in df_current.iterrows()}
-                    for _, row in df_new.iterrows():
-                        key = f"{str(row['아파트명']).replace(' ', '').strip()}_{row['평형']}"
-                        if key in current_dict:
-                            current_dict[key].update({
-                                '매매가(억)': row['매매가(억)'], '추정현재시세(억)': row['추정현재시세(억)'], '지수추정시세(억)': row.get('지수추정시세(억)', row['추정현재시세(억)']), '누적변동률(%)': row['누적변동률(%)'], '데이터신선도': row['데이터신선도'],
-                                '층': row['층'], '건축년도': row['건축년도'], '전세가(억)': row['전세가(억)'], '월세보증금(억)': row['월세보증금(억)'], '월세액(만원)': row['월세액(만원)'], '거래일': row['거래일']
-                            })
-                            if row['전고점(억)'] > 0: current_dict[key]['전고점(억)'] = row['전고점(억)']
-                            if row['입지점수'] > 0: current_dict[key]['입지점수'] = row['입지점수']
-                        else: current_dict[key] = row[cols].to_dict()
-                    final_df = pd.DataFrame(list(current_dict.values()))[cols]
-
-                conn.update(data=final_df)
+                    current_ids = []
+
+                # (단지ID, 평형) 키 기준 upsert — 같은 이름의 다른 동 단지는 별도 행으로 유지된다.
+                with span("sheet.upsert", current_rows=len(df_current), new_rows=len(df_new)):
+                    final_df = upsert_sheet_rows(df_current, current_ids, df_new, df_new['단지ID'], cols)
+
+                write_sheet(final_df)
+                load_shared_sheet.clear()
                 st.balloons()
                 st.success("✅ 저장 완료!")
                 time.sleep(1)
@@ -715,332 +1229,348 @@ with tab1:
 
 # --- TAB 2: 매매 분석 (랭킹 + AI 대화) ---
 with tab2:
-    try:
-        df_sheet = conn.read(ttl=0)
-        if not df_sheet.empty and '매매가(억)' in df_sheet.columns:
-            for c in ['층', '건축년도', '추정현재시세(억)', '지수추정시세(억)', '누적변동률(%)', '데이터신선도']:
-                if c not in df_sheet.columns: df_sheet[c] = "-" if c in ['층', '건축년도', '데이터신선도'] else 0
-
-            df_sheet['추정현재시세(억)'] = pd.to_numeric(df_sheet['추정현재시세(억)'], errors='coerce').fillna(0)
-            df_sheet.loc[df_sheet['추정현재시세(억)'] == 0, '추정현재시세(억)'] = df_sheet['매매가(억)']
-            df_sheet['지수추정시세(억)'] = pd.to_numeric(df_sheet['지수추정시세(억)'], errors='coerce').fillna(0)
-            df_sheet.loc[df_sheet['지수추정시세(억)'] == 0, '지수추정시세(억)'] = df_sheet['추정현재시세(억)']
-
-            st.header("🏆 AI 추천 랭킹 (추정 현재시세 기준)")
-            st.caption("⚠️ '추정현재시세'는 국토부 실거래가(최대 1개월 시차) + R-ONE 지수 + 상승장 안전마진으로 산출한 보수적 추정치입니다. "
-                       "실제 매수 전 아래 AI 자문의 '실시간 호가 검증'을 반드시 확인하세요.")
-            df_rank = df_sheet.copy()
-            df_rank['하락률(%)'] = df_rank.apply(lambda x: ((x['전고점(억)'] - x['추정현재시세(억)']) / x['전고점(억)'] * 100) if x.get('전고점(억)', 0) > 0 else 0, axis=1)
-            df_rank['갭(억)'] = df_rank['추정현재시세(억)'] - df_rank['전세가(억)']
-
-            with st.expander("🕵️‍♂️ 조건 설정 (필터 펼치기)", expanded=True):
-                c1, c2, c3 = st.columns(3)
-                with c1:
-                    pyung_range = st.slider("원하는 평수", 10, 80, (20, 40), step=1)
-                    exclude_small = st.checkbox("20평 미만 제외", value=True)
-                with c2: price_max = st.slider("최대 매매가 (억, 추정시세 기준)", 5, 50, 20)
-                with c3: gap_max = st.slider("최대 갭 투자금 (억)", 1, 20, 10)
-
-            df_filtered = df_rank[(df_rank['평형'] >= pyung_range[0]) & (df_rank['평형'] <= pyung_range[1])]
-            if exclude_small: df_filtered = df_filtered[df_filtered['평형'] >= 20]
-            df_filtered = df_filtered[df_filtered['추정현재시세(억)'] <= price_max]
-            df_invest_filtered = df_filtered[df_filtered['갭(억)'] <= gap_max]
-
-            regions = ["전체"] + sorted(df_filtered['지역'].astype(str).unique().tolist())
-            selected_region_rank = st.selectbox("지역별 필터", regions)
-            if selected_region_rank != "전체":
-                df_filtered = df_filtered[df_filtered['지역'] == selected_region_rank]
-                df_invest_filtered = df_invest_filtered[df_invest_filtered['지역'] == selected_region_rank]
-
-            col_r1, col_r2 = st.columns(2)
-            with col_r1:
-                st.subheader(f"🏡 실거주 추천 ({len(df_filtered)}건)")
-                if not df_filtered.empty:
-                    st.dataframe(df_filtered.sort_values(by=['하락률(%)', '입지점수'], ascending=[False, False])[['아파트명', '지역', '평형', '층', '건축년도', '매매가(억)', '추정현재시세(억)', '데이터신선도', '하락률(%)']].style.format({'매매가(억)': '{:.1f}', '추정현재시세(억)': '{:.1f}', '하락률(%)': '{:.1f}%'}), height=500, use_container_width=True)
-                else: st.info("조건에 맞는 매물이 없습니다.")
-            with col_r2:
-                st.subheader(f"💰 갭투자 추천 ({len(df_invest_filtered)}건)")
-                if not df_invest_filtered.empty:
-                    st.dataframe(df_invest_filtered.sort_values(by=['갭(억)', '입지점수'], ascending=[True, False])[['아파트명', '지역', '평형', '층', '건축년도', '추정현재시세(억)', '전세가(억)', '갭(억)', '데이터신선도']].style.format({'추정현재시세(억)': '{:.1f}', '전세가(억)': '{:.1f}', '갭(억)': '{:.1f}'}), height=500, use_container_width=True)
-                else: st.info("조건에 맞는 매물이 없습니다.")
+    @panel("랭킹 패널")
+    def ranking_panel(df_summary, summary_version, finance):
+        """랭킹 필터·표. 필터·정렬·페이지를 바꾸면 이 패널만 다시 실행된다. finance는 assess_affordability() 인자 dict."""
+        st.header("🏆 AI 추천 랭킹 (추정 현재시세 기준)")
+        st.caption("⚠️ '추정현재시세'는 국토부 실거래가(최대 1개월 시차) + R-ONE 지수 + 상승장 안전마진으로 산출한 보수적 추정치입니다. "
+                   "실제 매수 전 아래 AI 자문의 '실시간 호가 검증'을 반드시 확인하세요.")
+        rank_index = get_rank_index(summary_version, df_summary)
+
+        with st.expander("🕵️‍♂️ 조건 설정 (필터 펼치기)", expanded=True):
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                pyung_range = st.slider("원하는 평수", 10, 80, (20, 40), step=1)
+                exclude_small = st.checkbox("20평 미만 제외", value=True)
+            with c2: price_max = st.slider("최대 매매가 (억, 추정시세 기준)", 5, 50, 20)
+            with c3:
+                gap_max = st.slider("최대 갭 투자금 (억)", 1, 20, 10)
+                only_affordable = st.checkbox("대출 한도 내 단지만 (실거주)", value=False,
+                                              help="사이드바 현금·소득·금리로 LTV·DSR 한도를 계산해 매수 가능한 단지만 남깁니다.")
+
+        pyung_lo = max(pyung_range[0], 20) if exclude_small else pyung_range[0]
+        regions = [ALL_REGIONS] + available_regions(rank_index, pyung_lo, pyung_range[1], price_max)
+        selected_region_rank = st.selectbox("지역별 필터", regions)
+        # 결과는 이미 실거주(하락률↓·입지점수↓)/갭투자(갭↑·입지점수↓) 순으로 정렬되어 나온다.
+        df_filtered, df_invest_filtered = query_rankings(
+            rank_index, pyung_lo, pyung_range[1], price_max, gap_max, region=selected_region_rank
+        )
+        # 실거주 랭킹에만 자금 판정을 붙인다. 갭투자는 전세 보증금으로 조달하므로 주담대 한도와 무관하다.
+        with span("rank.afford", rows=len(df_filtered)):
+            df_filtered = assess_affordability(df_filtered, **finance)
+            if only_affordable:
+                df_filtered = df_filtered[affordable_mask(df_filtered)]
+
+        col_r1, col_r2 = st.columns(2)
+        with col_r1:
+            st.subheader(f"🏡 실거주 추천 ({len(df_filtered)}건)")
+            if not df_filtered.empty:
+                render_paged_table(
+                    df_filtered, "tbl_live",
+                    ['아파트명', '지역', '평형', '층', '건축년도', '매매가(억)', '추정현재시세(억)', '중위매매가(억)', '거래건수', '데이터신선도', '하락률(%)',
+                     '필요대출(억)', 'DSR(%)', '월상환액(만원)', '자금판정'],
+                    number_columns({'매매가(억)': '%.1f', '추정현재시세(억)': '%.1f', '중위매매가(억)': '%.1f', '하락률(%)': '%.1f%%',
+                                    '필요대출(억)': '%.1f', 'DSR(%)': '%.0f%%', '월상환액(만원)': '%.0f'}),
+                    sortable=['하락률(%)', '추정현재시세(억)', '중위매매가(억)', '거래건수', '평형', 'DSR(%)', '월상환액(만원)'], height=500,
+                )
+            else: st.info("조건에 맞는 매물이 없습니다.")
+        with col_r2:
+            st.subheader(f"💰 갭투자 추천 ({len(df_invest_filtered)}건)")
+            if not df_invest_filtered.empty:
+                render_paged_table(
+                    df_invest_filtered, "tbl_invest",
+                    ['아파트명', '지역', '평형', '층', '건축년도', '추정현재시세(억)', '전세가(억)', '갭(억)', '전세가율(%)', '데이터신선도'],
+                    number_columns({'추정현재시세(억)': '%.1f', '전세가(억)': '%.1f', '갭(억)': '%.1f', '전세가율(%)': '%.0f%%'}),
+                    sortable=['갭(억)', '전세가율(%)', '추정현재시세(억)', '평형'], height=500,
+                )
+            else: st.info("조건에 맞는 매물이 없습니다.")
+
+    @panel("매물 자문 채팅")
+    def property_chat_panel(df_summary, summary_version, finance):
+        """단건 매물 검색·심층 분석·후속 대화. finance는 assess_affordability() 인자 dict."""
+        user_cash, user_income, target_loan_rate = finance['user_cash'], finance['user_income'], finance['loan_rate_pct']
+        st.header("💬 AI 매매/갭투자 자문 (실시간 검색 탑재)")
+        # 전체 선택키 목록을 브라우저로 보내지 않고, 서버 검색 인덱스의 상위 후보만 선택 상자에 넣는다.
+        summary_search = get_summary_search_index(summary_version, df_summary)
+        last_selected = st.session_state.get('last_selected_apt_tab2')
+        search_col1, search_col2 = st.columns([1, 2])
+        with search_col1:
+            apt_query = st.text_input("상담할 매물 검색", placeholder="예: 강남구 은마, ㅇㅁ (초성)")
+        apt_candidates = df_summary['선택키'].iloc[search(summary_search, apt_query)].tolist() if apt_query else []
+        if last_selected and last_selected not in apt_candidates:
+            apt_candidates.insert(0, last_selected)
+        with search_col2:
+            selected_key = st.selectbox(
+                "검색 결과에서 매물 선택", apt_candidates,
+                index=apt_candidates.index(last_selected) if last_selected in apt_candidates else None,
+                placeholder="왼쪽에 단지명이나 지역을 입력하세요",
+            )
+
+        if 'last_selected_apt_tab2' not in st.session_state: st.session_state['last_selected_apt_tab2'] = None
+        if selected_key != st.session_state['last_selected_apt_tab2']:
+            st.session_state['messages_tab2'] = []
+            st.session_state['last_selected_apt_tab2'] = selected_key
+            st.session_state['context_prompt_tab2'] = ""
+
+        if selected_key:
+            # 추천·랭킹과 같은 자금 판정 엔진을 한 행에 적용한다.
+            target = assess_affordability(df_summary[df_summary['선택키'] == selected_key].head(1), **finance).iloc[0]
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("아파트 스펙", f"{target.get('건축년도','-')}년식 ({target.get('층','-')}층)")
+            c2.metric("추정 현재시세", f"{target['추정현재시세(억)']:.2f}억", f"직전 실거래 {target['매매가(억)']:.2f}억")
+            c3.metric("실제 전세가", f"{target['전세가(억)']:.2f}억")
+            c4.metric("데이터 신선도", target.get('데이터신선도', '❓ 미확인'))
+            st.caption(f"🏦 자금 판정: {target['자금판정']} — 필요 대출 {target['필요대출(억)']:.2f}억 / 한도 {target['대출한도(억)']:.2f}억, "
+                       f"LTV {target['LTV(%)']:.0f}%, 스트레스 DSR {target['DSR(%)']:.0f}%, 월 상환 {target['월상환액(만원)']:.0f}만원")
+
+            if st.button("🚀 매매 심층 분석 시작", type="primary"):
+                system_prompt = f"""
+                너는 최고의 부동산 투자 전문가야. 아래 팩트(국토부 실거래가 + 한국부동산원 지수 보정)를 바탕으로 사용자와 대화해줘.
+                [매물] {target['아파트명']} ({target['지역']}), {target.get('건축년도','-')}년 건축, {target.get('층','-')}층, {target['평형']}평
+                [가격 정보 — 중요]
+                - 직전 실거래가: {target['매매가(억)']}억 (거래일: {target.get('거래일', '-')})
+                - 추정 현재시세(안전마진 포함): {target['추정현재시세(억)']:.2f}억 (R-ONE 지수 누적 {target.get('누적변동률(%)', 0):+.2f}% 적용)
+                - 최근 {target['거래건수']}건 거래 중위가: {target['중위매매가(억)']:.2f}억
+                - 최근 평균 전세가: {target['전세가(억)']:.2f}억 (전세가율 {target['전세가율(%)']:.0f}%), 전고점: {target.get('전고점(억)', 0)}억
+                [재정] 현금 {user_cash}억, 연소득 {user_income}천만, 금리 {target_loan_rate}%
+                [자금 판정 — LTV·스트레스 DSR 규칙으로 계산한 값, 다시 계산하지 말고 그대로 사용] {target['자금판정']}:
+                필요 대출 {target['필요대출(억)']:.2f}억 (한도 {target['대출한도(억)']:.2f}억), LTV {target['LTV(%)']:.0f}%, DSR {target['DSR(%)']:.0f}%, 월 상환 {target['월상환액(만원)']:.0f}만원(30년 원리금균등)
+
+                🔥가장 중요한 지시사항 — 반드시 먼저 수행🔥
+                위 '추정 현재시세'는 국토부 실거래가(최대 1개월 시차)와 한국부동산원 구 평균지수(1~2주 시차)로 산출한 값이라,
+                상승장에서는 실제 현재 호가보다 낮을 수 있다. 따라서 분석 전에:
+                1. '구글 실시간 검색(Google Search)'으로 이 단지의 '현재 네이버 부동산 매물 호가'를 먼저 확인해라.
+                2. 검색한 실제 호가와 위 추정 현재시세의 괴리를 명확히 제시하고,
+                   괴리가 크면 "데이터상 가격과 실제 호가의 차이"를 사용자에게 솔직하게 경고해라.
+                3. 실제 호가 기준으로 사용자의 현금({user_cash}억)·소득으로 매수 가능한지 재평가해라.
+
+                위 호가 검증을 마친 뒤, 가격 적정성·층/연식 적합성·자금 여력을 종합 분석해줘.
+                """
+                st.session_state['context_prompt_tab2'] = system_prompt
+                with st.spinner("AI가 실시간 호가를 검색하며 입체적으로 분석 중입니다..."):
+                    # [CHANGED] 통합 헬퍼 사용. 초기 심층 분석은 검색을 강제 활성화(force_search=True).
+                    text, err = ask_gemini(system_prompt, force_search=True)
+                    if err:
+                        st.error(err)
+                    else:
+                        st.session_state['messages_tab2'].append({"role": "assistant", "content": text})
+                        rerun_panel()
+
+            if st.session_state.get('messages_tab2'):
+                save_col1, save_col2 = st.columns(2)
+                with save_col1:
+                    if st.button("💾 이 자문을 시트에 저장", key="save_tab2", use_container_width=True):
+                        full_content = "\n\n---\n\n".join([f"[{m['role']}]\n{m['content']}" for m in st.session_state['messages_tab2']])
+                        conditions_str = f"매물: {target['아파트명']}({target['평형']}평) | 현금: {user_cash}억 | 연소득: {user_income}천만"
+                        ok, info = save_advisory_log(advisory_type="매물단건", target=selected_key, conditions=conditions_str, ai_content=full_content)
+                        if ok: st.success(f"✅ 시트에 저장 완료 (누적 {info}건)")
+                        else: st.error(f"저장 실패: {info}")
+                with save_col2:
+                    md_text = export_chat_to_markdown(st.session_state['messages_tab2'], title=f"매물 자문 - {selected_key}")
+                    st.download_button("📥 마크다운 다운로드", data=md_text, file_name=f"자문_{datetime.now().strftime('%Y%m%d_%H%M')}.md", mime="text/markdown", key="dl_tab2", use_container_width=True)
+
+            for msg in st.session_state.get('messages_tab2', []):
+                with st.chat_message(msg['role']): st.markdown(msg['content'])
 
-            st.divider()
+            if prompt := st.chat_input("질문: 주변 단지와 비교해줘! 학군은 어때? 등 자유롭게 물어보세요."):
+                with st.chat_message("user"): st.markdown(prompt)
+                st.session_state['messages_tab2'].append({"role": "user", "content": prompt})
+                with st.chat_message("assistant"):
+                    message_placeholder = st.empty()
+                    # [CHANGED] 이력 윈도잉(_build_followup_prompt) + 조건부 검색 + 재시도를 헬퍼에 위임.
+                    # 전체 이력을 재구성하지 않으므로 토큰(TPM) 소모가 크게 줄어든다.
+                    ctx = st.session_state.get('context_prompt_tab2', '')
+                    if ctx:
+                        final_prompt = _build_followup_prompt(ctx, st.session_state['messages_tab2'], prompt)
+                    else:
+                        final_prompt = prompt
+                    text, err = ask_gemini(final_prompt)
+                    if err:
+                        message_placeholder.error(err)
+                    else:
+                        message_placeholder.markdown(text)
+                        st.session_state['messages_tab2'].append({"role": "assistant", "content": text})
+        else: st.info("👆 분석할 매물을 선택해주세요.")
+
+    @panel("지역 추천")
+    def recommend_panel(df_summary, summary_version, finance):
+        """
+        지역 기반 추천 조건·후보 점수·추천 대화. 가중치 슬라이더나 채팅은 이 패널만 다시 실행한다.
+        finance는 assess_affordability() 인자 dict. 자금 한도를 넘는 단지는 프롬프트에 넣기 전에 걸러낸다.
+        """
+        user_cash, user_income = finance['user_cash'], finance['user_income']
+        st.header("🎯 지역 기반 AI 단지 추천 (실시간 호가 검증 탑재)")
+        rec_col1, rec_col2 = st.columns(2)
+        with rec_col1:
+            region_options = sorted(df_summary['시군구'].unique().tolist())
+            selected_rec_region = st.selectbox("📍 추천받을 지역", region_options, index=None, placeholder="예: 서울 강남구")
+        with rec_col2:
+            rec_budget_max = st.number_input("💰 최대 예산 (억)", min_value=1.0, value=REC_DEFAULT_BUDGET, step=1.0)
+
+        rec_purposes = st.multiselect("🎯 투자 목적 (다중 선택 가능)", ["실거주 (장기보유)", "시세차익 투자", "갭투자 (전세 레버리지)", "월세 수익형"], default=["실거주 (장기보유)"])
+        weights = {}
+        if len(rec_purposes) > 1:
+            with st.expander("⚖️ 목적별 가중치 조정", expanded=True):
+                raw_weights = {}
+                cols = st.columns(len(rec_purposes))
+                default_w = round(100 / len(rec_purposes))
+                for i, p in enumerate(rec_purposes):
+                    with cols[i]: raw_weights[p] = st.slider(p, 0, 100, default_w, 5, key=f"w_{p}")
+                total_w = sum(raw_weights.values()) or 1
+                weights = {p: w / total_w for p, w in raw_weights.items()}
+        else:
+            for p in rec_purposes: weights[p] = 1.0
 
-            # --- 단건 심층 자문 ---
-            st.header("💬 AI 매매/갭투자 자문 (실시간 검색 탑재)")
-            df_sheet['선택키'] = df_sheet['지역'] + " " + df_sheet['아파트명'] + " (" + df_sheet['건축년도'].astype(str) + "년식, " + df_sheet['평형'].astype(str) + "평)"
-            apt_list = sorted(df_sheet['선택키'].dropna().unique().tolist())
-            selected_key = st.selectbox("상담할 매물 검색", apt_list, index=None, placeholder="예: 강남구 은마...")
-
-            if 'last_selected_apt_tab2' not in st.session_state: st.session_state['last_selected_apt_tab2'] = None
-            if selected_key != st.session_state['last_selected_apt_tab2']:
-                st.session_state['messages_tab2'] = []
-                st.session_state['last_selected_apt_tab2'] = selected_key
-                st.session_state['context_prompt_tab2'] = ""
-
-            if selected_key:
-                target = df_sheet[df_sheet['선택키'] == selected_key].iloc[0]
-                c1, c2, c3, c4 = st.columns(4)
-                c1.metric("아파트 스펙", f"{target.get('건축년도','-')}년식 ({target.get('층','-')}층)")
-                c2.metric("추정 현재시세", f"{target['추정현재시세(억)']:.2f}억", f"직전 실거래 {target['매매가(억)']:.2f}억")
-                c3.metric("실제 전세가", f"{target['전세가(억)']:.2f}억")
-                c4.metric("데이터 신선도", target.get('데이터신선도', '❓ 미확인'))
-
-                if st.button("🚀 매매 심층 분석 시작", type="primary"):
-                    loan_needed = target['추정현재시세(억)'] - user_cash
-                    dsr_rough = (loan_needed * (target_loan_rate / 100)) / (user_income / 10) * 100 if user_income > 0 else 0
-                    system_prompt = f"""
-                    너는 최고의 부동산 투자 전문가야. 아래 팩트(국토부 실거래가 + 한국부동산원 지수 보정)를 바탕으로 사용자와 대화해줘.
-                    [매물] {target['아파트명']} ({target['지역']}), {target.get('건축년도','-')}년 건축, {target.get('층','-')}층, {target['평형']}평
-                    [가격 정보 — 중요]
-                    - 직전 실거래가: {target['매매가(억)']}억 (거래일: {target.get('거래일', '-')})
-                    - 추정 현재시세(안전마진 포함): {target['추정현재시세(억)']:.2f}억 (R-ONE 지수 누적 {target.get('누적변동률(%)', 0):+.2f}% 적용)
-                    - 최근 평균 전세가: {target['전세가(억)']:.2f}억, 전고점: {target.get('전고점(억)', 0)}억
-                    [재정] 현금 {user_cash}억, 연소득 {user_income}천만, 금리 {target_loan_rate}%, 예상 DSR {dsr_rough:.1f}%
-
-                    🔥가장 중요한 지시사항 — 반드시 먼저 수행🔥
-                    위 '추정 현재시세'는 국토부 실거래가(최대 1개월 시차)와 한국부동산원 구 평균지수(1~2주 시차)로 산출한 값이라,
-                    상승장에서는 실제 현재 호가보다 낮을 수 있다. 따라서 분석 전에:
-                    1. '구글 실시간 검색(Google Search)'으로 이 단지의 '현재 네이버 부동산 매물 호가'를 먼저 확인해라.
-                    2. 검색한 실제 호가와 위 추정 현재시세의 괴리를 명확히 제시하고,
-                       괴리가 크면 "데이터상 가격과 실제 호가의 차이"를 사용자에게 솔직하게 경고해라.
-                    3. 실제 호가 기준으로 사용자의 현금({user_cash}억)·소득으로 매수 가능한지 재평가해라.
-
-                    위 호가 검증을 마친 뒤, 가격 적정성·층/연식 적합성·자금 여력을 종합 분석해줘.
-                    """
-                    st.session_state['context_prompt_tab2'] = system_prompt
-                    with st.spinner("AI가 실시간 호가를 검색하며 입체적으로 분석 중입니다..."):
-                        # [CHANGED] 통합 헬퍼 사용. 초기 심층 분석은 검색을 강제 활성화(force_search=True).
-                        text, err = ask_gemini(system_prompt, force_search=True)
-                        if err:
-                            st.error(err)
-                        else:
-                            st.session_state['messages_tab2'].append({"role": "assistant", "content": text})
-                            st.rerun()
-
-                if st.session_state.get('messages_tab2'):
-                    save_col1, save_col2 = st.columns(2)
-                    with save_col1:
-                        if st.button("💾 이 자문을 시트에 저장", key="save_tab2", use_container_width=True):
-                            full_content = "\n\n---\n\n".join([f"[{m['role']}]\n{m['content']}" for m in st.session_state['messages_tab2']])
-                            conditions_str = f"매물: {target['아파트명']}({target['평형']}평) | 현금: {user_cash}억 | 연소득: {user_income}천만"
-                            ok, info = save_advisory_log(advisory_type="매물단건", target=selected_key, conditions=conditions_str, ai_content=full_content)
-                            if ok: st.success(f"✅ 시트에 저장 완료 (누적 {info}건)")
-                            else: st.error(f"저장 실패: {info}")
-                    with save_col2:
-                        md_text = export_chat_to_markdown(st.session_state['messages_tab2'], title=f"매물 자문 - {selected_key}")
-                        st.download_button("📥 마크다운 다운로드", data=md_text, file_name=f"자문_{datetime.now().strftime('%Y%m%d_%H%M')}.md", mime="text/markdown", key="dl_tab2", use_container_width=True)
-
-                for msg in st.session_state.get('messages_tab2', []):
-                    with st.chat_message(msg['role']): st.markdown(msg['content'])
-
-                if prompt := st.chat_input("질문: 주변 단지와 비교해줘! 학군은 어때? 등 자유롭게 물어보세요."):
-                    with st.chat_message("user"): st.markdown(prompt)
-                    st.session_state['messages_tab2'].append({"role": "user", "content": prompt})
-                    with st.chat_message("assistant"):
-                        message_placeholder = st.empty()
-                        # [CHANGED] 이력 윈도잉(_build_followup_prompt) + 조건부 검색 + 재시도를 헬퍼에 위임.
-                        # 전체 이력을 재구성하지 않으므로 토큰(TPM) 소모가 크게 줄어든다.
-                        ctx = st.session_state.get('context_prompt_tab2', '')
-                        if ctx:
-                            final_prompt = _build_followup_prompt(ctx, st.session_state['messages_tab2'], prompt)
-                        else:
-                            final_prompt = prompt
-                        text, err = ask_gemini(final_prompt)
-                        if err:
-                            message_placeholder.error(err)
-                        else:
-                            message_placeholder.markdown(text)
-                            st.session_state['messages_tab2'].append({"role": "assistant", "content": text})
-            else: st.info("👆 분석할 매물을 선택해주세요.")
+        rec_col4, rec_col5 = st.columns(2)
+        with rec_col4: rec_pyung_range = st.slider("📐 평형 범위", 10, 80, REC_DEFAULT_PYUNG_RANGE, key="rec_pyung")
+        with rec_col5: rec_top_n = st.slider("🏆 추천 단지 수", 3, 15, 10)
+        rec_only_affordable = st.checkbox("🏦 대출 한도(LTV·DSR) 안에서 살 수 있는 단지만 추천", value=True, key="rec_affordable")
 
-            st.divider()
+        if 'messages_recommend' not in st.session_state: st.session_state['messages_recommend'] = []
+        if 'context_recommend' not in st.session_state: st.session_state['context_recommend'] = ""
 
-            # --- 지역 기반 추천 자문 ---
-            st.header("🎯 지역 기반 AI 단지 추천 (실시간 호가 검증 탑재)")
-            rec_col1, rec_col2 = st.columns(2)
-            with rec_col1:
-                df_sheet['_시군구'] = df_sheet['지역'].astype(str).str.split(' ').str[:2].str.join(' ')
-                region_options = sorted(df_sheet['_시군구'].unique().tolist())
-                selected_rec_region = st.selectbox("📍 추천받을 지역", region_options, index=None, placeholder="예: 서울 강남구")
-            with rec_col2:
-                rec_budget_max = st.number_input("💰 최대 예산 (억)", min_value=1.0, value=9.0, step=1.0)
-
-            rec_purposes = st.multiselect("🎯 투자 목적 (다중 선택 가능)", ["실거주 (장기보유)", "시세차익 투자", "갭투자 (전세 레버리지)", "월세 수익형"], default=["실거주 (장기보유)"])
-            weights = {}
-            if len(rec_purposes) > 1:
-                with st.expander("⚖️ 목적별 가중치 조정", expanded=True):
-                    raw_weights = {}
-                    cols = st.columns(len(rec_purposes))
-                    default_w = round(100 / len(rec_purposes))
-                    for i, p in enumerate(rec_purposes):
-                        with cols[i]: raw_weights[p] = st.slider(p, 0, 100, default_w, 5, key=f"w_{p}")
-                    total_w = sum(raw_weights.values()) or 1
-                    weights = {p: w / total_w for p, w in raw_weights.items()}
+        if st.button("🚀 AI 추천 분석 시작", type="primary", key="btn_recommend"):
+            if selected_rec_region is None: st.error("⚠️ 지역을 선택해 주세요.")
+            elif not rec_purposes: st.error("⚠️ 최소 1개의 투자 목적을 선택해 주세요.")
             else:
-                for p in rec_purposes: weights[p] = 1.0
-
-            rec_col4, rec_col5 = st.columns(2)
-            with rec_col4: rec_pyung_range = st.slider("📐 평형 범위", 10, 80, (20, 30), key="rec_pyung")
-            with rec_col5: rec_top_n = st.slider("🏆 추천 단지 수", 3, 15, 10)
+                # 추천 지역은 시군구('경기 성남')라 예열 수요에는 그 안의 수집된 구('경기 성남 분당' 등)로 기록한다.
+                region_areas = pd.Series(df_summary.loc[df_summary['시군구'] == selected_rec_region, '지역'].unique())
+                try: record_district_requests(LOCAL_STORE_PATH, match_districts(region_areas, DISTRICT_CODES).dropna().unique(), "추천")
+                except Exception: pass
+                # 모든 지역의 목적 점수는 조건별로 한 번만 계산되고, 여기서는 선택 지역에 가중치만 적용한다.
+                df_scored = get_scored_candidates(summary_version, tuple(rec_pyung_range), float(rec_budget_max), df_summary)
+                in_region = (df_scored['시군구'] == selected_rec_region).to_numpy()
+                with span("recommend.afford", rows=int(in_region.sum())):
+                    df_scored = assess_affordability(df_scored[in_region], **finance)
+                    if rec_only_affordable:
+                        df_scored = df_scored[affordable_mask(df_scored)]
+                if not in_region.any(): st.warning("⚠️ 조건에 맞는 단지가 없습니다.")
+                elif df_scored.empty: st.warning("⚠️ 현금·대출 한도(LTV·DSR) 안에서 살 수 있는 단지가 없습니다. 예산을 낮추거나 자금 조건을 확인하세요.")
+                else:
+                    df_top = weighted_top_n(df_scored, selected_rec_region, weights, rec_top_n)
 
-            if 'messages_recommend' not in st.session_state: st.session_state['messages_recommend'] = []
-            if 'context_recommend' not in st.session_state: st.session_state['context_recommend'] = ""
+                    if df_top.empty: st.warning("⚠️ 추천 단지가 없습니다.")
+                    else:
+                        display_cols = [c for c in ['아파트명', '지역', '평형', '층', '건축년도', '매매가(억)', '추정현재시세(억)', '전세가(억)', '갭(억)', '거래건수', '종합점수', '데이터신선도', '거래일',
+                                                    *AFFORDABILITY_COLUMNS] if c in df_top.columns]
+                        st.subheader(f"📊 1차 후보 단지 ({len(df_top)}건)")
+                        st.caption("아래는 데이터 기반 1차 후보입니다. AI가 실시간 호가를 검색해 실제 매수 가능성을 다시 검증합니다.")
+                        st.dataframe(df_top[display_cols], use_container_width=True, hide_index=True,
+                                     column_config=number_columns({'매매가(억)': '%.2f', '추정현재시세(억)': '%.2f', '전세가(억)': '%.2f', '갭(억)': '%.2f', '종합점수': '%.1f점',
+                                                                   '필요대출(억)': '%.2f', '대출한도(억)': '%.2f', 'LTV(%)': '%.0f%%', 'DSR(%)': '%.0f%%', '월상환액(만원)': '%.0f'}))
+
+                        system_prompt_rec = f"""
+                        너는 대한민국 최고의 부동산 컨설턴트야. 아래 리스트는 사용자가 수집한 실거래가 기반 데이터야.
+                        [요청] 지역: {selected_rec_region}, 예산: {rec_budget_max}억 이하, 평형: {rec_pyung_range[0]}~{rec_pyung_range[1]}평
+                        [재정] 현금: {user_cash}억, 연소득: {user_income}천만원
+                        [후보 리스트 — 필요대출·LTV·DSR·월상환액·자금판정은 스트레스 DSR 규칙으로 계산한 값이니 다시 계산하지 말고 그대로 사용]
+                        {df_top[display_cols].round(1).to_string(index=False)}
+
+                        🔥가장 중요한 지시사항 — 반드시 먼저 수행🔥
+                        위 후보 리스트의 '추정현재시세'는 국토부 실거래가(최대 1개월 시차) + 한국부동산원 구 평균지수(1~2주 시차)로 산출한 값이라,
+                        상승장에서는 실제 현재 호가보다 낮을 수 있다. 따라서:
+                        1. BEST 후보로 꼽으려는 단지들에 대해 '구글 실시간 검색(Google Search)'으로
+                           네이버 부동산 등의 '현재 매물 호가'를 반드시 먼저 확인해라.
+                        2. 검색한 실제 호가와 리스트의 추정현재시세 간 괴리를 표로 명확히 제시하고,
+                           괴리가 큰 단지는 "데이터상 예산 내이나 실제 호가는 예산 초과 가능성"이라고 솔직하게 경고해라.
+                        3. 실제 호가 기준으로도 사용자의 예산({rec_budget_max}억)과 현금({user_cash}억) 안에 들어오는
+                           단지를 우선 추천해라. 데이터상으로만 저렴해 보이는 단지를 추천하지 마라.
+
+                        위 검증을 마친 뒤, 실제 매수 가능성이 높은 BEST 1~2곳을 뽑고
+                        각 단지의 장단점과 자금 조달 시나리오를 구체적으로 짜줘.
+                        """
+                        st.session_state['context_recommend'] = system_prompt_rec
+                        st.session_state['messages_recommend'] = []
+                        with st.spinner("AI가 실시간 호가를 검색하며 다중 목적 종합 분석 중입니다..."):
+                            # [CHANGED] 통합 헬퍼 사용 + 초기 분석은 검색 강제 활성화.
+                            text, err = ask_gemini(system_prompt_rec, force_search=True)
+                            if err:
+                                st.error(err)
+                            else:
+                                st.session_state['messages_recommend'].append({"role": "assistant", "content": text})
+                                rerun_panel()
+
+        if st.session_state.get('messages_recommend'):
+            st.divider()
+            st.subheader("💬 AI 추천 분석 결과 및 후속 상담")
+            rec_save_col1, rec_save_col2 = st.columns(2)
+            with rec_save_col1:
+                if st.button("💾 이 추천 분석을 시트에 저장", key="save_recommend", use_container_width=True):
+                    full_content = "\n\n---\n\n".join([f"[{m['role']}]\n{m['content']}" for m in st.session_state['messages_recommend']])
+                    conditions_str = f"지역: {selected_rec_region} | 예산: {rec_budget_max}억"
+                    ok, info = save_advisory_log(advisory_type="지역추천", target=selected_rec_region, conditions=conditions_str, ai_content=full_content)
+                    if ok: st.success("✅ 시트에 저장 완료")
+                    else: st.error("저장 실패")
+            with rec_save_col2:
+                md_text = export_chat_to_markdown(st.session_state['messages_recommend'], title=f"지역 추천 자문 - {selected_rec_region}")
+                st.download_button("📥 마크다운 다운로드", data=md_text, file_name=f"추천_{datetime.now().strftime('%Y%m%d_%H%M')}.md", mime="text/markdown", key="dl_recommend", use_container_width=True)
+
+            for msg in st.session_state['messages_recommend']:
+                with st.chat_message(msg['role']): st.markdown(msg['content'])
 
-            if st.button("🚀 AI 추천 분석 시작", type="primary", key="btn_recommend"):
-                if selected_rec_region is None: st.error("⚠️ 지역을 선택해 주세요.")
-                elif not rec_purposes: st.error("⚠️ 최소 1개의 투자 목적을 선택해 주세요.")
-                else:
-                    df_candidates = df_sheet[(df_sheet['_시군구'] == selected_rec_region) & (df_sheet['평형'] >= rec_pyung_range[0]) & (df_sheet['평형'] <= rec_pyung_range[1]) & (df_sheet['추정현재시세(억)'] <= rec_budget_max) & (df_sheet['추정현재시세(억)'] > 0)].copy()
-                    if df_candidates.empty: st.warning("⚠️ 조건에 맞는 단지가 없습니다.")
+            if rec_prompt := st.chat_input("추천 결과에 대한 외부 단지 비교, 검색 등 후속 질문", key="chat_recommend"):
+                with st.chat_message("user"): st.markdown(rec_prompt)
+                st.session_state['messages_recommend'].append({"role": "user", "content": rec_prompt})
+                with st.chat_message("assistant"):
+                    msg_placeholder = st.empty()
+                    # [CHANGED] 이력 윈도잉 + 조건부 검색 + 재시도를 헬퍼에 위임.
+                    final_prompt = _build_followup_prompt(
+                        st.session_state['context_recommend'],
+                        st.session_state['messages_recommend'],
+                        rec_prompt,
+                    )
+                    text, err = ask_gemini(final_prompt)
+                    if err:
+                        msg_placeholder.error(err)
                     else:
-                        df_candidates['갭(억)'] = df_candidates['추정현재시세(억)'] - df_candidates['전세가(억)']
-                        def normalize(series, ascending=False):
-                            if series.empty or series.max() == series.min(): return pd.Series([50] * len(series), index=series.index)
-                            normalized = (series - series.min()) / (series.max() - series.min()) * 100
-                            return (100 - normalized) if ascending else normalized
-
-                        if "실거주 (장기보유)" in rec_purposes:
-                            age_score = normalize(2026 - pd.to_numeric(df_candidates['건축년도'], errors='coerce').fillna(1990), ascending=True)
-                            df_candidates['_점수_실거주'] = (normalize(df_candidates['입지점수']) * 0.6 + age_score * 0.4)
-                        else: df_candidates['_점수_실거주'] = 0
-
-                        if "시세차익 투자" in rec_purposes:
-                            df_candidates['하락률(%)'] = df_candidates.apply(lambda x: ((x['전고점(억)'] - x['추정현재시세(억)']) / x['전고점(억)'] * 100) if x.get('전고점(억)', 0) > 0 else 0, axis=1)
-                            df_candidates['_점수_시세차익'] = (normalize(df_candidates['하락률(%)']) * 0.7 + normalize(df_candidates['입지점수']) * 0.3)
-                        else: df_candidates['_점수_시세차익'] = 0
-
-                        if "갭투자 (전세 레버리지)" in rec_purposes:
-                            df_gap = df_candidates[df_candidates['갭(억)'] > 0]
-                            df_candidates['_점수_갭투자'] = 0.0
-                            if not df_gap.empty: df_candidates.loc[df_gap.index, '_점수_갭투자'] = (normalize(df_gap['갭(억)'], ascending=True) * 0.7 + normalize(df_gap['입지점수']) * 0.3)
-                        else: df_candidates['_점수_갭투자'] = 0
-
-                        if "월세 수익형" in rec_purposes:
-                            df_candidates['연수익률(%)'] = df_candidates.apply(lambda x: (x['월세액(만원)'] * 12 / 10000) / x['추정현재시세(억)'] * 100 if x['추정현재시세(억)'] > 0 and x['월세액(만원)'] > 0 else 0, axis=1)
-                            df_candidates['_점수_월세'] = normalize(df_candidates['연수익률(%)'])
-                        else: df_candidates['_점수_월세'] = 0
-
-                        score_map = {"실거주 (장기보유)": '_점수_실거주', "시세차익 투자": '_점수_시세차익', "갭투자 (전세 레버리지)": '_점수_갭투자', "월세 수익형": '_점수_월세'}
-                        df_candidates['종합점수'] = sum(df_candidates[score_map[p]] * w for p, w in weights.items())
-                        df_top = df_candidates.sort_values(by='종합점수', ascending=False).head(rec_top_n)
-
-                        if df_top.empty: st.warning("⚠️ 추천 단지가 없습니다.")
-                        else:
-                            display_cols = [c for c in ['아파트명', '지역', '평형', '층', '건축년도', '매매가(억)', '추정현재시세(억)', '전세가(억)', '갭(억)', '종합점수', '데이터신선도', '거래일'] if c in df_top.columns]
-                            st.subheader(f"📊 1차 후보 단지 ({len(df_top)}건)")
-                            st.caption("아래는 데이터 기반 1차 후보입니다. AI가 실시간 호가를 검색해 실제 매수 가능성을 다시 검증합니다.")
-                            st.dataframe(df_top[display_cols].style.format({'매매가(억)': '{:.2f}', '추정현재시세(억)': '{:.2f}', '전세가(억)': '{:.2f}', '갭(억)': '{:.2f}', '종합점수': '{:.1f}점'}), use_container_width=True, hide_index=True)
-
-                            system_prompt_rec = f"""
-                            너는 대한민국 최고의 부동산 컨설턴트야. 아래 리스트는 사용자가 수집한 실거래가 기반 데이터야.
-                            [요청] 지역: {selected_rec_region}, 예산: {rec_budget_max}억 이하, 평형: {rec_pyung_range[0]}~{rec_pyung_range[1]}평
-                            [재정] 현금: {user_cash}억, 연소득: {user_income}천만원
-                            [후보 리스트] {df_top[display_cols].to_string(index=False)}
-
-                            🔥가장 중요한 지시사항 — 반드시 먼저 수행🔥
-                            위 후보 리스트의 '추정현재시세'는 국토부 실거래가(최대 1개월 시차) + 한국부동산원 구 평균지수(1~2주 시차)로 산출한 값이라,
-                            상승장에서는 실제 현재 호가보다 낮을 수 있다. 따라서:
-                            1. BEST 후보로 꼽으려는 단지들에 대해 '구글 실시간 검색(Google Search)'으로
-                               네이버 부동산 등의 '현재 매물 호가'를 반드시 먼저 확인해라.
-                            2. 검색한 실제 호가와 리스트의 추정현재시세 간 괴리를 표로 명확히 제시하고,
-                               괴리가 큰 단지는 "데이터상 예산 내이나 실제 호가는 예산 초과 가능성"이라고 솔직하게 경고해라.
-                            3. 실제 호가 기준으로도 사용자의 예산({rec_budget_max}억)과 현금({user_cash}억) 안에 들어오는
-                               단지를 우선 추천해라. 데이터상으로만 저렴해 보이는 단지를 추천하지 마라.
-
-                            위 검증을 마친 뒤, 실제 매수 가능성이 높은 BEST 1~2곳을 뽑고
-                            각 단지의 장단점과 자금 조달 시나리오를 구체적으로 짜줘.
-                            """
-                            st.session_state['context_recommend'] = system_prompt_rec
-                            st.session_state['messages_recommend'] = []
-                            with st.spinner("AI가 실시간 호가를 검색하며 다중 목적 종합 분석 중입니다..."):
-                                # [CHANGED] 통합 헬퍼 사용 + 초기 분석은 검색 강제 활성화.
-                                text, err = ask_gemini(system_prompt_rec, force_search=True)
-                                if err:
-                                    st.error(err)
-                                else:
-                                    st.session_state['messages_recommend'].append({"role": "assistant", "content": text})
-                                    st.rerun()
-
-            if st.session_state.get('messages_recommend'):
-                st.divider()
-                st.subheader("💬 AI 추천 분석 결과 및 후속 상담")
-                rec_save_col1, rec_save_col2 = st.columns(2)
-                with rec_save_col1:
-                    if st.button("💾 이 추천 분석을 시트에 저장", key="save_recommend", use_container_width=True):
-                        full_content = "\n\n---\n\n".join([f"[{m['role']}]\n{m['content']}" for m in st.session_state['messages_recommend']])
-                        conditions_str = f"지역: {selected_rec_region} | 예산: {rec_budget_max}억"
-                        ok, info = save_advisory_log(advisory_type="지역추천", target=selected_rec_region, conditions=conditions_str, ai_content=full_content)
-                        if ok: st.success("✅ 시트에 저장 완료")
-                        else: st.error("저장 실패")
-                with rec_save_col2:
-                    md_text = export_chat_to_markdown(st.session_state['messages_recommend'], title=f"지역 추천 자문 - {selected_rec_region}")
-                    st.download_button("📥 마크다운 다운로드", data=md_text, file_name=f"추천_{datetime.now().strftime('%Y%m%d_%H%M')}.md", mime="text/markdown", key="dl_recommend", use_container_width=True)
-
-                for msg in st.session_state['messages_recommend']:
-                    with st.chat_message(msg['role']): st.markdown(msg['content'])
-
-                if rec_prompt := st.chat_input("추천 결과에 대한 외부 단지 비교, 검색 등 후속 질문", key="chat_recommend"):
-                    with st.chat_message("user"): st.markdown(rec_prompt)
-                    st.session_state['messages_recommend'].append({"role": "user", "content": rec_prompt})
-                    with st.chat_message("assistant"):
-                        msg_placeholder = st.empty()
-                        # [CHANGED] 이력 윈도잉 + 조건부 검색 + 재시도를 헬퍼에 위임.
-                        final_prompt = _build_followup_prompt(
-                            st.session_state['context_recommend'],
-                            st.session_state['messages_recommend'],
-                            rec_prompt,
-                        )
-                        text, err = ask_gemini(final_prompt)
-                        if err:
-                            msg_placeholder.error(err)
-                        else:
-                            msg_placeholder.markdown(text)
-                            st.session_state['messages_recommend'].append({"role": "assistant", "content": text})
+                        msg_placeholder.markdown(text)
+                        st.session_state['messages_recommend'].append({"role": "assistant", "content": text})
+
+    try:
+        df_sheet = load_shared_sheet()[0]
+        if not df_sheet.empty and '매매가(억)' in df_sheet.columns:
+            # 랭킹·매물 선택·추천은 거래 행이 아니라 단지×평형 요약(한 단지·평형당 1행)을 기준으로 한다.
+            df_summary, summary_version = get_complex_summary(df_sheet)
+            finance = dict(user_cash=user_cash, user_income=user_income, loan_rate_pct=target_loan_rate,
+                           is_homeless=is_homeless, is_first_time=is_first_time)
+            ranking_panel(df_summary, summary_version, finance)
+            st.divider()
+            property_chat_panel(df_summary, summary_version, finance)
+            st.divider()
+            recommend_panel(df_summary, summary_version, finance)
 
     except Exception as e: st.error(f"오류: {e}")
 
 # --- TAB 3: 서울 청약 일정 및 자문 ---
 with tab3:
-    st.header("📅 서울 아파트 청약 추천 및 컨설팅 (실시간 검색 탑재)")
-    st.info("💡 실시간 청약 공고 + 웹 검색을 통해 정확한 분양가와 주변 시세를 찾아 분석해 드립니다.")
-
-    if st.button("🔄 최신 서울 청약 일정 불러오기", type="primary"):
-        with st.spinner("청약홈 서버에서 서울 지역 공고를 가져오는 중입니다..."):
-            df_apply = fetch_applyhome_data(api_key_decoded)
-            st.session_state['apply_data'] = df_apply
-            st.session_state['messages_tab3'] = []
-
-    if 'apply_data' in st.session_state:
-        df_apply = st.session_state['apply_data']
-        if df_apply is not None and not df_apply.empty:
-            st.success(f"✅ 총 {len(df_apply)}건의 진행/예정 중인 서울 청약 공고를 찾았습니다!")
-            st.dataframe(df_apply, use_container_width=True, hide_index=True)
-            st.divider()
-
-            st.subheader("🤖 AI 청약 맞춤형 분석 및 전략 추천")
-            if 'messages_tab3' not in st.session_state: st.session_state['messages_tab3'] = []
-
-            if st.button("✨ 내 조건에 맞는 단지 추천 및 자문 시작", type="primary"):
-                apply_summary = df_apply[['아파트명(청약단지)', '지역(공급위치)', '공급규모(세대)', '청약시작일']].to_string(index=False)
-                homeless_str = f"무주택 {homeless_years}년" if is_homeless else "유주택자"
-                newlywed_str = "신혼부부(O)" if is_newlywed else "신혼부부(X)"
-                first_time_str = "생애최초(O)" if is_first_time else "생애최초(X)"
+    @panel("청약 자문 채팅")
+    def applyhome_chat_panel(df_evaluated, user_cash, user_income, target_loan_rate, applicant):
+        """청약 공고 기반 자문 시작·후속 대화. 채팅 입력은 이 패널만 다시 실행한다."""
+        st.subheader("🤖 AI 청약 맞춤형 분석 및 전략 추천")
+        if 'messages_tab3' not in st.session_state: st.session_state['messages_tab3'] = []
+
+        if st.button("✨ 내 조건에 맞는 단지 추천 및 자문 시작", type="primary"):
+            # 가점·특공 자격은 로컬에서 계산이 끝났으므로, 마감되지 않은 적합도 상위 공고만 계산 결과와 함께 보낸다.
+            df_short = shortlist_announcements(df_evaluated, SHORTLIST_SIZE)
+            if df_short.empty:
+                st.warning("⚠️ 접수 중이거나 예정된 공고가 없습니다.")
+            else:
+                apply_summary = df_short[['아파트명(청약단지)', '지역(공급위치)', '공급규모(세대)', '청약시작일', '접수상태',
+                                          '1순위', '추천전형']].to_string(index=False)
 
                 system_prompt_tab3 = f"""
                 너는 최고의 부동산 청약 및 특별공급 전문가야.
-                [현재 청약 공고 리스트]
+                [후보 청약 공고] (마감 제외, 자격 적합도 상위 {len(df_short)}건 / 전체 {len(df_evaluated)}건)
                 {apply_summary}
                 [사용자 스펙]
                 - 자본: 현금 {user_cash}억 원 / 연소득 {user_income}천만 원 / 대출금리 {target_loan_rate}%
-                - 특공조건: {homeless_str}, {newlywed_str}, {first_time_str}, 미성년 자녀 수 {children_count}명
-                - 청약통장: 가입기간 {sub_account_years}년
+                - 가점·특공 자격(규칙 기반 계산 결과, 다시 계산하지 말고 그대로 사용): {describe_applicant(applicant, user_income * 1e7, URBAN_MONTHLY_INCOME_WON)}
 
                 🔥중요 지시사항🔥
                 이 API 공고에는 분양가가 없습니다. 반드시 네게 내장된 '구글 실시간 검색(Google Search)'을 통해
-                위 리스트에 있는 주요 아파트들의 최신 예상 분양가, 주변 단지 시세(안전마진 확인), 경쟁률 등을 적극 검색해서 상세한 전략을 짜줘.
+                위 후보 아파트들의 최신 예상 분양가, 주변 단지 시세(안전마진 확인), 경쟁률 등을 적극 검색해서 상세한 전략을 짜줘.
 
-                1. 맞춤형 전형 추천 (가점제/추첨제/특공)
+                1. 계산된 가점·특공 자격 기준 전형별 전략 (예상 커트라인·경쟁률 대비)
                 2. 추천 단지 BEST 2
                 3. 검색한 예상 분양가 기반의 자금 조달 시나리오
                 """
@@ -1053,71 +1583,242 @@ with tab3:
                         st.error(err)
                     else:
                         st.session_state['messages_tab3'] = [{"role": "assistant", "content": text}]
-                        st.rerun()
-
-            if st.session_state.get('messages_tab3'):
-                t3_save_col1, t3_save_col2 = st.columns(2)
-                with t3_save_col1:
-                    if st.button("💾 이 청약 자문을 시트에 저장", key="save_tab3", use_container_width=True):
-                        full_content = "\n\n---\n\n".join([f"[{m['role']}]\n{m['content']}" for m in st.session_state['messages_tab3']])
-                        ok, info = save_advisory_log(advisory_type="청약", target=f"서울 청약 ({datetime.now().strftime('%Y-%m')})", conditions=f"자금 {user_cash}억", ai_content=full_content)
-                        if ok: st.success("✅ 시트에 저장 완료")
-                with t3_save_col2:
-                    md_text = export_chat_to_markdown(st.session_state['messages_tab3'], title="서울 청약 자문")
-                    st.download_button("📥 마크다운 다운로드", data=md_text, file_name=f"청약자문_{datetime.now().strftime('%Y%m%d_%H%M')}.md", mime="text/markdown", key="dl_tab3", use_container_width=True)
-
-            for msg in st.session_state.get('messages_tab3', []):
-                with st.chat_message(msg['role']): st.markdown(msg['content'])
+                        rerun_panel()
+
+        if st.session_state.get('messages_tab3'):
+            t3_save_col1, t3_save_col2 = st.columns(2)
+            with t3_save_col1:
+                if st.button("💾 이 청약 자문을 시트에 저장", key="save_tab3", use_container_width=True):
+                    full_content = "\n\n---\n\n".join([f"[{m['role']}]\n{m['content']}" for m in st.session_state['messages_tab3']])
+                    ok, info = save_advisory_log(advisory_type="청약", target=f"서울 청약 ({datetime.now().strftime('%Y-%m')})", conditions=f"자금 {user_cash}억", ai_content=full_content)
+                    if ok: st.success("✅ 시트에 저장 완료")
+            with t3_save_col2:
+                md_text = export_chat_to_markdown(st.session_state['messages_tab3'], title="서울 청약 자문")
+                st.download_button("📥 마크다운 다운로드", data=md_text, file_name=f"청약자문_{datetime.now().strftime('%Y%m%d_%H%M')}.md", mime="text/markdown", key="dl_tab3", use_container_width=True)
+
+        for msg in st.session_state.get('messages_tab3', []):
+            with st.chat_message(msg['role']): st.markdown(msg['content'])
+
+        if prompt := st.chat_input("청약 단지의 분양가, 주변 다른 단지와의 비교를 자유롭게 질문하세요!"):
+            with st.chat_message("user"): st.markdown(prompt)
+            st.session_state['messages_tab3'].append({"role": "user", "content": prompt})
+
+            with st.chat_message("assistant"):
+                message_placeholder = st.empty()
+                # [CHANGED] 이력 윈도잉 + 조건부 검색 + 재시도를 헬퍼에 위임.
+                ctx = st.session_state.get('context_prompt_tab3', '')
+                if ctx:
+                    final_prompt = _build_followup_prompt(ctx, st.session_state['messages_tab3'], prompt)
+                else:
+                    final_prompt = prompt
+                text, err = ask_gemini(final_prompt)
+                if err:
+                    message_placeholder.error(err)
+                else:
+                    message_placeholder.markdown(text)
+                    st.session_state['messages_tab3'].append({"role": "assistant", "content": text})
 
-            if prompt := st.chat_input("청약 단지의 분양가, 주변 다른 단지와의 비교를 자유롭게 질문하세요!"):
-                with st.chat_message("user"): st.markdown(prompt)
-                st.session_state['messages_tab3'].append({"role": "user", "content": prompt})
+    st.header("📅 서울 아파트 청약 추천 및 컨설팅 (실시간 검색 탑재)")
+    st.info("💡 실시간 청약 공고 + 웹 검색을 통해 정확한 분양가와 주변 시세를 찾아 분석해 드립니다.")
 
-                with st.chat_message("assistant"):
-                    message_placeholder = st.empty()
-                    # [CHANGED] 이력 윈도잉 + 조건부 검색 + 재시도를 헬퍼에 위임.
-                    ctx = st.session_state.get('context_prompt_tab3', '')
-                    if ctx:
-                        final_prompt = _build_followup_prompt(ctx, st.session_state['messages_tab3'], prompt)
-                    else:
-                        final_prompt = prompt
-                    text, err = ask_gemini(final_prompt)
-                    if err:
-                        message_placeholder.error(err)
-                    else:
-                        message_placeholder.markdown(text)
-                        st.session_state['messages_tab3'].append({"role": "assistant", "content": text})
+    # 로컬 저장소에 이미 동기화된 공고가 있으면 API 호출 없이 즉시 표시한다.
+    # 공고 프레임은 프로세스 공유본이고, 세션에는 불러오기 상태만 남긴다.
+    if 'apply_status' not in st.session_state and not load_shared_applyhome().empty:
+        st.session_state['apply_status'] = "ok"
 
-        elif df_apply is not None and df_apply.empty: st.warning("현재 진행 중인 서울 청약 공고가 없습니다.")
+    if st.button("🔄 최신 서울 청약 일정 불러오기", type="primary"):
+        with st.spinner("청약홈 서버에서 새로 올라온 서울 지역 공고만 가져오는 중입니다..."):
+            df_apply = fetch_applyhome_data(api_key_decoded)
+            st.session_state['apply_status'] = "failed" if df_apply is None else "ok"
+            st.session_state['messages_tab3'] = []
+
+    if 'apply_status' in st.session_state:
+        # 새로고침이 실패해도 저장소에 있던 공고는 그대로 보여 준다.
+        df_apply = load_shared_applyhome()
+        if st.session_state['apply_status'] == "failed" and not df_apply.empty:
+            st.warning("⚠️ 청약홈에서 새 공고를 불러오지 못했습니다. 저장소에 있던 공고를 보여 드립니다.")
+        if not df_apply.empty:
+            applicant = dict(is_homeless=is_homeless, homeless_years=homeless_years, is_newlywed=is_newlywed,
+                             is_first_time=is_first_time, children_count=children_count, sub_account_years=sub_account_years)
+            # 가점·특별공급 자격은 규칙 기반으로 모든 공고에 한 번에 계산한다(AI에는 결과만 보낸다).
+            with span("applyhome.evaluate", rows=len(df_apply)):
+                df_evaluated = evaluate_announcements(df_apply, applicant, user_income * 1e7, URBAN_MONTHLY_INCOME_WON)
+            # 저장소는 최근 1년(모집공고일 기준) 공고를 모두 돌려주므로 마감된 공고도 섞여 있다.
+            open_count = int(df_evaluated['접수상태'].isin(("접수중", "접수예정")).sum())
+            st.success(f"✅ 최근 1년 서울 청약 공고 {len(df_evaluated)}건을 불러왔습니다 (접수중·접수예정 {open_count}건).")
+            st.info(f"🧮 {describe_applicant(applicant, user_income * 1e7, URBAN_MONTHLY_INCOME_WON)}")
+            st.caption("가점·특공 자격은 입력값으로 계산한 참고치입니다(부양가족은 배우자·자녀만 반영, 외벌이 소득 기준). 최종 자격은 모집공고문으로 확인하세요.")
+            show_cols = [c for c in df_evaluated.columns if c not in ('투기과열지구', '조정대상지역', '분양가상한제', '적합도')]
+            st.dataframe(df_evaluated[show_cols], use_container_width=True, hide_index=True)
+            st.divider()
+
+            applyhome_chat_panel(df_evaluated, user_cash, user_income, target_loan_rate, applicant)
+
+        elif st.session_state['apply_status'] == "ok": st.warning("최근 1년 서울 청약 공고가 없습니다.")
         else: st.error("🚨 청약 데이터를 불러오지 못했습니다.")
 
 # --- TAB 4: AI 자문 이력 조회 ---
 with tab4:
     st.header("📚 AI 자문 이력 아카이브")
     st.info("💡 시트에 저장된 모든 AI 자문 이력을 조회하고 시계열로 분석합니다.")
-    try:
-        conn_view = st.connection("gsheets", type=GSheetsConnection)
-        try: df_history = conn_view.read(worksheet="AI자문이력", ttl=0)
-        except Exception: df_history = pd.DataFrame()
+    @panel("자문 이력")
+    def history_panel():
+        """이력 필터·검색. 필터를 바꾸면 이 패널만 다시 실행된다."""
+        try:
+            try: sync_advisory_index()
+            except Exception as e: st.caption(f"⚠️ 시트 동기화 실패 — 로컬 색인에 있는 이력만 조회합니다. ({e})")
 
-        if df_history is None or df_history.empty:
-            st.warning("저장된 자문 이력이 없습니다.")
-        else:
-            df_history = df_history.dropna(subset=['저장일시']).sort_values(by='저장일시', ascending=False)
-            col_f1, col_f2, col_f3 = st.columns(3)
-            with col_f1: filter_type = st.selectbox("자문 유형 필터", ["전체"] + sorted(df_history['자문유형'].dropna().unique().tolist()))
-            with col_f2: search_target = st.text_input("대상 검색", placeholder="예: 강남구")
-            with col_f3: show_count = st.slider("표시 건수", 5, 50, 20)
-
-            df_view = df_history.copy()
-            if filter_type != "전체": df_view = df_view[df_view['자문유형'] == filter_type]
-            if search_target: df_view = df_view[df_view['대상'].astype(str).str.contains(search_target, na=False)]
-            df_view = df_view.head(show_count)
-            st.caption(f"📊 총 {len(df_history)}건 중 {len(df_view)}건 표시")
-
-            for idx, row in df_view.iterrows():
-                with st.expander(f"🗓️ {row['저장일시']} | [{row['자문유형']}] {row['대상']}", expanded=False):
-                    st.markdown(f"**📋 분석 시점 조건**: {row['사용자조건']}")
-                    st.divider()
-                    st.markdown(row['AI분석내용'])
-    except Exception as e: st.error(f"이력 조회 오류: {e}")
+            kinds, indexed_count = advisory_kinds(LOCAL_STORE_PATH)
+            if indexed_count == 0:
+                st.warning("저장된 자문 이력이 없습니다.")
+            else:
+                col_f1, col_f2, col_f3 = st.columns(3)
+                with col_f1: filter_type = st.selectbox("자문 유형 필터", ["전체"] + kinds)
+                with col_f2: search_text = st.text_input("검색 (대상·조건·질문·분석 내용)", placeholder="예: 강남구 학군")
+                with col_f3: show_count = st.slider("페이지당 건수", 5, 50, 20)
+
+                # 목록은 현재 페이지의 일시·유형·대상만 읽고, 본문은 항목을 펼칠 때 한 건씩 읽는다.
+                kind = None if filter_type == "전체" else filter_type
+                started = time.perf_counter()
+                match_count = count_advisories(LOCAL_STORE_PATH, search_text, kind=kind)
+                total_pages = page_count(match_count, show_count)
+                page = st.number_input(f"페이지 (총 {total_pages})", 1, total_pages, 1, key="history_page") if total_pages > 1 else 1
+                df_page = search_advisories(LOCAL_STORE_PATH, search_text, kind=kind, page=page, page_size=show_count)
+                st.caption(f"📊 총 {indexed_count}건 중 {match_count}건 일치 · {page}/{total_pages} 페이지 "
+                           f"(조회 {(time.perf_counter() - started) * 1000:.0f}ms)")
+
+                # st.expander는 펼침 여부를 서버에 알리지 않으므로, 펼침 토글이 켜진 항목만 본문을 읽는다.
+                for row in df_page.itertuples(index=False):
+                    if st.toggle(f"🗓️ {row.saved_at} | [{row.kind}] {row.target}", key=f"history_open_{row.id}"):
+                        body = load_advisory_body(LOCAL_STORE_PATH, row.id)
+                        if body is None: continue
+                        with st.container(border=True):
+                            st.markdown(f"**📋 분석 시점 조건**: {body['conditions']}")
+                            if body['question']: st.markdown(f"**❓ 사용자 질문**: {body['question']}")
+                            st.divider()
+                            st.markdown(body['content'])
+        except Exception as e: st.error(f"이력 조회 오류: {e}")
+
+    history_panel()
+
+# --------------------------------------------------------------------------
+# [4] 세션 메모리 사용량 (공유 데이터셋 도입 전후 비교)
+# --------------------------------------------------------------------------
+with st.sidebar:
+    with st.expander("🧮 메모리 사용량", expanded=False):
+        session_bytes = session_memory_bytes(st.session_state)
+        shared_entries = []
+        if fetched_entry is not None: shared_entries.append(("수집 결과", fetched_entry[1]))
+        try: shared_entries.append(("시트 데이터", load_shared_sheet()[1]))
+        except Exception: pass
+        legacy_bytes = session_bytes + sum(meta["original_bytes"] for _, meta in shared_entries)
+        st.caption(f"세션당 메모리: 이전 방식(세션별 DataFrame 사본) 약 {format_bytes(legacy_bytes)} → 현재 {format_bytes(session_bytes)}")
+        for label, meta in shared_entries:
+            st.caption(f"공유 {label}: {format_bytes(meta['original_bytes'])} → 압축 {format_bytes(meta['compact_bytes'])} (모든 세션이 1부 공유)")
+
+# --------------------------------------------------------------------------
+# [5] 재실행 지연 (전체 실행 vs 패널 부분 재실행)
+# --------------------------------------------------------------------------
+record_rerun_latency(FULL_RUN_LABEL, time.perf_counter() - _script_started)
+with st.sidebar:
+    with st.expander("⏱️ 재실행 지연", expanded=False):
+        st.caption("전체 실행은 스크립트 전체, 나머지는 해당 패널만 다시 실행된 경우의 서버 처리 시간입니다. (프로세스 누적, 최근 측정 기준)")
+        st.dataframe(rerun_latency_summary(), hide_index=True, use_container_width=True,
+                     column_config=number_columns({'중앙값(ms)': '%.0f', 'p95(ms)': '%.0f'}))
+
+# --------------------------------------------------------------------------
+# [6] 구간별 진단 (수집·분석 파이프라인 구간 추적)
+#   - 구간 기록은 항상 켜져 있고(tracing 참고), 표·내보내기 데이터는 진단 보기를 켠 경우에만 만든다.
+# --------------------------------------------------------------------------
+if METRICS_EXPORT_PATH:
+    try: write_metrics_file(METRICS_EXPORT_PATH)
+    except Exception: pass
+
+@panel("구간별 진단")
+def diagnostics_panel():
+    """구간별 소요 시간 요약·이벤트 카운터·최근 구간과 지표 내보내기."""
+    st.caption("API 호출·재시도 대기·XML 파싱·시세 추정·시트 입출력·Gemini 호출의 소요 시간입니다. (프로세스 누적)")
+    if not st.toggle("진단 데이터 보기", key="diag_open"):
+        return
+    st.dataframe(pd.DataFrame(span_summary(), columns=["구간", "상태", "횟수", "합계(s)", "평균(ms)", "p50(ms)", "p95(ms)", "최대(ms)"]),
+                 hide_index=True, use_container_width=True,
+                 column_config=number_columns({'합계(s)': '%.2f', '평균(ms)': '%.1f', 'p50(ms)': '%.1f', 'p95(ms)': '%.1f', '최대(ms)': '%.1f'}))
+    counters = counter_summary()
+    if counters:
+        st.dataframe(pd.DataFrame(counters), hide_index=True, use_container_width=True)
+    recent = [
+        {"시각": datetime.fromtimestamp(r["started_at"]).strftime("%H:%M:%S.%f")[:-3], "구간": r["name"],
+         "ID": r["id"], "부모": r["parent_id"], "ms": r["seconds"] * 1000, "상태": r["status"],
+         "속성": ", ".join(f"{k}={v}" for k, v in r["attrs"].items())}
+        for r in recent_spans(100)
+    ]
+    st.dataframe(pd.DataFrame(recent), hide_index=True, use_container_width=True, height=300,
+                 column_config=number_columns({'ms': '%.1f'}))
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    dl_col1, dl_col2 = st.columns(2)
+    with dl_col1:
+        st.download_button("📥 JSON", data=metrics_json(), file_name=f"metrics_{stamp}.json", mime="application/json",
+                           key="dl_metrics_json", use_container_width=True)
+    with dl_col2:
+        st.download_button("📥 Prometheus", data=metrics_prometheus(), file_name=f"metrics_{stamp}.prom", mime="text/plain",
+                           key="dl_metrics_prom", use_container_width=True)
+
+with st.sidebar:
+    with st.expander("🩺 구간별 진단", expanded=False):
+        diagnostics_panel()
+
+# --------------------------------------------------------------------------
+# [7] 캐시 예열 상태 (예약 시각·최근 실행·오늘 API 호출 수·구별 수요)
+# --------------------------------------------------------------------------
+@panel("캐시 예열")
+def prewarm_panel():
+    """예열 예약·최근 실행 결과와 수동 실행. 수동 실행은 백그라운드 스레드에서 돌고, 이 패널은 결과만 읽는다."""
+    state = _prewarm_state()
+    if not PREWARM_ENABLED:
+        st.caption("예약 예열이 꺼져 있습니다(기본값). secrets에 PREWARM_ENABLED = \"true\"로 켤 수 있고, 수동 실행은 언제든 할 수 있습니다.")
+    elif state["next_run"] is not None:
+        st.caption(f"다음 예약: {state['next_run']:%m-%d %H:%M} · 수요 상위 최대 {PREWARM_MAX_DISTRICTS}개 구 · "
+                   f"API별 일일 한도의 {PREWARM_QUOTA_SHARE:.0%} 이내")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔥 지금 예열", key="prewarm_now", disabled=state["running"], use_container_width=True):
+            threading.Thread(target=run_prewarm, args=("수동",), name="prewarm-manual", daemon=True).start()
+            st.caption("예열을 시작했습니다. 진행 구간은 🩺 구간별 진단의 prewarm.* 에서 볼 수 있습니다.")
+    with col2:
+        if st.button("🔄 새로 고침", key="prewarm_refresh", use_container_width=True):
+            rerun_panel()
+    if state["running"]:
+        st.info("⏳ 예열 실행 중입니다.")
+    if state["history"]:
+        st.dataframe(pd.DataFrame(list(state["history"])[::-1]), hide_index=True, use_container_width=True)
+    used = api_calls_today()
+    st.dataframe(pd.DataFrame([{"API": api, "오늘 호출": used.get(api, 0), "일일 한도": limit}
+                               for api, limit in API_DAILY_LIMITS.items()]), hide_index=True, use_container_width=True)
+    st.caption(f"국토부 (구, 월) 응답 캐시 {len(molit_cached_keys())}건 (유지 {MOLIT_CACHE_TTL // 3600}시간)")
+    if st.toggle("구별 수요 보기", key="prewarm_demand_open"):
+        st.dataframe(prewarm_demand(), hide_index=True, use_container_width=True,
+                     column_config=number_columns({'수요점수': '%.2f'}))
+
+with st.sidebar:
+    with st.expander("🔥 캐시 예열", expanded=False):
+        prewarm_panel()
+
+# --------------------------------------------------------------------------
+# [8] 온디맨드 프로파일 (?profile=sample|cprofile&profile_token=… 또는 secrets의 PROFILE_MODE)
+# --------------------------------------------------------------------------
+if _unfinished_report is not None:
+    keep_profile_report(_unfinished_report)
+if _run_profile is not None:
+    keep_profile_report(stop_profile(_run_profile, FULL_RUN_LABEL, APP_DIR))
+if PROFILE_MODE:
+    st.divider()
+    with st.expander("🔬 재실행 프로파일", expanded=True):
+        reports = st.session_state.get('profile_reports', [])
+        st.caption("최근 실행(전체 실행·패널 부분 재실행)의 프로파일입니다. 표시 자체에 든 시간은 포함되지 않습니다.")
+        picked = st.selectbox(
+            "프로파일 선택", range(len(reports) - 1, -1, -1), key="profile_pick",
+            format_func=lambda i: f"{datetime.fromtimestamp(reports[i]['started_at']).strftime('%H:%M:%S')} "
+                                  f"{reports[i]['label']} ({reports[i]['seconds'] * 1000:,.0f}ms)",
+        )
+        if picked is not None:
+            render_profile_report(reports[picked], key="main")
@@ -0,0 +1,205 @@
+"""
+청약홈(odcloud) 분양공고 로컬 저장소.
+
+- 지역/공고일 필터는 API의 cond[...] 쿼리 조건으로 서버에서 처리하고, totalCount(matchCount)까지 페이지를 끝까지 순회한다.
+- 결과는 공고번호(PBLANC_NO)를 키로 SQLite에 upsert 하며, 다음 동기화는 저장된 최신 모집공고일(RCRIT_PBLANC_DE)부터만 증분 조회한다.
+- 보관·표시 범위는 최근 APPLYHOME_LOOKBACK_DAYS일 공고다. 동기화할 때 그보다 오래된 공고를 지운다.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+import requests
+
+from local_store import connect
+from tracing import span
+
+APPLYHOME_URL = "https://api.odcloud.kr/api/ApplyhomeInfoDetailSvc/v1/getAPTLttotPblancDetail"
+APPLYHOME_PER_PAGE = 500
+# 모집공고일 기준 보관·표시 범위(일). 저장소가 비어 있을 때(최초 동기화)도 여기까지 거슬러 올라간다.
+APPLYHOME_LOOKBACK_DAYS = 365
+# 최신 공고일 당일에 추가/정정된 공고를 놓치지 않도록 증분 조회 시작일을 하루 겹친다.
+APPLYHOME_OVERLAP_DAYS = 1
+
+# 화면 표시용 컬럼 매핑 (API 원본 → 한글 컬럼)
+APPLYHOME_DISPLAY_COLUMNS = {
+    "HOUSE_NM": "아파트명(청약단지)",
+    "HSSPLY_ADRES": "지역(공급위치)",
+    "TOT_SUPLY_HSHLDCO": "공급규모(세대)",
+    "RCRIT_PBLANC_DE": "모집공고일",
+    "RCEPT_BGNDE": "청약시작일",
+    "RCEPT_ENDDE": "청약종료일",
+    "PRZWNER_PRESNATN_DE": "당첨자발표일",
+}
+# 청약 자격 계산(subscription_rules)에 쓰는 공고 속성. 응답에 없는 공고는 빈 값으로 둔다.
+APPLYHOME_RULE_COLUMNS = {
+    "HOUSE_DTL_SECD_NM": "주택구분",
+    "SPECLT_RDN_EARTH_AT": "투기과열지구",
+    "MDAT_TRGET_AREA_SECD": "조정대상지역",
+    "PARCPRC_ULS_AT": "분양가상한제",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applyhome_notice (
+    pblanc_no TEXT PRIMARY KEY,
+    area_nm TEXT,
+    rcrit_pblanc_de TEXT,
+    payload TEXT NOT NULL,
+    synced_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_applyhome_area_de ON applyhome_notice (area_nm, rcrit_pblanc_de);
+"""
+
+
+def fetch_applyhome_pages(service_key, area_name="서울", since_date=None, per_page=APPLYHOME_PER_PAGE, timeout=10,
+                          url=APPLYHOME_URL):
+    """
+    지역·공고일 조건을 API 쿼리로 넘겨 조건에 맞는 공고를 끝 페이지까지 모두 가져온다.
+    - since_date: 'YYYY-MM-DD'. 이 날짜 이상(GTE)의 모집공고만 조회한다.
+    - url: API 주소. 부하 테스트 등에서 로컬 대역 서버로 바꿀 때만 넘긴다.
+    - 반환: 공고 dict 리스트. 중간 페이지가 하나라도 실패하면 불완전한 결과 대신 None을 반환한다.
+    """
+    params = {"page": 1, "perPage": per_page, "serviceKey": service_key}
+    if area_name:
+        params["cond[SUBSCRPT_AREA_CODE_NM::EQ]"] = area_name
+    if since_date:
+        params["cond[RCRIT_PBLANC_DE::GTE]"] = since_date
+
+    rows = []
+    while True:
+        with span("applyhome.page", page=params["page"]) as attrs:
+            try:
+                response = requests.get(url, params=params, timeout=timeout)
+                attrs["http_status"] = response.status_code
+                if response.status_code != 200:
+                    attrs["error"] = f"HTTP {response.status_code}"
+                    return None
+                data = response.json()
+            except Exception as e:
+                attrs["error"] = type(e).__name__
+                return None
+            if "data" not in data:
+                attrs["error"] = "data 필드 없음"
+                return None
+            attrs["rows"] = len(data["data"] or [])
+
+        page_rows = data["data"] or []
+        rows.extend(page_rows)
+        total = data.get("matchCount", data.get("totalCount", 0)) or 0
+        if not page_rows or params["page"] * per_page >= total:
+            return rows
+        params["page"] += 1
+
+
+def upsert_applyhome_rows(db_path, rows):
+    """공고번호(PBLANC_NO) 기준으로 저장소에 upsert 한다. 반환: 반영된 행 수."""
+    synced_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    records = []
+    for r in rows:
+        # 공고번호가 없는 행은 주택관리번호로 대체 키를 만든다.
+        key = str(r.get("PBLANC_NO") or r.get("HOUSE_MANAGE_NO") or "").strip()
+        if not key:
+            continue
+        records.append((
+            key,
+            str(r.get("SUBSCRPT_AREA_CODE_NM") or ""),
+            str(r.get("RCRIT_PBLANC_DE") or ""),
+            json.dumps(r, ensure_ascii=False),
+            synced_at,
+        ))
+    if not records:
+        return 0
+    con = connect(db_path, _SCHEMA)
+    try:
+        with con:
+            con.executemany(
+                "INSERT INTO applyhome_notice (pblanc_no, area_nm, rcrit_pblanc_de, payload, synced_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(pblanc_no) DO UPDATE SET area_nm=excluded.area_nm, "
+                "rcrit_pblanc_de=excluded.rcrit_pblanc_de, payload=excluded.payload, synced_at=excluded.synced_at",
+                records,
+            )
+    finally:
+        con.close()
+    return len(records)
+
+
+def _window_start(now=None):
+    return ((now or datetime.now()) - timedelta(days=APPLYHOME_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+
+
+def prune_applyhome(db_path, now=None):
+    """보관 범위(APPLYHOME_LOOKBACK_DAYS)보다 오래된 공고를 지운다. 반환: 지운 행 수."""
+    con = connect(db_path, _SCHEMA)
+    try:
+        with con:
+            return con.execute("DELETE FROM applyhome_notice WHERE rcrit_pblanc_de < ?", (_window_start(now),)).rowcount
+    finally:
+        con.close()
+
+
+def latest_notice_date(db_path, area_name="서울"):
+    """저장소에 있는 해당 지역의 최신 모집공고일('YYYY-MM-DD'). 비어 있으면 None."""
+    con = connect(db_path, _SCHEMA)
+    try:
+        row = con.execute(
+            "SELECT MAX(rcrit_pblanc_de) FROM applyhome_notice WHERE area_nm = ?", (area_name,)
+        ).fetchone()
+    finally:
+        con.close()
+    return row[0] if row and row[0] else None
+
+
+def sync_applyhome(db_path, service_key, area_name="서울", url=APPLYHOME_URL):
+    """
+    증분 동기화: 저장된 최신 모집공고일(하루 겹침)부터만 조회해 upsert 한다.
+    저장소가 비어 있으면 APPLYHOME_LOOKBACK_DAYS 만큼 거슬러 올라가 전체를 채운다.
+    성공하면 보관 범위를 벗어난 공고를 지운다. 반환: 이번에 반영된 공고 수. API 실패 시 None.
+    """
+    latest = latest_notice_date(db_path, area_name)
+    if latest:
+        try:
+            since = (pd.to_datetime(latest) - timedelta(days=APPLYHOME_OVERLAP_DAYS)).strftime("%Y-%m-%d")
+        except Exception:
+            since = None
+    else:
+        since = _window_start()
+
+    rows = fetch_applyhome_pages(service_key, area_name=area_name, since_date=since, url=url)
+    if rows is None:
+        return None
+    synced = upsert_applyhome_rows(db_path, rows)
+    prune_applyhome(db_path)
+    return synced
+
+
+def load_applyhome_raw(db_path, area_name="서울", now=None):
+    """저장소의 최근 APPLYHOME_LOOKBACK_DAYS일 원본 공고(API 필드 그대로)를 DataFrame으로 반환한다. now는 기준 시각(기본: 현재)."""
+    con = connect(db_path, _SCHEMA)
+    try:
+        payloads = [
+            json.loads(p) for (p,) in con.execute(
+                "SELECT payload FROM applyhome_notice WHERE area_nm = ? AND rcrit_pblanc_de >= ? "
+                "ORDER BY rcrit_pblanc_de DESC",
+                (area_name, _window_start(now)),
+            )
+        ]
+    finally:
+        con.close()
+    return pd.DataFrame(payloads)
+
+
+def load_applyhome_display(db_path, area_name="서울", now=None):
+    """
+    저장소의 보관 범위 안 공고를 Tab 3 표시용 한글 컬럼으로 변환해 모집공고일 내림차순으로 반환한다.
+    표시 컬럼 뒤에 자격 계산용 속성 컬럼(APPLYHOME_RULE_COLUMNS)이 붙는다.
+    """
+    columns = {**APPLYHOME_DISPLAY_COLUMNS, **APPLYHOME_RULE_COLUMNS}
+    df_raw = load_applyhome_raw(db_path, area_name, now)
+    if df_raw.empty:
+        return pd.DataFrame(columns=list(columns.values()))
+    for src in columns:
+        if src not in df_raw.columns:
+            df_raw[src] = ""
+    res_df = df_raw[list(columns)].rename(columns=columns)
+    return res_df.sort_values('모집공고일', ascending=False).reset_index(drop=True)
@@ -0,0 +1,491 @@
+"""
+수집·분석 핫패스 오프라인 벤치마크.
+
+녹화된 API 응답(fixtures/: 국토부 XML, R-ONE JSON, 청약홈 JSON)과 합성 데이터(1만·10만·100만 건)로
+앱이 쓰는 함수를 네트워크·Streamlit 없이 그대로 실행하고, 구간별 시간(반복 중 최솟값)과 최대 메모리(tracemalloc)를
+기준치(baseline.json)와 비교한다. 구간 이름은 tracing 구간 이름과 같아 운영 진단 화면과 바로 대조할 수 있다.
+다음 경우 종료 코드 1을 반환한다.
+- 시간이 기준치보다 --time-tolerance 넘게 늘어난 구간이 있는 경우
+- 최대 메모리가 기준치보다 --memory-tolerance 넘게 늘어난 구간이 있는 경우
+
+사용법:
+  python benchmarks/bench.py [--scale fixture 10k 100k 1m] [--only collect.clean ...] [--repeat N] [--no-memory]
+  python benchmarks/bench.py --update-baseline          # 현재 결과를 기준치로 기록 (같은 머신에서 비교할 것)
+  python benchmarks/bench.py --record --service-key KEY # 실제 API 응답으로 fixtures/ 다시 녹화
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import requests  # noqa: E402
+
+import synthetic  # noqa: E402
+from affordability import affordable_mask, assess_affordability  # noqa: E402
+from applyhome_store import APPLYHOME_URL, load_applyhome_display, upsert_applyhome_rows  # noqa: E402
+from collect_pipeline import (clean_trades, estimate_prices, merge_rent_averages, parse_reb_rows,  # noqa: E402
+                              parse_rent_xml, parse_trade_xml)
+from complex_summary import build_complex_summary, prepare_trades  # noqa: E402
+from rank_index import ALL_REGIONS, build_rank_index, query_rankings  # noqa: E402
+from registry import resolve_complex_ids, resolve_complex_ids_by_region  # noqa: E402
+from rent_store import ingest_rent_month, load_rent_averages  # noqa: E402
+from scoring import compute_purpose_scores, weighted_top_n  # noqa: E402
+from sheet_sync import SHEET_COLUMNS, apply_master_info, upsert_sheet_rows  # noqa: E402
+from subscription_rules import evaluate_announcements, shortlist_announcements  # noqa: E402
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SCALES = ("fixture", "10k")
+# 국토부 API 한 페이지 최대 행 수. 합성 규모의 파싱 구간은 이 크기의 응답을 여러 장 파싱한다.
+MOLIT_PAGE_ROWS = 1000
+# 서로 다른 내용의 합성 응답 페이지 수 (100만 건이면 1000장을 이 묶음에서 돌려 쓴다)
+DISTINCT_PAGES = 20
+DEFAULT_TIME_TOLERANCE = 0.30
+DEFAULT_MEMORY_TOLERANCE = 0.20
+# 이보다 작은 차이는 측정 잡음으로 보고 회귀로 세지 않는다.
+MIN_TIME_SLACK = 0.005
+MIN_MEMORY_SLACK_MB = 1.0
+MARKET_BUFFER = 5
+RECOMMEND_WEIGHTS = {"실거주 (장기보유)": 0.5, "갭투자 (전세 레버리지)": 0.3, "월세 수익형": 0.2}
+# 청약 자격 계산 구간의 사용자 조건 (특공 세 가지가 모두 열리는 경우)
+APPLICANT = {"is_homeless": True, "homeless_years": 7, "is_newlywed": True, "is_first_time": True,
+             "children_count": 2, "sub_account_years": 6}
+APPLICANT_INCOME_WON = 9e7
+# 자금 판정 구간의 사용자 자금 (앱 사이드바 기본값: 현금 3억, 연소득 7,500만 원, 금리 4%)
+FINANCE = {"user_cash": 3.0, "user_income": 7.5, "loan_rate_pct": 4.0, "is_homeless": True, "is_first_time": False}
+# 녹화 대상 (구 이름, 법정동 코드). 고가·중저가 지역을 하나씩 둔다.
+RECORD_TARGETS = (("서울 강남구", "11680"), ("서울 노원구", "11350"))
+
+
+# --------------------------------------------------------------------------
+# 작업 데이터 준비 (측정 대상 아님)
+# --------------------------------------------------------------------------
+def _read_manifest():
+    with open(os.path.join(FIXTURE_DIR, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fixture_bytes(name):
+    with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+        return f.read()
+
+
+def fixture_workload():
+    """녹화된 응답으로 작업 데이터를 만든다. 파싱 구간은 녹화 응답 원본을 그대로 파싱한다."""
+    manifest = _read_manifest()
+    trade_pages, trade_frames = [], []
+    for entry in manifest["molit_trade"]:
+        page = _fixture_bytes(entry["file"])
+        trade_pages.append(page)
+        trade_frames.append(parse_trade_xml(page)[1].assign(구=entry["district"]))
+    rent_pages, rent_months = [], {}
+    for entry in manifest["molit_rent"]:
+        page = _fixture_bytes(entry["file"])
+        rent_pages.append(page)
+        rent_months[(entry["district"], entry["ym"])] = parse_rent_xml(page)[1]
+    reb = {entry["sigungu"]: parse_reb_rows(json.loads(_fixture_bytes(entry["file"]))) for entry in manifest["rone"]}
+    applyhome_rows = [row for entry in manifest["applyhome"] for row in json.loads(_fixture_bytes(entry["file"]))["data"]]
+    raw_trades = pd.concat(trade_frames, ignore_index=True)
+    # 기준정보 시트용 단지 목록: 녹화된 거래의 평당가로 전고점을 만든다.
+    price = pd.to_numeric(raw_trades['거래금액'].str.replace(',', ''), errors='coerce')
+    per_pyung = price / (pd.to_numeric(raw_trades['전용면적'], errors='coerce') / 3.3)
+    complexes = raw_trades.assign(평당가=per_pyung, 입지점수=70).drop_duplicates("아파트")
+    return {
+        "trade_pages": trade_pages, "rent_pages": rent_pages, "raw_trades": raw_trades, "rent_months": rent_months,
+        "reb": reb, "applyhome_rows": applyhome_rows, "master": synthetic.master_sheet(complexes, share=0.5),
+    }
+
+
+def synthetic_workload(n):
+    """합성 거래 n건(매매·전월세 각각)으로 작업 데이터를 만든다."""
+    complexes = synthetic.make_complexes(synthetic.complex_count(n))
+    raw_trades = synthetic.synthetic_trades(complexes, n)
+    rent_months = synthetic.synthetic_rents(complexes, n)
+    n_pages = math.ceil(n / MOLIT_PAGE_ROWS)
+    page_rows = raw_trades.iloc[:MOLIT_PAGE_ROWS * min(n_pages, DISTINCT_PAGES)]
+    trade_pool = [synthetic.to_molit_xml(page_rows.iloc[i:i + MOLIT_PAGE_ROWS], "trade")
+                  for i in range(0, len(page_rows), MOLIT_PAGE_ROWS)]
+    rent_rows = pd.concat(list(rent_months.values()), ignore_index=True).iloc[:len(page_rows)]
+    rent_pool = [synthetic.to_molit_xml(rent_rows.iloc[i:i + MOLIT_PAGE_ROWS], "rent")
+                 for i in range(0, len(rent_rows), MOLIT_PAGE_ROWS)]
+    return {
+        "trade_pages": [trade_pool[i % len(trade_pool)] for i in range(n_pages)],
+        "rent_pages": [rent_pool[i % len(rent_pool)] for i in range(n_pages)],
+        "raw_trades": raw_trades, "rent_months": rent_months,
+        "reb": {"": parse_reb_rows(synthetic.synthetic_reb_json())},
+        "applyhome_rows": synthetic.synthetic_applyhome_rows(max(n // 20, 100)),
+        "master": synthetic.master_sheet(complexes),
+    }
+
+
+def _index_fetcher(reb):
+    """
+    fetch_reb_weekly_index 대역. (시군구, 주 수)별로 한 번만 만들고, 적중 시에는 st.cache_data처럼 사본을 돌려준다.
+    녹화된 시군구가 아니면 첫 번째 녹화본을 쓴다.
+    """
+    cache, fallback = {}, next(iter(reb.values()))
+
+    def fetch(sigungu_name, weeks_back):
+        key = (sigungu_name, weeks_back)
+        if key not in cache:
+            df = reb.get(sigungu_name, fallback)
+            # 실제 조회 기간은 거래일 2주 전부터다.
+            cache[key] = df.tail(weeks_back + 2).reset_index(drop=True)
+        return cache[key].copy()
+    return fetch
+
+
+# --------------------------------------------------------------------------
+# 측정 구간. 각 함수는 (실행 함수, 행 수)를 반환하고, 실행 함수의 결과는 다음 구간의 입력이 된다.
+# --------------------------------------------------------------------------
+def _item_count(pages):
+    return sum(page.count(b"<item>") for page in pages)
+
+
+# 파싱 결과 프레임은 뒤 구간에서 쓰지 않으므로(정제 구간은 raw_trades를 쓴다) 행 수만 남기고 버린다.
+def _bench_trade_parse(ctx):
+    pages = ctx["trade_pages"]
+    return (lambda: sum(len(parse_trade_xml(page)[1]) for page in pages)), _item_count(pages)
+
+
+def _bench_rent_parse(ctx):
+    pages = ctx["rent_pages"]
+    return (lambda: sum(len(parse_rent_xml(page)[1]) for page in pages)), _item_count(pages)
+
+
+def _bench_rent_ingest(ctx):
+    db, months = ctx["db_path"], ctx["rent_months"]
+
+    def run():
+        for (district, ym), df_raw_rent in months.items():
+            rent_ids = resolve_complex_ids(db, df_raw_rent['아파트'], district, df_raw_rent['법정동'])
+            ingest_rent_month(db, district, ym, df_raw_rent, rent_ids)
+    return run, sum(len(df) for df in months.values())
+
+
+def _bench_clean(ctx):
+    raw = ctx["raw_trades"]
+    return (lambda: clean_trades(raw, ctx["db_path"], now=synthetic.REFERENCE_DATE)), len(raw)
+
+
+def _bench_rent_merge(ctx):
+    df_clean = ctx["collect.clean"]
+    return (lambda: merge_rent_averages(df_clean, load_rent_averages(ctx["db_path"]))), len(df_clean)
+
+
+def _bench_estimate(ctx):
+    df_clean = ctx["collect.rent_merge"].copy()
+    fetch = _index_fetcher(ctx["reb"])
+    return (lambda: estimate_prices(df_clean, fetch, MARKET_BUFFER, now=synthetic.REFERENCE_DATE)), len(df_clean)
+
+
+def _sheet_rows(ctx):
+    """수집 결과 → 시트 저장 형식 (district_panel이 공유본에 넣는 컬럼)."""
+    if "sheet_rows" not in ctx:
+        df = ctx["collect.estimate"].assign(**{'전고점(억)': 0.0, '입지점수': 0})
+        ctx["sheet_rows"] = df.sort_values(by='거래일', ascending=False)[['단지ID', *SHEET_COLUMNS]].reset_index(drop=True)
+    return ctx["sheet_rows"]
+
+
+def _bench_sheet_upsert(ctx):
+    df_new = _sheet_rows(ctx)
+    if "sheet_current" not in ctx:
+        # 기존 시트: 이전 수집분(앞쪽 70%)을 저장해 둔 상태. 새 수집분의 일부 키만 겹친다.
+        prior = df_new.iloc[int(len(df_new) * 0.3):]
+        ctx["sheet_current"] = upsert_sheet_rows(None, [], prior, prior['단지ID'])
+    df_current, master = ctx["sheet_current"], ctx["master"]
+
+    def run():
+        new = apply_master_info(df_new, master)
+        current_ids = resolve_complex_ids_by_region(ctx["db_path"], df_current['아파트명'], df_current['지역'])
+        return upsert_sheet_rows(df_current, current_ids, new, new['단지ID'])
+    return run, len(df_current) + len(df_new)
+
+
+def _bench_summary(ctx):
+    df_trades = _sheet_rows(ctx)
+    return (lambda: build_complex_summary(prepare_trades(df_trades), now=synthetic.REFERENCE_DATE)), len(df_trades)
+
+
+def _bench_rank_build(ctx):
+    summary = ctx["summary.build"]
+    return (lambda: build_rank_index(summary)), len(summary)
+
+
+def _bench_rank_query(ctx):
+    index = ctx["rank.build_index"]
+    regions = [ALL_REGIONS, *index["regions"][:20]]
+    # 슬라이더 조작 한 번 = 질의 한 번. 지역마다 평형·예산·갭 조합을 바꿔 가며 던진다.
+    queries = [(region, lo, lo + 15, price, gap) for region in regions
+               for lo, price, gap in ((10, 8.0, 3.0), (20, 12.0, 5.0), (30, 20.0, 8.0), (15, 30.0, 12.0))]
+
+    def run():
+        return [query_rankings(index, lo, hi, price, gap, region) for region, lo, hi, price, gap in queries]
+    return run, len(queries)
+
+
+def _bench_recommend(ctx):
+    summary = ctx["summary.build"]
+
+    def run():
+        # get_scored_candidates와 같은 예산·평형 조건으로 전 지역 점수를 한 번에 계산하고 지역별 상위 10개를 뽑는다.
+        mask = ((summary['평형'] >= 20) & (summary['평형'] <= 40)
+                & (summary['추정현재시세(억)'] <= 20) & (summary['추정현재시세(억)'] > 0))
+        scored = compute_purpose_scores(summary[mask], current_year=synthetic.REFERENCE_DATE.year)
+        return {region: weighted_top_n(scored, region, RECOMMEND_WEIGHTS, 10) for region in scored['시군구'].unique()}
+    return run, len(summary)
+
+
+def _bench_afford(ctx):
+    summary = ctx["summary.build"]
+
+    def run():
+        # 전체 요약 행에 LTV·DSR을 한 번에 계산하고 한도 안의 단지만 남긴다 (랭킹 전체 지역·추천 후보 공통 경로).
+        assessed = assess_affordability(summary, **FINANCE)
+        return assessed[affordable_mask(assessed)]
+    return run, len(summary)
+
+
+def _bench_applyhome(ctx):
+    rows = ctx["applyhome_rows"]
+
+    def run():
+        upsert_applyhome_rows(ctx["db_path"], rows)
+        return load_applyhome_display(ctx["db_path"], area_name="서울", now=synthetic.REFERENCE_DATE)
+    return run, len(rows)
+
+
+def _bench_applyhome_evaluate(ctx):
+    df_apply = ctx["applyhome.upsert"]
+
+    def run():
+        df_evaluated = evaluate_announcements(df_apply, APPLICANT, APPLICANT_INCOME_WON, now=synthetic.REFERENCE_DATE)
+        shortlist_announcements(df_evaluated)
+        return df_evaluated
+    return run, len(df_apply)
+
+
+STAGES = (
+    ("molit.trade.xml_parse", _bench_trade_parse),
+    ("molit.rent.xml_parse", _bench_rent_parse),
+    ("rent.ingest", _bench_rent_ingest),
+    ("collect.clean", _bench_clean),
+    ("collect.rent_merge", _bench_rent_merge),
+    ("collect.estimate", _bench_estimate),
+    ("sheet.upsert", _bench_sheet_upsert),
+    ("summary.build", _bench_summary),
+    ("rank.build_index", _bench_rank_build),
+    ("rank.query", _bench_rank_query),
+    ("recommend.score", _bench_recommend),
+    ("recommend.afford", _bench_afford),
+    ("applyhome.upsert", _bench_applyhome),
+    ("applyhome.evaluate", _bench_applyhome_evaluate),
+)
+
+
+def default_repeat(n_rows):
+    return 3 if n_rows <= 10_000 else 1
+
+
+def measure(factory, ctx, repeat, trace_memory):
+    """
+    구간을 repeat번 실행해 최소 시간(초)을 재고, trace_memory면 한 번 더 실행해 최대 할당량(MB)을 잰다.
+    시간 측정 중에는 tracemalloc을 끄므로 메모리 추적 비용이 시간에 섞이지 않는다.
+    반환: (초, MB 또는 None, 행 수, 마지막 실행 결과)
+    """
+    best, result, rows = math.inf, None, 0
+    for _ in range(repeat):
+        run, rows = factory(ctx)
+        gc.collect()
+        started = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - started)
+    peak_mb = None
+    if trace_memory:
+        run, _ = factory(ctx)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return best, peak_mb, rows, result
+
+
+def run_scale(scale, only=None, repeat=None, trace_memory=True):
+    """한 규모의 모든 구간을 순서대로 측정한다. 반환: {구간: {"rows", "seconds", "peak_mb"}}"""
+    started = time.perf_counter()
+    ctx = fixture_workload() if scale == "fixture" else synthetic_workload(SCALES[scale])
+    print(f"\n[{scale}] 매매 {len(ctx['raw_trades']):,}건 · 전월세 {sum(len(d) for d in ctx['rent_months'].values()):,}건 "
+          f"(데이터 준비 {time.perf_counter() - started:.1f}s)")
+    repeat = repeat or default_repeat(len(ctx["raw_trades"]))
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        ctx["db_path"] = os.path.join(tmp, "local_store.db")
+        for name, factory in STAGES:
+            # 뒤 구간의 입력이 필요하므로 --only에 없는 구간도 실행은 하되 기록하지 않는다.
+            selected = not only or name in only
+            seconds, peak_mb, rows, ctx[name] = measure(factory, ctx, repeat if selected else 1, trace_memory and selected)
+            if selected:
+                results[name] = {"rows": rows, "seconds": seconds, "peak_mb": peak_mb}
+            if only and all(s in results for s in only):
+                break
+    return results
+
+
+# --------------------------------------------------------------------------
+# 기준치 비교
+# --------------------------------------------------------------------------
+def environment():
+    return {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "machine": platform.machine(), "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count()}
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {"environment": None, "scales": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(scale, results, baseline, time_tolerance, memory_tolerance):
+    """결과 표를 출력하고 회귀 목록을 반환한다."""
+    base = baseline["scales"].get(scale, {})
+    print(f"  {'구간':<24s} {'행':>10s} {'시간(ms)':>10s} {'기준(ms)':>10s} {'변화':>8s} {'메모리(MB)':>11s} {'기준(MB)':>9s}")
+    regressions = []
+    for name, cur in results.items():
+        ref = base.get(name)
+        ms = cur["seconds"] * 1000
+        ref_ms = f"{ref['seconds'] * 1000:10.1f}" if ref else f"{'-':>10s}"
+        change = f"{(cur['seconds'] / ref['seconds'] - 1) * 100:+7.0f}%" if ref and ref["seconds"] > 0 else f"{'-':>8s}"
+        mem = f"{cur['peak_mb']:11.1f}" if cur["peak_mb"] is not None else f"{'-':>11s}"
+        ref_mem = f"{ref['peak_mb']:9.1f}" if ref and ref.get("peak_mb") is not None else f"{'-':>9s}"
+        flags = []
+        if ref and cur["seconds"] > ref["seconds"] * (1 + time_tolerance) and cur["seconds"] - ref["seconds"] > MIN_TIME_SLACK:
+            flags.append("시간")
+        if (ref and cur["peak_mb"] is not None and ref.get("peak_mb") is not None
+                and cur["peak_mb"] > ref["peak_mb"] * (1 + memory_tolerance) and cur["peak_mb"] - ref["peak_mb"] > MIN_MEMORY_SLACK_MB):
+            flags.append("메모리")
+        print(f"  {name:<24s} {cur['rows']:>10,d} {ms:10.1f} {ref_ms} {change} {mem} {ref_mem}  {'🚨 ' + '·'.join(flags) if flags else ''}")
+        regressions += [f"[{scale}] {name}: {flag} 회귀" for flag in flags]
+    return regressions
+
+
+# --------------------------------------------------------------------------
+# 픽스처 녹화 (실제 API 호출)
+# --------------------------------------------------------------------------
+def record_fixtures(service_key, reb_key, months=2):
+    """RECORD_TARGETS의 최근 months개월 매매·전월세, R-ONE 주간 지수(52주), 청약홈 서울 공고 첫 페이지를 녹화한다."""
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    manifest = {"recorded_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+                "molit_trade": [], "molit_rent": [], "rone": [], "applyhome": []}
+    yms = [(pd.Timestamp.now().replace(day=1) - pd.DateOffset(months=i + 1)).strftime("%Y%m") for i in range(months)]
+    endpoints = {
+        "molit_trade": "http://apis.data.go.kr/1613000/RTMSDataSvcAptTradeDev/getRTMSDataSvcAptTradeDev",
+        "molit_rent": "http://apis.data.go.kr/1613000/RTMSDataSvcAptRent/getRTMSDataSvcAptRent",
+    }
+    for kind, url in endpoints.items():
+        for district, code in RECORD_TARGETS:
+            for ym in yms:
+                r = requests.get(url, params={"serviceKey": service_key, "LAWD_CD": code, "DEAL_YMD": ym,
+                                              "numOfRows": MOLIT_PAGE_ROWS, "pageNo": 1}, timeout=30)
+                r.raise_for_status()
+                name = f"{kind}_{code}_{ym}.xml"
+                with open(os.path.join(FIXTURE_DIR, name), "wb") as f:
+                    f.write(r.content)
+                manifest[kind].append({"file": name, "district": district, "lawd_cd": code, "ym": ym})
+
+    end = pd.Timestamp.now()
+    sigungu = RECORD_TARGETS[0][0]
+    r = requests.get("https://www.reb.or.kr/r-one/openapi/SttsApiTblData.do", params={
+        "KEY": reb_key, "Type": "json", "pIndex": 1, "pSize": 100, "STATBL_ID": "A_2024_00178", "DTACYCLE_CD": "WW",
+        "CLS_ID": sigungu, "START_WRTTIME": (end - pd.Timedelta(weeks=54)).strftime("%Y%m%d"), "END_WRTTIME": end.strftime("%Y%m%d"),
+    }, timeout=30)
+    r.raise_for_status()
+    with open(os.path.join(FIXTURE_DIR, "rone_weekly.json"), "w", encoding="utf-8") as f:
+        f.write(synthetic.dumps(r.json()))
+    manifest["rone"].append({"file": "rone_weekly.json", "sigungu": sigungu})
+
+    r = requests.get(APPLYHOME_URL, params={"page": 1, "perPage": 500, "serviceKey": service_key,
+                                            "cond[SUBSCRPT_AREA_CODE_NM::EQ]": "서울"}, timeout=30)
+    r.raise_for_status()
+    with open(os.path.join(FIXTURE_DIR, "applyhome_page1.json"), "w", encoding="utf-8") as f:
+        f.write(synthetic.dumps(r.json()))
+    manifest["applyhome"].append({"file": "applyhome_page1.json"})
+
+    with open(os.path.join(FIXTURE_DIR, "manifest.json"), "w", encoding="utf-8") as f:
+        f.write(synthetic.dumps(manifest))
+    print(f"녹화 완료: {FIXTURE_DIR}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", nargs="+", choices=["fixture", *SCALES], default=list(DEFAULT_SCALES))
+    parser.add_argument("--only", nargs="+", choices=[name for name, _ in STAGES])
+    parser.add_argument("--repeat", type=int, help="구간별 반복 횟수 (기본: 1만 건 이하 3회, 그 이상 1회)")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc 측정을 건너뛴다")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="이번 결과로 기준치를 갱신한다 (측정한 규모·구간만)")
+    parser.add_argument("--json", help="결과를 JSON 파일로도 저장한다")
+    parser.add_argument("--record", action="store_true", help="실제 API 응답으로 fixtures/를 다시 녹화한다")
+    parser.add_argument("--service-key", default=os.environ.get("PUBLIC_DATA_KEY"))
+    parser.add_argument("--reb-key", default=os.environ.get("REB_API_KEY"))
+    args = parser.parse_args(argv)
+
+    if args.record:
+        if not args.service_key:
+            parser.error("--record에는 --service-key(또는 PUBLIC_DATA_KEY 환경변수)가 필요합니다.")
+        record_fixtures(args.service_key, args.reb_key or args.service_key)
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    env = environment()
+    if baseline["environment"] and baseline["environment"] != env:
+        print(f"⚠️ 기준치는 다른 환경에서 기록됐습니다: {baseline['environment']} (현재 {env})")
+
+    all_results, regressions = {}, []
+    for scale in args.scale:
+        all_results[scale] = run_scale(scale, only=args.only, repeat=args.repeat, trace_memory=not args.no_memory)
+        regressions += compare(scale, all_results[scale], baseline, args.time_tolerance, args.memory_tolerance)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"environment": env, "scales": all_results}, f, ensure_ascii=False, indent=1)
+    if args.update_baseline:
+        for scale, results in all_results.items():
+            for name, cur in results.items():
+                prev = baseline["scales"].setdefault(scale, {}).get(name, {})
+                # --no-memory로 갱신할 때는 기존 메모리 기준치를 유지한다.
+                baseline["scales"][scale][name] = dict(cur, peak_mb=cur["peak_mb"] if cur["peak_mb"] is not None else prev.get("peak_mb"))
+        baseline["environment"] = env
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=1)
+        print(f"\n기준치 갱신: {args.baseline}")
+        return 0
+
+    if regressions:
+        print("\n🚨 기준치 대비 회귀:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\n✅ 기준치 이내")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+벤치마크용 합성 데이터 생성기.
+
+실제 API 응답과 같은 형식(국토부 XML, R-ONE JSON, 청약홈 JSON)과 같은 분포의 값을 시드 고정으로 만든다.
+- 단지 집합(make_complexes)을 먼저 만들고, 매매·전월세 거래를 같은 단지에서 뽑아 전월세 병합이 실제처럼 맞물리게 한다.
+- 거래 건수는 1만·10만·100만 건 규모로 키워도 벡터 연산만 쓰므로 생성 시간이 측정 대상보다 짧다.
+"""
+import json
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+# 벤치마크 기준일. 고정해 두어야 신선도 라벨·지수 추정 결과가 실행일과 관계없이 같다.
+REFERENCE_DATE = pd.Timestamp("2024-10-01")
+
+DISTRICTS = {
+    "서울 강남구": ("11680", ["대치동", "개포동", "도곡동", "압구정동", "역삼동", "일원동"]),
+    "서울 서초구": ("11650", ["반포동", "서초동", "잠원동", "방배동", "우면동"]),
+    "서울 송파구": ("11710", ["잠실동", "문정동", "가락동", "신천동", "풍납동", "오금동"]),
+    "서울 강동구": ("11740", ["고덕동", "명일동", "암사동", "천호동", "상일동"]),
+    "서울 마포구": ("11440", ["아현동", "공덕동", "상암동", "성산동", "망원동"]),
+    "서울 성동구": ("11200", ["옥수동", "금호동4가", "행당동", "성수동1가", "하왕십리동"]),
+    "서울 노원구": ("11350", ["상계동", "중계동", "하계동", "월계동", "공릉동"]),
+    "서울 양천구": ("11470", ["목동", "신정동", "신월동"]),
+    "경기 성남 분당": ("41135", ["정자동", "서현동", "수내동", "야탑동", "이매동", "판교동"]),
+    "경기 과천시": ("41290", ["중앙동", "원문동", "별양동", "부림동"]),
+    "경기 고양 일산동": ("41285", ["장항동", "마두동", "백석동", "식사동"]),
+    "경기 수원 영통": ("41117", ["영통동", "매탄동", "원천동", "이의동"]),
+}
+_BRANDS = ["래미안", "자이", "힐스테이트", "푸르지오", "e편한세상", "아이파크", "롯데캐슬", "더샵", "SK뷰", "현대", "한신", "주공",
+           "우성", "삼성", "극동", "벽산", "쌍용", "대림", "두산위브", "센트레빌"]
+_NAME_SUFFIXES = ["", "아파트", "1단지", "2단지", "3차", " 퍼스티지", " 에듀포레", "(1동~12동)", " APT"]
+# 전용면적(㎡)과 출현 비율
+_AREAS = np.array([39.6, 49.9, 59.97, 74.5, 84.97, 101.8, 114.9, 134.6, 164.3])
+_AREA_P = np.array([0.05, 0.07, 0.22, 0.12, 0.30, 0.09, 0.08, 0.05, 0.02])
+# 구별 평당 시세 수준(만원). 목록에 없으면 기본값.
+_PRICE_LEVEL = {"서울 강남구": 8200, "서울 서초구": 8000, "서울 송파구": 6300, "경기 과천시": 6000, "서울 성동구": 5200,
+                "서울 마포구": 4800, "서울 양천구": 4700, "경기 성남 분당": 4600, "서울 강동구": 4300}
+_DEFAULT_PRICE_LEVEL = 2900
+
+
+def complex_count(n_trades):
+    """거래 건수에 맞는 단지 수. 실제 수도권 단지 수(수만 개)를 넘지 않게 자른다."""
+    return int(min(max(n_trades // 25, 40), 30000))
+
+
+def make_complexes(n_complexes, seed=0):
+    """단지 목록: 아파트명(표기 흔들림 포함)·구·법정동·건축년도·평당가(만원)·입지점수."""
+    rng = np.random.default_rng(seed)
+    names = list(DISTRICTS)
+    gu = rng.choice(names, n_complexes)
+    dong = np.array([rng.choice(DISTRICTS[g][1]) for g in gu])
+    base = np.array([f"{rng.choice(_BRANDS)}{rng.choice(['', '신', '센트럴', '파크', '리버', '레이크'])}" for _ in range(n_complexes)])
+    # 단지명 중복을 줄이고(같은 구·동에 같은 이름이 있으면 레지스트리상 같은 단지) 표기 흔들림을 섞는다.
+    apt = np.char.add(np.char.add(base, np.arange(n_complexes).astype(str)), rng.choice(_NAME_SUFFIXES, n_complexes))
+    level = np.array([_PRICE_LEVEL.get(g, _DEFAULT_PRICE_LEVEL) for g in gu]) * rng.lognormal(0, 0.25, n_complexes)
+    return pd.DataFrame({
+        "아파트": apt, "구": gu, "법정동": dong,
+        "건축년도": rng.integers(1978, 2024, n_complexes).astype(str),
+        "평당가": level.round(0),
+        "입지점수": rng.integers(40, 100, n_complexes),
+    })
+
+
+def _deal_dates(rng, n, days_back):
+    offsets = rng.integers(0, days_back, n)
+    dates = REFERENCE_DATE - pd.to_timedelta(offsets, unit="D")
+    return dates.year.astype(str), dates.month.astype(str), dates.day.astype(str)
+
+
+def _comma(values):
+    return pd.Series(values).map("{:,}".format).to_numpy()
+
+
+def synthetic_trades(complexes, n, seed=1, days_back=180):
+    """
+    매매 실거래 n건. parse_trade_xml() 결과 형식(문자열 컬럼)에 수집 루프가 붙이는 '구' 컬럼까지 포함한다.
+    인기 단지에 거래가 몰리도록 단지 선택은 Zipf 분포를 따른다.
+    """
+    rng = np.random.default_rng(seed)
+    pick = (rng.zipf(1.3, n) - 1) % len(complexes)
+    c = complexes.iloc[pick].reset_index(drop=True)
+    area = rng.choice(_AREAS, n, p=_AREA_P)
+    price = (c["평당가"].to_numpy() * area / 3.3 * rng.normal(1.0, 0.06, n)).round(-1).astype(int)
+    year, month, day = _deal_dates(rng, n, days_back)
+    return pd.DataFrame({
+        "아파트": c["아파트"], "전용면적": area.astype(str), "거래금액": _comma(price),
+        "층": rng.integers(1, 36, n).astype(str), "건축년도": c["건축년도"], "법정동": c["법정동"],
+        "년": year, "월": month, "일": day, "구": c["구"],
+    })
+
+
+def synthetic_rents(complexes, n, seed=2, days_back=180):
+    """
+    전월세 실거래 n건을 (구, 계약월 'YYYYMM')별로 나눈 dict. 수집 루프가 월 단위로 저장소에 넣는 단위와 같다.
+    약 40%는 월세(월세금액 > 0)다.
+    """
+    rng = np.random.default_rng(seed)
+    pick = (rng.zipf(1.3, n) - 1) % len(complexes)
+    c = complexes.iloc[pick].reset_index(drop=True)
+    area = rng.choice(_AREAS, n, p=_AREA_P)
+    value = c["평당가"].to_numpy() * area / 3.3
+    monthly = rng.random(n) < 0.4
+    deposit = np.where(monthly, value * 0.15, value * rng.normal(0.55, 0.07, n)).round(-1).astype(int)
+    rent = np.where(monthly, (value * 0.0025 * rng.normal(1.0, 0.1, n)).round(0), 0).astype(int)
+    year, month, day = _deal_dates(rng, n, days_back)
+    df = pd.DataFrame({
+        "아파트": c["아파트"], "전용면적": area.astype(str), "보증금액": _comma(deposit), "월세금액": _comma(rent),
+        "법정동": c["법정동"], "년": year, "월": month, "일": day, "구": c["구"],
+    })
+    ym = df["년"] + df["월"].str.zfill(2)
+    return {(gu, m): g.drop(columns="구").reset_index(drop=True) for (gu, m), g in df.groupby(["구", ym], sort=True)}
+
+
+# 국토부 신 API(영문 태그) 응답 컬럼 순서. 파서가 읽지 않는 태그도 실제 응답처럼 함께 싣는다.
+_TRADE_TAGS = (("sggCd", None), ("umdNm", "법정동"), ("aptNm", "아파트"), ("jibun", None), ("excluUseAr", "전용면적"),
+               ("dealYear", "년"), ("dealMonth", "월"), ("dealDay", "일"), ("dealAmount", "거래금액"), ("floor", "층"),
+               ("buildYear", "건축년도"), ("cdealType", None), ("dealingGbn", None))
+_RENT_TAGS = (("sggCd", None), ("umdNm", "법정동"), ("aptNm", "아파트"), ("jibun", None), ("excluUseAr", "전용면적"),
+              ("dealYear", "년"), ("dealMonth", "월"), ("dealDay", "일"), ("deposit", "보증금액"), ("monthlyRent", "월세금액"),
+              ("floor", None), ("buildYear", None), ("contractTerm", None), ("contractType", None))
+_FILLERS = {"jibun": "123-4", "cdealType": " ", "dealingGbn": "중개거래", "contractTerm": "24.10~26.10",
+            "contractType": "신규", "floor": "7", "buildYear": "2008"}
+
+
+def to_molit_xml(df_raw, kind="trade", lawd_cd="11680", result_code="000"):
+    """
+    parse_trade_xml()/parse_rent_xml() 형식 프레임 → 국토부 API 응답 XML(bytes).
+    금액 컬럼은 실제 응답처럼 오른쪽 정렬 공백이 붙은 콤마 숫자로 쓴다.
+    """
+    tags = _TRADE_TAGS if kind == "trade" else _RENT_TAGS
+    columns = {tag: df_raw[col].astype(str).map(escape).tolist() for tag, col in tags if col and col in df_raw.columns}
+    items = []
+    for i in range(len(df_raw)):
+        parts = []
+        for tag, col in tags:
+            if tag in columns:
+                value = columns[tag][i]
+                if tag in ("dealAmount", "deposit", "monthlyRent"):
+                    value = value.rjust(9)
+            else:
+                value = lawd_cd if tag == "sggCd" else _FILLERS.get(tag, "")
+            parts.append(f"<{tag}>{value}</{tag}>")
+        items.append("<item>" + "".join(parts) + "</item>")
+    body = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f"<response><header><resultCode>{result_code}</resultCode><resultMsg>OK</resultMsg></header>"
+        f"<body><items>{''.join(items)}</items><numOfRows>1000</numOfRows><pageNo>1</pageNo>"
+        f"<totalCount>{len(df_raw)}</totalCount></body></response>"
+    )
+    return body.encode("utf-8")
+
+
+def synthetic_reb_json(sigungu_name="강남구", weeks=120, seed=3):
+    """R-ONE 주간 매매가격지수 변동률 응답(JSON dict). DTA_VAL은 % 단위 주간 변동률이다."""
+    rng = np.random.default_rng(seed)
+    ends = pd.date_range(end=REFERENCE_DATE, periods=weeks, freq="W-MON")
+    rows = [
+        {"STATBL_ID": "A_2024_00178", "DTACYCLE_CD": "WW", "WRTTIME_IDTFR_ID": d.strftime("%Y%m%d"),
+         "WRTTIME_DESC": d.strftime("%Y년 %m월 %d일"), "CLS_ID": 500001, "CLS_NM": sigungu_name, "CLS_FULLNM": f"서울>{sigungu_name}",
+         "ITM_ID": 100001, "ITM_NM": "지수변동률", "UI_NM": "%", "DTA_VAL": round(float(v), 2)}
+        for d, v in zip(ends, rng.normal(0.08, 0.12, weeks))
+    ]
+    head = [{"list_total_count": weeks}, {"RESULT": {"CODE": "INFO-000", "MESSAGE": "정상 처리되었습니다."}}]
+    return {"SttsApiTblData": [{"head": head}, {"row": rows}]}
+
+
+def synthetic_applyhome_rows(n, seed=4):
+    """청약홈 분양공고 상세 행 n건(API data 배열 원소 형식)."""
+    rng = np.random.default_rng(seed)
+    notices = REFERENCE_DATE - pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    rows = []
+    for i, d in enumerate(notices):
+        gu = list(DISTRICTS)[i % len(DISTRICTS)]
+        start = d + pd.Timedelta(days=int(rng.integers(7, 15)))
+        rows.append({
+            "HOUSE_MANAGE_NO": str(2024000000 + i), "PBLANC_NO": str(2024000000 + i),
+            "HOUSE_NM": f"{rng.choice(_BRANDS)} {gu.split()[-1]} {i}", "HOUSE_SECD": "01", "HOUSE_SECD_NM": "APT",
+            "HSSPLY_ADRES": f"{gu} {DISTRICTS[gu][1][0]} {int(rng.integers(1, 900))}번지",
+            "TOT_SUPLY_HSHLDCO": int(rng.integers(30, 3000)), "SUBSCRPT_AREA_CODE_NM": "서울" if gu.startswith("서울") else "경기",
+            "RCRIT_PBLANC_DE": d.strftime("%Y-%m-%d"), "RCEPT_BGNDE": start.strftime("%Y-%m-%d"),
+            "RCEPT_ENDDE": (start + pd.Timedelta(days=4)).strftime("%Y-%m-%d"),
+            "PRZWNER_PRESNATN_DE": (start + pd.Timedelta(days=11)).strftime("%Y-%m-%d"),
+            "SPSPLY_RCEPT_BGNDE": start.strftime("%Y-%m-%d"), "GNRL_RNK1_CRSPAREA_RCPTDE": (start + pd.Timedelta(days=1)).strftime("%Y-%m-%d"),
+            "MDHS_TELNO": "0215880000", "HMPG_ADRES": "https://www.applyhome.co.kr",
+        })
+    return rows
+
+
+def applyhome_page(rows, page=1, per_page=500):
+    """청약홈 odcloud 응답 한 페이지(JSON dict)."""
+    chunk = rows[(page - 1) * per_page:page * per_page]
+    return {"currentCount": len(chunk), "data": chunk, "matchCount": len(rows), "page": page,
+            "perPage": per_page, "totalCount": len(rows)}
+
+
+def master_sheet(complexes, share=0.3, seed=5):
+    """'기준정보' 시트: 일부 단지의 전고점(억)·입지점수. 단지명은 표기 흔들림이 있는 원본 그대로 쓴다."""
+    rng = np.random.default_rng(seed)
+    sample = complexes.sample(frac=share, random_state=seed)
+    peak = (sample["평당가"] * 84.97 / 3.3 * rng.normal(1.15, 0.08, len(sample)) / 10000).round(2)
+    return pd.DataFrame({"아파트명": sample["아파트"].to_numpy(), "전고점(억)": peak.to_numpy(),
+                         "입지점수": sample["입지점수"].to_numpy()})
+
+
+def dumps(data):
+    """JSON 픽스처 직렬화(한글 그대로)."""
+    return json.dumps(data, ensure_ascii=False, indent=1)
@@ -0,0 +1,160 @@
+"""
+실거래 수집 파이프라인 (국토부 XML 파싱 → 정제 → 전월세 병합 → 지수 기반 추정 시세).
+
+사이드바 수집 버튼이 쓰는 변환 단계를 모아 둔 모듈이다. HTTP 호출·재시도·캐시는 app.py에 남기고,
+여기에는 응답 본문과 DataFrame만 다루는 함수를 둔다.
+"""
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import pandas as pd
+
+from registry import resolve_complex_ids
+from rent_store import estimate_jeonse_fallback, pyung_key
+
+# 응답 컬럼 → (구 API 태그, 신 API 태그, 기본값). 같은 API라도 버전에 따라 한글/영문 태그가 섞여 온다.
+TRADE_FIELDS = (
+    ("아파트", "aptNm", ""), ("전용면적", "excluUseAr", "0"), ("거래금액", "dealAmount", "0"),
+    ("층", "floor", ""), ("건축년도", "buildYear", ""), ("법정동", "umdNm", ""),
+)
+RENT_FIELDS = (
+    ("아파트", "aptNm", ""), ("전용면적", "excluUseAr", "0"), ("보증금액", "deposit", "0"),
+    ("월세금액", "monthlyRent", "0"), ("법정동", "umdNm", ""),
+)
+# 계약일 컬럼은 앞뒤 공백을 제거한다.
+_DATE_FIELDS = (("년", "dealYear"), ("월", "dealMonth"), ("일", "dealDay"))
+_OK_CODES = ("00", "000")
+
+
+def _parse_items(content, fields):
+    root = ET.fromstring(content)
+    result_code = root.findtext(".//resultCode")
+    if result_code not in _OK_CODES:
+        return result_code, None
+    data_list = []
+    for item in root.findall(".//item"):
+        row = {col: item.findtext(col) or item.findtext(tag) or default for col, tag, default in fields}
+        for col, tag in _DATE_FIELDS:
+            row[col] = (item.findtext(col) or item.findtext(tag) or "").strip()
+        data_list.append(row)
+    return result_code, pd.DataFrame(data_list)
+
+
+def parse_trade_xml(content):
+    """매매 실거래 응답 XML → (resultCode, DataFrame). resultCode가 정상이 아니면 DataFrame 대신 None."""
+    return _parse_items(content, TRADE_FIELDS)
+
+
+def parse_rent_xml(content):
+    """전월세 실거래 응답 XML → (resultCode, DataFrame). resultCode가 정상이 아니면 DataFrame 대신 None."""
+    return _parse_items(content, RENT_FIELDS)
+
+
+def freshness_label(deal_date_str, now=None):
+    now = now or datetime.now()
+    try:
+        days = (now - pd.to_datetime(deal_date_str)).days
+    except Exception:
+        return "❓ 미확인"
+    if days <= 7:
+        return "🟢 실시간급(1주)"
+    if days <= 30:
+        return "🟡 최신(1개월)"
+    if days <= 90:
+        return "🟠 보통(3개월)"
+    return "🔴 참고용(3개월+)"
+
+
+def clean_trades(df_all_trade, db_path, now=None):
+    """
+    구별 매매 원본(파싱 결과에 '구' 컬럼을 붙여 합친 프레임)을 화면·시트 형식으로 정제한다.
+    단지명은 레지스트리(db_path)에서 한 번만 정규화하고, 이후 병합·집계는 정수 단지ID로 한다.
+    """
+    now = now or datetime.now()
+    df_clean = pd.DataFrame()
+    df_clean['아파트명'] = df_all_trade['아파트']
+    df_clean['지역'] = df_all_trade['구'] + " " + df_all_trade['법정동']
+    df_clean['시군구'] = df_all_trade['구']
+    df_clean['평형'] = pd.to_numeric(df_all_trade['전용면적'], errors='coerce').fillna(0).apply(lambda x: round(x / 3.3, 1))
+    df_clean['층'] = df_all_trade['층']
+    df_clean['건축년도'] = df_all_trade['건축년도']
+    df_clean['매매가(억)'] = pd.to_numeric(df_all_trade['거래금액'].astype(str).str.replace(',', '').str.strip(), errors='coerce').fillna(0).astype(int) / 10000
+
+    df_clean['년'] = df_all_trade['년'].astype(str).str.zfill(4)
+    df_clean['월'] = df_all_trade['월'].astype(str).str.zfill(2)
+    df_clean['일'] = df_all_trade['일'].astype(str).str.zfill(2)
+    df_clean['거래일'] = df_clean.apply(lambda x: f"{x['년']}-{x['월']}-{x['일']}" if x['년'] != '0000' else now.strftime("%Y-%m-%d"), axis=1)
+
+    df_clean['단지ID'] = resolve_complex_ids(db_path, df_all_trade['아파트'], df_all_trade['구'], df_all_trade['법정동'])
+    df_clean['조인키_평형'] = pyung_key(df_clean['평형'])
+    df_clean['데이터신선도'] = df_clean['거래일'].apply(freshness_label, now=now)
+    return df_clean
+
+
+def merge_rent_averages(df_clean, rent_avg):
+    """
+    정제된 매매 행에 (단지ID, 평형)별 전월세 평균(rent_store.load_rent_averages 결과)을 붙인다.
+    전세 실거래가 없는 평형은 같은 단지 → 같은 시군구 전세가율로 추정하고, 그래도 없으면 매매가 × 0.6.
+    """
+    df_clean = pd.merge(df_clean, rent_avg, how='left', on=['단지ID', '조인키_평형'])
+    df_clean['전세가(억)'] = estimate_jeonse_fallback(df_clean)
+    df_clean['월세보증금(억)'] = df_clean['평균월세보증금(억)'].fillna(0)
+    df_clean['월세액(만원)'] = df_clean['평균월세액(만)'].fillna(0)
+    return df_clean
+
+
+def parse_reb_rows(data):
+    """R-ONE 통계표 응답 JSON(dict) → 주간 지수 행 DataFrame. 행이 없으면 빈 DataFrame."""
+    rows = data.get("SttsApiTblData", [{}, {}])
+    if len(rows) > 1 and "row" in rows[1]:
+        return pd.DataFrame(rows[1]["row"])
+    return pd.DataFrame()
+
+
+def estimate_today_price(last_price_eok, last_deal_date_str, sigungu_name, fetch_index, now=None):
+    """
+    마지막 실거래가에 거래일 이후 R-ONE 주간 변동률을 누적 적용한 추정 시세.
+    fetch_index(sigungu_name, weeks_back)는 주간 지수 DataFrame(DTA_VAL 컬럼, % 단위)을 돌려준다.
+    반환: (추정 시세(억), 누적 변동률(%)). 거래가 1주 이내면 변동률 0.0, 지수가 없으면 None.
+    """
+    try:
+        last_deal_date = pd.to_datetime(last_deal_date_str)
+    except Exception:
+        return last_price_eok, 0.0
+
+    days_gap = ((now or datetime.now()) - last_deal_date).days
+    if days_gap <= 7:
+        return last_price_eok, 0.0
+
+    weeks_gap = max(1, days_gap // 7)
+    df_idx = fetch_index(sigungu_name, weeks_gap)
+    if df_idx.empty or "DTA_VAL" not in df_idx.columns:
+        return last_price_eok, None
+
+    weekly_changes = pd.to_numeric(df_idx["DTA_VAL"], errors="coerce").dropna() / 100
+    if weekly_changes.empty:
+        return last_price_eok, None
+
+    cumulative_factor = (1 + weekly_changes).prod()
+    estimated = round(last_price_eok * cumulative_factor, 2)
+    change_pct = round((cumulative_factor - 1) * 100, 2)
+    return estimated, change_pct
+
+
+def estimate_prices(df_clean, fetch_index, market_buffer=0, now=None):
+    """
+    모든 행에 추정현재시세(억)·누적변동률(%)·지수추정시세(억)를 채운다.
+    market_buffer(%)는 후행 데이터의 상승장 과소평가를 보정하는 안전마진으로 추정현재시세에만 더하고,
+    보정 전 값은 지수추정시세(억)에 남겨 AI 호가 검증 시 비교 근거로 쓴다.
+    """
+    est_prices, cum_changes = [], []
+    for _, row in df_clean.iterrows():
+        est, chg = estimate_today_price(row['매매가(억)'], row['거래일'], row['시군구'], fetch_index, now=now)
+        est_prices.append(est)
+        cum_changes.append(chg if chg is not None else 0.0)
+    df_clean['추정현재시세(억)'] = est_prices
+    df_clean['누적변동률(%)'] = cum_changes
+    df_clean['지수추정시세(억)'] = df_clean['추정현재시세(억)']
+    if market_buffer > 0:
+        df_clean['추정현재시세(억)'] = (df_clean['추정현재시세(억)'] * (1 + market_buffer / 100)).round(2)
+    return df_clean
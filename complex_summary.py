@@ -0,0 +1,120 @@
+"""
+단지×평형 요약 테이블 (materialized summary).
+
+실거래 행을 그대로 랭킹·추천에 쓰면 거래가 많은 단지가 여러 번 노출되고, 매 rerun마다 문자열 키를 다시 만든다.
+여기서는 (단지ID, 평형) 단위로 한 번 집계해 두고, 새 거래가 들어오면 영향받은 그룹만 다시 계산한다.
+"""
+import numpy as np
+import pandas as pd
+
+SUMMARY_KEY = ['단지ID', '평형']
+# 최근 N건 평균가 산출에 쓰는 거래 건수
+SUMMARY_LAST_N = 3
+
+_NUMERIC_COLS = ['평형', '매매가(억)', '추정현재시세(억)', '지수추정시세(억)', '누적변동률(%)',
+                 '전세가(억)', '월세보증금(억)', '월세액(만원)', '전고점(억)', '입지점수']
+# 거래 한 건을 식별하는 컬럼 (증분 갱신 시 새 거래 판별용)
+_TRADE_IDENTITY_COLS = ['아파트명', '지역', '평형', '층', '거래일', '매매가(억)']
+
+
+def freshness_labels(deal_dates, now=None):
+    """freshness_label()의 벡터화 버전. 거래일 Series → 데이터신선도 라벨 Series."""
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+    days = (now - pd.to_datetime(deal_dates, errors='coerce')).dt.days
+    labels = np.select(
+        [days <= 7, days <= 30, days <= 90, days > 90],
+        ["🟢 실시간급(1주)", "🟡 최신(1개월)", "🟠 보통(3개월)", "🔴 참고용(3개월+)"],
+        default="❓ 미확인",
+    )
+    return pd.Series(labels, index=deal_dates.index)
+
+
+def prepare_trades(df_trades):
+    """
+    시트/수집 데이터의 타입을 정리한다. 원본은 변경하지 않는다.
+    그룹 키인 단지ID 컬럼(registry.resolve_complex_ids 결과)이 미리 붙어 있어야 한다.
+    """
+    df = df_trades.copy()
+    for c in _NUMERIC_COLS:
+        if c not in df.columns:
+            df[c] = 0
+        # 공유 데이터셋의 float32 값을 float64로 올릴 때 생기는 표기 오차(12.340000152...)를 반올림으로 제거한다.
+        df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0).astype(float).round(4)
+    for c in ['층', '건축년도', '거래일']:
+        if c not in df.columns:
+            df[c] = "-"
+    df.loc[df['추정현재시세(억)'] == 0, '추정현재시세(억)'] = df['매매가(억)']
+    df.loc[df['지수추정시세(억)'] == 0, '지수추정시세(억)'] = df['추정현재시세(억)']
+    if pd.api.types.is_datetime64_any_dtype(df['거래일']):
+        df['거래일'] = df['거래일'].dt.strftime("%Y-%m-%d").fillna("-")
+    df['아파트명'] = df['아파트명'].astype(str)
+    df['지역'] = df['지역'].astype(str)
+    df['단지ID'] = df['단지ID'].astype('int64')
+    return df
+
+
+def trade_fingerprints(df_trades):
+    """거래 행별 해시. 이전 집계 이후 새로 들어온 거래를 찾는 데 쓴다."""
+    cols = [c for c in _TRADE_IDENTITY_COLS if c in df_trades.columns]
+    return pd.util.hash_pandas_object(df_trades[cols].astype(str), index=False)
+
+
+def build_complex_summary(df_trades, last_n=SUMMARY_LAST_N, now=None):
+    """
+    거래 행을 (단지ID, 평형) 단위로 집계한다. df_trades는 prepare_trades()를 거친 프레임이어야 한다.
+    - 최근 거래 기준 값: 아파트명·층·건축년도·거래일·매매가·추정시세·전월세
+    - 통계: 중위매매가, 최근 N건 평균가, 거래건수, 최고실거래가, 전고점(기준정보에 기록된 값)
+    - 파생: 하락률·갭·전세가율·연수익률(월세)·데이터신선도·선택키
+    """
+    if df_trades.empty:
+        return pd.DataFrame()
+
+    df = df_trades.sort_values('거래일', kind='stable')
+    grouped = df.groupby(SUMMARY_KEY, sort=False, observed=True)
+
+    latest = grouped.tail(1).set_index(SUMMARY_KEY)
+    summary = latest[['아파트명', '지역', '층', '건축년도', '거래일', '매매가(억)', '추정현재시세(억)', '지수추정시세(억)',
+                      '누적변동률(%)', '전세가(억)', '월세보증금(억)', '월세액(만원)']].copy()
+    summary['중위매매가(억)'] = grouped['매매가(억)'].median()
+    summary[f'최근{last_n}건평균(억)'] = df.groupby(SUMMARY_KEY, sort=False, observed=True).tail(last_n) \
+        .groupby(SUMMARY_KEY, observed=True)['매매가(억)'].mean()
+    summary['거래건수'] = grouped.size()
+    summary['최고실거래가(억)'] = grouped['매매가(억)'].max()
+    summary['전고점(억)'] = grouped['전고점(억)'].max()
+    summary['입지점수'] = grouped['입지점수'].max()
+    summary = summary.reset_index()
+
+    price = summary['추정현재시세(억)']
+    summary['시군구'] = summary['지역'].str.split(' ').str[:2].str.join(' ')
+    summary['하락률(%)'] = np.where(summary['전고점(억)'] > 0,
+                                  (summary['전고점(억)'] - price) / summary['전고점(억)'].where(summary['전고점(억)'] > 0) * 100, 0.0)
+    summary['하락률(%)'] = summary['하락률(%)'].fillna(0.0)
+    summary['갭(억)'] = price - summary['전세가(억)']
+    summary['전세가율(%)'] = np.where(price > 0, summary['전세가(억)'] / price.where(price > 0) * 100, 0.0)
+    summary['연수익률(%)'] = np.where((price > 0) & (summary['월세액(만원)'] > 0),
+                                  (summary['월세액(만원)'] * 12 / 10000) / price.where(price > 0) * 100, 0.0)
+    summary['데이터신선도'] = freshness_labels(summary['거래일'], now=now)
+    summary['선택키'] = (summary['지역'] + " " + summary['아파트명'] + " (" + summary['건축년도'].astype(str)
+                      + "년식, " + summary['평형'].astype(str) + "평)")
+    return summary.sort_values('선택키', kind='stable').reset_index(drop=True)
+
+
+def update_complex_summary(summary, df_trades, new_mask, last_n=SUMMARY_LAST_N, now=None):
+    """
+    증분 갱신: new_mask(새 거래 여부 bool Series)에 걸린 그룹만 전체 거래에서 다시 집계해 교체한다.
+    df_trades는 prepare_trades()를 거친 전체 거래 프레임이다.
+    """
+    if summary is None or summary.empty:
+        return build_complex_summary(df_trades, last_n=last_n, now=now)
+    if not new_mask.any():
+        return summary
+
+    touched = pd.MultiIndex.from_frame(df_trades.loc[new_mask, SUMMARY_KEY].drop_duplicates())
+    in_touched = pd.MultiIndex.from_frame(df_trades[SUMMARY_KEY]).isin(touched)
+    rebuilt = build_complex_summary(df_trades[in_touched], last_n=last_n, now=now)
+
+    keep = ~pd.MultiIndex.from_frame(summary[SUMMARY_KEY]).isin(touched)
+    merged = pd.concat([summary[keep], rebuilt], ignore_index=True)
+    # 건드리지 않은 그룹도 날짜가 지나면 신선도 등급이 바뀌므로 라벨만 다시 매긴다.
+    merged['데이터신선도'] = freshness_labels(merged['거래일'], now=now)
+    return merged.sort_values('선택키', kind='stable').reset_index(drop=True)
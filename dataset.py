@@ -0,0 +1,85 @@
+"""
+프로세스 공유 데이터셋용 dtype 압축과 세션 메모리 측정.
+
+세션마다 object dtype DataFrame 사본을 들고 있지 않도록, 공유 데이터는 한 번만 압축(compact_frame)해
+st.cache_resource로 보관하고 세션에는 키·필터 상태만 남긴다.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+# float32로 줄이는 가격·비율 컬럼 (평형은 조인 키로 쓰이므로 float64 유지)
+FLOAT32_COLUMNS = ['매매가(억)', '추정현재시세(억)', '지수추정시세(억)', '누적변동률(%)', '전세가(억)', '월세보증금(억)',
+                   '월세액(만원)', '전고점(억)']
+CATEGORY_COLUMNS = ['아파트명', '지역', '시군구', '데이터신선도', '자문유형']
+DATETIME_COLUMNS = ['거래일']
+
+
+def frame_nbytes(df):
+    """DataFrame의 실제 메모리 사용량(문자열 객체 포함, bytes)."""
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+
+def compact_frame(df):
+    """
+    가격은 float32, 반복 문자열은 category, 거래일은 datetime64로 바꾼 사본과 압축 전/후 크기를 반환한다.
+    반환: (df_compact, {"original_bytes": int, "compact_bytes": int})
+    """
+    if df is None or df.empty:
+        empty = df if df is not None else pd.DataFrame()
+        return empty, {"original_bytes": frame_nbytes(empty), "compact_bytes": frame_nbytes(empty)}
+
+    original = frame_nbytes(df)
+    out = df.copy()
+    for c in FLOAT32_COLUMNS:
+        if c in out.columns:
+            out[c] = pd.to_numeric(out[c], errors='coerce').astype('float32')
+    for c in CATEGORY_COLUMNS:
+        if c in out.columns and not isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype('category')
+    for c in DATETIME_COLUMNS:
+        if c in out.columns:
+            out[c] = pd.to_datetime(out[c], errors='coerce')
+    return out, {"original_bytes": original, "compact_bytes": frame_nbytes(out)}
+
+
+def to_plain_frame(df):
+    """
+    압축된 프레임을 시트 저장·프롬프트용 일반 dtype으로 되돌린다.
+    float32는 float64로 올린 뒤 소수 4자리로 반올림해 12.340000152 같은 표기 오차를 없앤다.
+    """
+    out = df.copy()
+    for c in out.columns:
+        dtype = out[c].dtype
+        if dtype == np.float32:
+            out[c] = out[c].astype('float64').round(4)
+        elif isinstance(dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(object)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            out[c] = out[c].dt.strftime("%Y-%m-%d")
+    return out
+
+
+def session_memory_bytes(state):
+    """세션 상태(dict 유사 객체)가 직접 들고 있는 값들의 대략적인 메모리(bytes)."""
+    total = 0
+    for value in state.values():
+        if isinstance(value, pd.DataFrame):
+            total += frame_nbytes(value)
+        elif isinstance(value, (list, tuple)):
+            total += sys.getsizeof(value) + sum(
+                sys.getsizeof(v) + sum(sys.getsizeof(x) for x in v.values()) if isinstance(v, dict) else sys.getsizeof(v)
+                for v in value
+            )
+        else:
+            total += sys.getsizeof(value)
+    return total
+
+
+def format_bytes(n):
+    """사람이 읽기 쉬운 단위로 변환한다."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
@@ -0,0 +1,100 @@
+"""
+앱 콜드 스타트 import 시간 예산 점검.
+
+app.py의 모듈 최상위 import 문만 뽑아 `python -X importtime`으로 여러 번 측정하고(최솟값 사용),
+패키지별 누적 시간과 합계를 예산과 비교한다. 다음 경우 종료 코드 1을 반환한다.
+- 합계가 예산(--budget-ms)을 넘는 경우
+- 지연 로드해야 하는 SDK(LAZY_MODULES)가 최상위 import 경로에 다시 들어온 경우
+
+사용법: python importtime_report.py [--budget-ms 900] [--runs 5] [--top 10]
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+DEFAULT_BUDGET_MS = 900
+# 첫 사용 시점에 함수 안에서 불러오는 무거운 SDK. 최상위 import에 나타나면 예산 위반으로 본다.
+LAZY_MODULES = ("google.genai", "streamlit_gsheets")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def top_level_imports(path=APP_PATH):
+    """스크립트의 모듈 최상위 import 문을 원문 그대로 반환한다. (함수 안의 지연 import는 제외)"""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return [ast.get_source_segment(source, node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def measure(statements, cwd):
+    """import 문들을 새 인터프리터에서 한 번 실행하고 [(모듈, 누적 us, 깊이)] 목록을 반환한다."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "\n".join(statements)],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+
+def summarize(runs):
+    """여러 번 측정한 결과에서 최상위(깊이 0) 패키지별 최소 누적 시간(ms)과 전체 모듈 이름 집합."""
+    per_package, modules = {}, set()
+    for rows in runs:
+        seen = {}
+        for name, cumulative, depth in rows:
+            modules.add(name)
+            if depth == 0:
+                root = name.split(".")[0]
+                seen[root] = seen.get(root, 0) + cumulative
+        for root, us in seen.items():
+            per_package[root] = min(per_package.get(root, us), us)
+    return {k: v / 1000 for k, v in per_package.items()}, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    statements = top_level_imports()
+    cwd = os.path.dirname(APP_PATH)
+    runs = [measure(statements, cwd) for _ in range(args.runs)]
+    per_package, modules = summarize(runs)
+    # 인터프리터 기동 때 이미 로드되는 모듈(site, encodings 등)은 앱 import 비용에서 뺀다.
+    startup, _ = summarize([measure(["pass"], cwd)])
+    per_package = {k: v for k, v in per_package.items() if k not in startup}
+    total = sum(per_package.values())
+
+    print(f"최상위 import {len(statements)}개, {args.runs}회 측정 (패키지별 최솟값)")
+    for name, ms in sorted(per_package.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:<24s} {ms:8.1f} ms")
+    print(f"합계 {total:.1f} ms / 예산 {args.budget_ms:.0f} ms")
+
+    eager = sorted({m for m in modules for lazy in LAZY_MODULES if m == lazy or m.startswith(lazy + ".")})
+    failed = False
+    if eager:
+        print(f"🚨 지연 로드 대상이 최상위 import 경로에 있습니다: {', '.join(eager[:5])}")
+        failed = True
+    if total > args.budget_ms:
+        print(f"🚨 import 시간 예산 초과: {total - args.budget_ms:.1f} ms")
+        failed = True
+    if not failed:
+        print("✅ 예산 이내")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+부하 테스트용 가짜 google-genai SDK.
+
+app.py가 쓰는 범위(genai.Client(...).models.generate_content, types.GenerateContentConfig/Tool/GoogleSearch,
+errors.APIError/ServerError/ClientError의 .code)만 흉내 낸다. install()로 sys.modules에 넣으면
+app.py의 `from google import genai` / `from google.genai import types, errors`가 이 모듈을 가져간다.
+- 모델별 동작: down에 든 모델은 항상 503, 그 밖의 모델은 rate_503/rate_429 비율로 오류를 낸다.
+  알 수 없는 모델은 404 ClientError. (GEMINI_FALLBACK_MODELS 폴백 체인이 실제로 다음 모델로 넘어가는지 확인용)
+- 지연: latency_s(평균)·jitter_s, 검색 도구를 켠 호출은 search_latency_s를 더한다.
+- (모델, 결과)별 호출 수를 센다. 결과는 ok / 429 / 503 / 404.
+"""
+import random
+import sys
+import threading
+import time
+import types as pytypes
+from collections import Counter
+
+KNOWN_MODELS = ("gemini-2.5-flash", "gemini-2.5-flash-lite", "gemini-2.5-pro")
+DEFAULT_BEHAVIOR = {
+    "latency_s": 1.5, "jitter_s": 0.5, "search_latency_s": 2.0,
+    "rate_503": 0.0, "rate_429": 0.0, "down": (), "models": KNOWN_MODELS,
+}
+
+_lock = threading.Lock()
+_calls = Counter()
+behavior = dict(DEFAULT_BEHAVIOR)
+
+
+class APIError(Exception):
+    def __init__(self, code, message, status=""):
+        super().__init__(f"{code} {status}. {message}")
+        self.code, self.status, self.message = code, status, message
+
+
+class ClientError(APIError):
+    pass
+
+
+class ServerError(APIError):
+    pass
+
+
+class GoogleSearch:
+    pass
+
+
+class Tool:
+    def __init__(self, google_search=None, **kwargs):
+        self.google_search = google_search
+
+
+class GenerateContentConfig:
+    def __init__(self, tools=None, **kwargs):
+        self.tools = tools or []
+
+
+class _Usage:
+    def __init__(self, prompt_chars, answer_chars, search):
+        self.prompt_token_count = max(1, prompt_chars // 2)
+        self.candidates_token_count = max(1, answer_chars // 2)
+        self.thoughts_token_count = 0
+        self.tool_use_prompt_token_count = 300 if search else 0
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count + self.tool_use_prompt_token_count
+
+
+class _Response:
+    def __init__(self, text, usage_metadata):
+        self.text, self.usage_metadata = text, usage_metadata
+
+
+def _count(model, outcome):
+    with _lock:
+        _calls[(model, outcome)] += 1
+
+
+class _Models:
+    def generate_content(self, model, contents, config=None):
+        b = behavior
+        search = bool(config and any(getattr(t, "google_search", None) for t in config.tools))
+        time.sleep(max(0.0, b["latency_s"] + random.uniform(-1, 1) * b["jitter_s"] + (b["search_latency_s"] if search else 0.0)))
+        if model not in b["models"]:
+            _count(model, "404")
+            raise ClientError(404, f"models/{model} is not found", "NOT_FOUND")
+        roll = random.random()
+        if model in b["down"] or roll < b["rate_503"]:
+            _count(model, "503")
+            raise ServerError(503, "The model is overloaded. Please try again later.", "UNAVAILABLE")
+        if roll < b["rate_503"] + b["rate_429"]:
+            _count(model, "429")
+            raise ClientError(429, "Resource has been exhausted (e.g. check quota).", "RESOURCE_EXHAUSTED")
+        _count(model, "ok")
+        prompt = contents if isinstance(contents, str) else str(contents)
+        text = f"[{model}] 부하 테스트용 가짜 응답입니다. (프롬프트 {len(prompt)}자{', 검색 사용' if search else ''})"
+        return _Response(text, _Usage(len(prompt), len(text), search))
+
+
+class Client:
+    def __init__(self, api_key=None, **kwargs):
+        self.models = _Models()
+
+
+def configure(**overrides):
+    """동작을 바꾼다(일부 항목만 넘겨도 된다). 실행 중에 바꾸면 다음 호출부터 적용된다."""
+    behavior.update(overrides)
+
+
+def call_counts():
+    """(모델, 결과)별 호출 수 행 목록."""
+    with _lock:
+        items = sorted(_calls.items())
+    return [{"모델": model, "결과": outcome, "호출 수": n} for (model, outcome), n in items]
+
+
+def install():
+    """sys.modules의 google.genai(·types·errors)를 이 가짜 구현으로 바꾼다. 이미 불러온 실제 SDK가 있어도 덮어쓴다."""
+    genai = pytypes.ModuleType("google.genai")
+    types_mod = pytypes.ModuleType("google.genai.types")
+    errors_mod = pytypes.ModuleType("google.genai.errors")
+    types_mod.GenerateContentConfig, types_mod.Tool, types_mod.GoogleSearch = GenerateContentConfig, Tool, GoogleSearch
+    errors_mod.APIError, errors_mod.ClientError, errors_mod.ServerError = APIError, ClientError, ServerError
+    genai.Client, genai.types, genai.errors = Client, types_mod, errors_mod
+    genai.__path__ = []  # 하위 모듈 import(from google.genai import types)가 패키지로 취급하도록
+
+    google = sys.modules.get("google")
+    if google is None:
+        try:
+            import google  # noqa: F401 - 실제 SDK가 설치돼 있으면 네임스페이스 패키지를 그대로 쓴다.
+        except ImportError:
+            google = pytypes.ModuleType("google")
+            google.__path__ = []
+            sys.modules["google"] = google
+        google = sys.modules["google"]
+    google.genai = genai
+    sys.modules.update({"google.genai": genai, "google.genai.types": types_mod, "google.genai.errors": errors_mod})
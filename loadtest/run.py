@@ -0,0 +1,391 @@
+"""
+멀티 세션 부하 테스트.
+
+한 프로세스 안에서 Streamlit 세션 N개를 AppTest로 동시에 돌린다. 세션들은 실제 배포처럼 st.cache_resource/
+st.cache_data·로컬 저장소(SQLite)·구간 추적 지표를 공유하고, 외부 API는 모두 로컬 대역으로 바꾼다.
+- 국토부·R-ONE·청약홈: stubs.py (녹화 응답 재생, 지연·429/503 주입, totalCount 페이지 나눔)
+- Gemini: fake_genai.py (모델별 503/429·지연, 폴백 체인 확인)
+- 구글 시트: 프로세스 메모리에 두는 대역(읽기·쓰기 지연 포함)
+세션마다 시나리오(열기 → 구 선택 → 수집 → 시트 저장 → 지역 추천 → 청약 공고 → 청약 자문)를 진행하며
+상호작용(재실행)마다 시간을 잰다. 끝나면 다음을 출력한다.
+- 단계별 재실행 지연 p50/p95/p99/최대, 예외·오류·경고 메시지 수
+- 대역별(HTTP 상태별) 호출 수, Gemini 모델·결과별 호출 수, 시트 읽기·쓰기 수
+- 세션별 세션 상태 메모리와 프로세스 RSS(시작·최대·세션당 증가분)
+- 앱 구간 추적(tracing) 요약 중 수집·Gemini·재실행 구간
+
+사용법:
+  python loadtest/run.py --sessions 20
+  python loadtest/run.py --sessions 20 --gemini-down gemini-2.5-flash --gemini-503 0.3   # 503 폭주
+  python loadtest/run.py --sessions 10 --molit-503 0.2 --molit-429 0.05 --steps open select collect --json out.json
+  python loadtest/run.py --sessions 10 --molit-cache-ttl 0   # 국토부 응답 캐시 없이 (대역 호출 부하 측정)
+AppTest는 Runtime·st.secrets·설정을 전역으로 바꾸며 실행하므로, 전역 설정은 프로세스 시작 때 한 번만 하고
+세션마다 스크립트 러너만 새로 만든다(SessionAppTest). 결과 숫자는 같은 머신에서 돌린 결과끼리만 비교한다.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from unittest.mock import MagicMock
+from urllib import parse
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(LOADTEST_DIR)
+sys.path.insert(0, REPO_DIR)
+APP_PATH = os.path.join(REPO_DIR, "app.py")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import fake_genai  # noqa: E402
+import stubs  # noqa: E402
+import tracing  # noqa: E402
+from dataset import format_bytes, session_memory_bytes  # noqa: E402
+
+STEPS = ("open", "select", "collect", "save", "recommend", "applyhome", "applyhome_advice")
+# 세션마다 이 목록을 돌려 가며 구를 고른다. 앞쪽 구는 여러 세션이 겹쳐 수집 공유본 재사용도 함께 재현된다.
+DISTRICT_POOL = ("서울 강남구", "서울 노원구", "서울 서초구", "서울 송파구", "서울 마포구", "서울 성동구",
+                 "서울 강동구", "서울 양천구", "서울 영등포구", "서울 동작구")
+# 요약에 남길 앱 구간 이름 접두어
+SPAN_PREFIXES = ("rerun.", "gemini.", "collect.", "molit.", "rone.", "applyhome.", "sheet.")
+PERCENTILES = (50, 95, 99)
+
+
+# --------------------------------------------------------------------------
+# 프로세스 전역 준비 (AppTest 전역 상태·시트 대역)
+# --------------------------------------------------------------------------
+def setup_streamlit(secrets):
+    """AppTest가 실행마다 바꾸는 전역(Runtime·st.secrets·appTest 설정)을 한 번만 설정한다."""
+    import streamlit as st
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.secrets import Secrets
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    st.secrets = Secrets()
+    st.secrets._secrets = dict(secrets)
+    config.set_option("global.appTest", True)
+    # 스크립트 러너 밖 스레드(대역 서버 등)에서 나오는 'missing ScriptRunContext' 경고를 끈다.
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+    logging.getLogger("streamlit.runtime.caching.cache_data_api").setLevel(logging.ERROR)
+
+
+def session_app_test_class():
+    """
+    전역을 건드리지 않고 스크립트 러너만 새로 만드는 AppTest. 기본 AppTest._run은 실행마다 Runtime 인스턴스·secrets를
+    바꿨다 되돌리므로 여러 세션을 동시에 돌리면 서로의 전역을 덮어쓴다.
+    """
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.testing.v1 import AppTest
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    class SessionAppTest(AppTest):
+        def _run(self, widget_state=None, timeout=None):
+            timeout = timeout or self.default_timeout
+            pages_manager = PagesManager(self._script_path, setup_watcher=False)
+            runner = LocalScriptRunner(self._script_path, self.session_state, pages_manager, args=self.args, kwargs=self.kwargs)
+            self._tree = runner.run(widget_state, self.query_params, timeout, self._page_hash)
+            self._tree._runner = self
+            self.query_params = parse.parse_qs(runner.event_data[-1]["client_state"].query_string)
+            return self
+
+    return SessionAppTest
+
+
+def install_sheet_stub(latency_s):
+    """streamlit_gsheets 연결의 read/update를 프로세스 메모리 시트로 바꾼다. 반환: (시트 dict, 호출 수 Counter)."""
+    from streamlit_gsheets import GSheetsConnection
+
+    sheets, calls, lock = {}, Counter(), threading.Lock()
+
+    def read(self, worksheet=None, ttl=None, **kwargs):
+        time.sleep(latency_s)
+        with lock:
+            calls["read"] += 1
+            return sheets.get(worksheet or "기본", pd.DataFrame()).copy()
+
+    def update(self, worksheet=None, data=None, **kwargs):
+        time.sleep(latency_s)
+        with lock:
+            calls["update"] += 1
+            sheets[worksheet or "기본"] = data.copy()
+
+    GSheetsConnection.read, GSheetsConnection.update = read, update
+    return sheets, calls
+
+
+# --------------------------------------------------------------------------
+# 세션 시나리오
+# --------------------------------------------------------------------------
+class StepSkipped(Exception):
+    """화면에 필요한 위젯이 없어 단계를 진행할 수 없는 경우."""
+
+
+def _find(widgets, text):
+    for w in widgets:
+        if text in w.label:
+            return w
+    raise StepSkipped(f"'{text}' 위젯 없음")
+
+
+def _prepare(step, at, ctx):
+    """단계별 위젯 조작. 이후 at.run() 한 번이 이 단계의 재실행이다."""
+    if step == "select":
+        for d in ctx["districts"]:
+            at.checkbox(key=f"chk_{d}").check()
+        _find(at.slider, "호출 간격(초)").set_value(ctx["call_interval"])
+        _find(at.slider, "조회 월 범위").set_value(ctx["months"])
+    elif step == "collect":
+        _find(at.button, "데이터 수집").click()
+    elif step == "save":
+        _find(at.button, "구글 시트에 저장").click()
+    elif step == "recommend":
+        box = _find(at.selectbox, "추천받을 지역")
+        if not box.options:
+            raise StepSkipped("추천 지역 없음")
+        box.set_value(ctx["districts"][0] if ctx["districts"][0] in box.options else box.options[0])
+        _find(at.number_input, "최대 예산").set_value(ctx["budget"])
+        at.button(key="btn_recommend").click()
+    elif step == "applyhome":
+        _find(at.button, "최신 서울 청약 일정").click()
+    elif step == "applyhome_advice":
+        _find(at.button, "내 조건에 맞는 단지 추천").click()
+
+
+def run_session(index, app_test_class, args, started_at, results):
+    """세션 하나의 시나리오를 진행하고 단계별 측정 결과를 results[index]에 남긴다."""
+    rng = random.Random(args.seed + index)
+    time.sleep(max(0.0, started_at + args.ramp_up * index / max(1, args.sessions) - time.perf_counter()))
+    start = index * args.districts % len(DISTRICT_POOL)
+    ctx = {
+        "districts": [DISTRICT_POOL[(start + k) % len(DISTRICT_POOL)] for k in range(args.districts)],
+        "call_interval": args.call_interval, "months": args.months, "budget": args.budget,
+    }
+    record = {"session": index, "districts": ctx["districts"], "steps": []}
+    results[index] = record
+    at = app_test_class(APP_PATH, default_timeout=args.timeout)
+    for step in args.steps:
+        entry = {"step": step}
+        try:
+            if step != "open":
+                _prepare(step, at, ctx)
+            t0 = time.perf_counter()
+            at.run()
+            entry["seconds"] = time.perf_counter() - t0
+            entry["exceptions"] = [str(e.value)[:200] for e in at.exception]
+            entry["errors"] = [str(e.value)[:200] for e in at.error]
+            entry["warnings"] = [str(e.value)[:200] for e in at.warning]
+        except StepSkipped as e:
+            entry["skipped"] = str(e)
+        except Exception as e:  # noqa: BLE001 - 한 세션의 실패가 전체 측정을 멈추지 않게 기록만 한다.
+            entry["failed"] = f"{type(e).__name__}: {str(e)[:200]}"
+        record["steps"].append(entry)
+        if "failed" in entry:
+            break
+        time.sleep(args.think_time * rng.uniform(0.5, 1.5))
+    try:
+        record["session_bytes"] = session_memory_bytes(at.session_state.filtered_state)
+    except Exception:  # noqa: BLE001 - 첫 실행 전에 실패한 세션은 상태가 없다.
+        record["session_bytes"] = 0
+
+
+# --------------------------------------------------------------------------
+# 집계·출력
+# --------------------------------------------------------------------------
+def current_rss_bytes():
+    """현재 프로세스 RSS(bytes). /proc이 없으면 최대 RSS로 대신한다."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def latency_rows(records):
+    """단계별(및 전체) 재실행 지연 분위수 행 목록(ms)."""
+    by_step = defaultdict(list)
+    counts = defaultdict(Counter)
+    for rec in records:
+        for e in rec["steps"]:
+            c = counts[e["step"]]
+            if "seconds" in e:
+                by_step[e["step"]].append(e["seconds"])
+                by_step["(전체)"].append(e["seconds"])
+                c["exceptions"] += len(e["exceptions"])
+                c["errors"] += len(e["errors"])
+                c["warnings"] += len(e["warnings"])
+            c["skipped"] += "skipped" in e
+            c["failed"] += "failed" in e
+    rows = []
+    for step in [*STEPS, "(전체)"]:
+        values = by_step.get(step)
+        if not values and not counts.get(step):
+            continue
+        ms = np.array(values or [0.0]) * 1000
+        row = {"단계": step, "횟수": len(values or [])}
+        row.update({f"p{p}(ms)": float(np.percentile(ms, p)) for p in PERCENTILES})
+        row["최대(ms)"] = float(ms.max())
+        c = sum(counts.values(), Counter()) if step == "(전체)" else counts[step]
+        row.update({"예외": c["exceptions"], "오류 메시지": c["errors"], "경고 메시지": c["warnings"],
+                    "건너뜀": c["skipped"], "실패": c["failed"]})
+        rows.append(row)
+    return rows
+
+
+def print_table(title, rows):
+    print(f"\n## {title}")
+    if not rows:
+        print("(없음)")
+        return
+    frame = pd.DataFrame(rows)
+    print(frame.to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+
+
+def build_report(args, records, stub, sheet_calls, rss, wall_seconds):
+    session_bytes = [rec.get("session_bytes", 0) for rec in records]
+    messages = Counter(
+        m for rec in records for e in rec["steps"]
+        for m in e.get("exceptions", []) + e.get("errors", []) + e.get("warnings", [])
+    )
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "json"},
+        "wall_seconds": wall_seconds,
+        "latency": latency_rows(records),
+        "upstream_calls": stubs.call_counts(stub),
+        "gemini_calls": fake_genai.call_counts(),
+        "sheet_calls": [{"작업": k, "호출 수": v} for k, v in sorted(sheet_calls.items())],
+        "memory": {
+            "session_bytes": session_bytes,
+            "session_bytes_max": max(session_bytes or [0]),
+            "rss_start": rss["start"], "rss_end": rss["end"], "rss_peak": peak_rss_bytes(),
+            "rss_per_session": (rss["end"] - rss["start"]) / max(1, len(records)),
+        },
+        "messages": [{"메시지": m, "횟수": n} for m, n in messages.most_common(10)],
+        "spans": [r for r in tracing.span_summary() if r["구간"].startswith(SPAN_PREFIXES)],
+        "sessions": records,
+    }
+
+
+def print_report(report):
+    mem = report["memory"]
+    print(f"\n# 부하 테스트: 세션 {report['config']['sessions']}개, 소요 {report['wall_seconds']:.1f}s")
+    print_table("재실행 지연 (단계별)", report["latency"])
+    print_table("외부 API 대역 호출 수", report["upstream_calls"])
+    print_table("Gemini 호출 수 (모델·결과별)", report["gemini_calls"])
+    print_table("구글 시트 호출 수", report["sheet_calls"])
+    print_table("앱 구간 추적 요약", [
+        {k: r[k] for k in ("구간", "상태", "횟수", "합계(s)", "p50(ms)", "p95(ms)", "최대(ms)")} for r in report["spans"]
+    ])
+    print_table("예외·오류·경고 메시지 (상위 10)", report["messages"])
+    print("\n## 메모리")
+    print(f"세션 상태: 최대 {format_bytes(mem['session_bytes_max'])}, "
+          f"평균 {format_bytes(sum(mem['session_bytes']) / max(1, len(mem['session_bytes'])))}")
+    print(f"프로세스 RSS: 시작 {format_bytes(mem['rss_start'])} → 종료 {format_bytes(mem['rss_end'])} "
+          f"(최대 {format_bytes(mem['rss_peak'])}, 세션당 증가 {format_bytes(max(0, mem['rss_per_session']))})")
+
+
+# --------------------------------------------------------------------------
+# CLI
+# --------------------------------------------------------------------------
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="멀티 세션 부하 테스트 (로컬 대역 API·가짜 Gemini)")
+    p.add_argument("--sessions", type=int, default=5, help="동시 세션 수")
+    p.add_argument("--ramp-up", type=float, default=5.0, help="모든 세션이 시작될 때까지 걸리는 시간(초)")
+    p.add_argument("--think-time", type=float, default=1.0, help="단계 사이 평균 대기(초)")
+    p.add_argument("--steps", nargs="+", choices=STEPS, default=list(STEPS), help="진행할 단계(순서대로)")
+    p.add_argument("--districts", type=int, default=2, help="세션당 수집할 구 수")
+    p.add_argument("--months", type=int, default=2, help="조회 월 범위 슬라이더 값")
+    p.add_argument("--call-interval", type=float, default=0.1, help="호출 간격(초) 슬라이더 값")
+    p.add_argument("--budget", type=float, default=30.0, help="지역 추천의 최대 예산(억)")
+    p.add_argument("--timeout", type=float, default=300, help="재실행 1회 제한 시간(초)")
+    p.add_argument("--seed", type=int, default=0)
+    for name in stubs.UPSTREAMS:
+        default = stubs.DEFAULT_PROFILE[name]
+        p.add_argument(f"--{name}-latency-ms", type=float, default=default["latency_ms"])
+        p.add_argument(f"--{name}-jitter-ms", type=float, default=default["jitter_ms"])
+        p.add_argument(f"--{name}-429", type=float, default=0.0, help=f"{name} 429 응답 비율(0~1)")
+        p.add_argument(f"--{name}-503", type=float, default=0.0, help=f"{name} 503 응답 비율(0~1)")
+    p.add_argument("--applyhome-rows", type=int, default=stubs.APPLYHOME_ROWS, help="청약홈 대역이 가진 공고 수")
+    p.add_argument("--gemini-latency", type=float, default=fake_genai.DEFAULT_BEHAVIOR["latency_s"], help="Gemini 평균 지연(초)")
+    p.add_argument("--gemini-search-latency", type=float, default=fake_genai.DEFAULT_BEHAVIOR["search_latency_s"],
+                   help="검색 도구 사용 시 추가 지연(초)")
+    p.add_argument("--gemini-503", type=float, default=0.0, help="Gemini 503 비율(0~1)")
+    p.add_argument("--gemini-429", type=float, default=0.0, help="Gemini 429 비율(0~1)")
+    p.add_argument("--gemini-down", nargs="*", default=[], help="항상 503을 내는 모델")
+    p.add_argument("--sheet-latency", type=float, default=0.3, help="구글 시트 읽기·쓰기 지연(초)")
+    p.add_argument("--molit-cache-ttl", type=int,
+                   help="국토부 (구, 월) 응답 캐시 유지 시간(초). 0이면 세션마다 대역을 호출한다. 기본은 앱 설정")
+    p.add_argument("--store-dir", help="로컬 저장소(SQLite) 디렉터리. 기본은 실행마다 새 임시 디렉터리")
+    p.add_argument("--json", help="결과를 JSON으로 저장할 경로")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # 대역 서버는 127.0.0.1에 뜨므로 환경의 HTTP 프록시를 타지 않게 한다.
+    os.environ["NO_PROXY"] = ",".join(filter(None, [os.environ.get("NO_PROXY"), "127.0.0.1", "localhost"]))
+
+    stub = stubs.start_stub_server(
+        {name: {"latency_ms": getattr(args, f"{name}_latency_ms"), "jitter_ms": getattr(args, f"{name}_jitter_ms"),
+                "rate_429": getattr(args, f"{name}_429"), "rate_503": getattr(args, f"{name}_503")}
+         for name in stubs.UPSTREAMS},
+        applyhome_rows=args.applyhome_rows,
+    )
+    fake_genai.install()
+    fake_genai.configure(latency_s=args.gemini_latency, search_latency_s=args.gemini_search_latency,
+                         rate_503=args.gemini_503, rate_429=args.gemini_429, down=tuple(args.gemini_down))
+    store_dir = args.store_dir or tempfile.mkdtemp(prefix="loadtest-")
+    setup_streamlit({
+        "GOOGLE_API_KEY": "loadtest", "PUBLIC_DATA_KEY": "loadtest",
+        "LOCAL_STORE_PATH": os.path.join(store_dir, "local_store.sqlite3"), **stub["urls"],
+        # 예약 예열 스레드가 측정 중에 대역을 호출하지 않도록 끈다.
+        "PREWARM_ENABLED": False,
+        **({"MOLIT_CACHE_TTL": args.molit_cache_ttl} if args.molit_cache_ttl is not None else {}),
+    })
+    _, sheet_calls = install_sheet_stub(args.sheet_latency)
+    app_test_class = session_app_test_class()
+
+    print(f"대역 서버 {stub['base_url']}, 저장소 {store_dir}, 세션 {args.sessions}개 시작")
+    rss = {"start": current_rss_bytes()}
+    results = [None] * args.sessions
+    started_at = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_session, args=(i, app_test_class, args, started_at, results), name=f"session-{i}")
+        for i in range(args.sessions)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall_seconds = time.perf_counter() - started_at
+    rss["end"] = current_rss_bytes()
+    stub["server"].shutdown()
+
+    report = build_report(args, [r for r in results if r is not None], stub, sheet_calls, rss, wall_seconds)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1, default=str)
+        print(f"\nJSON 저장: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+부하 테스트용 로컬 대역(stub) API 서버.
+
+benchmarks/fixtures/에 녹화된 응답을 재생해 국토부 실거래(MOLIT)·R-ONE 주간 지수·청약홈(odcloud) API를 흉내 낸다.
+- 경로: /molit/RTMSDataSvcAptTradeDev/..., /molit/RTMSDataSvcAptRent/..., /rone, /applyhome
+  (app.py의 secrets MOLIT_API_BASE / REB_API_URL / APPLYHOME_API_URL을 여기로 돌린다)
+- 국토부: 요청한 LAWD_CD의 녹화 응답(없으면 녹화된 지역 중 하나)을 골라 계약년월을 요청한 DEAL_YMD로 바꾸고,
+  pageNo·numOfRows로 잘라 totalCount와 함께 돌려준다.
+- R-ONE: 녹화된 주간 행을 오늘 기준으로 날짜를 옮긴 뒤 START_WRTTIME~END_WRTTIME 구간만 돌려준다.
+- 청약홈: 녹화된 공고를 오늘 기준으로 날짜를 옮기고 rows건까지 늘린 뒤, cond[...::EQ/GTE] 조건과
+  page·perPage로 잘라 matchCount·totalCount와 함께 돌려준다.
+- 대역별 지연(평균·지터)과 429/503 주입 비율을 설정할 수 있고, (대역, HTTP 상태)별 호출 수를 센다.
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+UPSTREAMS = ("molit", "rone", "applyhome")
+# 대역별 기본 동작. 지연은 ms, 오류 비율은 0~1.
+DEFAULT_PROFILE = {
+    "molit": {"latency_ms": 150, "jitter_ms": 100, "rate_429": 0.0, "rate_503": 0.0},
+    "rone": {"latency_ms": 120, "jitter_ms": 80, "rate_429": 0.0, "rate_503": 0.0},
+    "applyhome": {"latency_ms": 200, "jitter_ms": 100, "rate_429": 0.0, "rate_503": 0.0},
+}
+APPLYHOME_ROWS = 180
+
+_ITEM_RE = re.compile(r"<item>.*?</item>", re.S)
+_YEAR_RE = re.compile(r"<dealYear>\s*\d+\s*</dealYear>")
+_MONTH_RE = re.compile(r"<dealMonth>\s*\d+\s*</dealMonth>")
+_DAY_RE = re.compile(r"<dealDay>\s*(\d+)\s*</dealDay>")
+_DATE_KEYS = ("RCRIT_PBLANC_DE", "RCEPT_BGNDE", "RCEPT_ENDDE", "PRZWNER_PRESNATN_DE", "SPSPLY_RCEPT_BGNDE",
+              "GNRL_RNK1_CRSPAREA_RCPTDE")
+
+
+def _read(name, mode="r"):
+    with open(os.path.join(FIXTURE_DIR, name), mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        return f.read()
+
+
+def load_replay(applyhome_rows=APPLYHOME_ROWS, today=None):
+    """
+    녹화 응답을 재생용 구조로 읽는다.
+    반환 dict: molit[kind][lawd_cd] = 응답 item 문자열 목록(녹화 월을 합친 것), rone = 주간 행 목록(오늘 기준 날짜),
+              applyhome = 공고 행 목록(오늘 기준 날짜, applyhome_rows건)
+    """
+    today = today or datetime.now()
+    manifest = json.loads(_read("manifest.json"))
+    molit = {"trade": {}, "rent": {}}
+    for kind in molit:
+        for entry in manifest[f"molit_{kind}"]:
+            items = _ITEM_RE.findall(_read(entry["file"], "rb").decode("utf-8"))
+            molit[kind].setdefault(entry["lawd_cd"], []).extend(items)
+
+    # R-ONE: 마지막 주가 이번 주 월요일이 되도록 주 단위로 옮긴다.
+    rone = json.loads(_read("rone_weekly.json"))["SttsApiTblData"][1]["row"]
+    this_monday = (today - timedelta(days=today.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    rone = [
+        dict(r, WRTTIME_IDTFR_ID=(this_monday - timedelta(weeks=len(rone) - 1 - i)).strftime("%Y%m%d"))
+        for i, r in enumerate(rone)
+    ]
+
+    # 청약홈: 가장 최근 모집공고일이 오늘이 되도록 모든 날짜를 같은 일수만큼 옮기고, 모자라면 복제해 늘린다.
+    recorded = json.loads(_read("applyhome_page1.json"))["data"]
+    latest = max(datetime.strptime(r["RCRIT_PBLANC_DE"], "%Y-%m-%d") for r in recorded)
+    shift = today.replace(hour=0, minute=0, second=0, microsecond=0) - latest
+    applyhome = []
+    for i in range(applyhome_rows):
+        base, cycle = recorded[i % len(recorded)], i // len(recorded)
+        row = dict(base, PBLANC_NO=str(int(base["PBLANC_NO"]) + cycle * 10_000_000),
+                   HOUSE_MANAGE_NO=str(int(base["HOUSE_MANAGE_NO"]) + cycle * 10_000_000))
+        for key in _DATE_KEYS:
+            if row.get(key):
+                moved = datetime.strptime(row[key], "%Y-%m-%d") + shift - timedelta(days=cycle * 7)
+                row[key] = moved.strftime("%Y-%m-%d")
+        applyhome.append(row)
+    return {"molit": molit, "rone": rone, "applyhome": applyhome}
+
+
+def _param(query, name, default=None):
+    return query.get(name, [default])[0]
+
+
+def molit_body(items, deal_ymd, page_no, num_rows):
+    """국토부 실거래 응답 XML(bytes). 계약년월을 deal_ymd로 바꾸고 한 페이지만 담는다."""
+    year, month = deal_ymd[:4], str(int(deal_ymd[4:6]))
+    page = items[(page_no - 1) * num_rows:page_no * num_rows]
+    body = "".join(
+        _DAY_RE.sub(lambda m: f"<dealDay>{min(int(m.group(1)), 28)}</dealDay>",
+                    _MONTH_RE.sub(f"<dealMonth>{month}</dealMonth>", _YEAR_RE.sub(f"<dealYear>{year}</dealYear>", item)))
+        for item in page
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?><response><header><resultCode>000</resultCode>'
+        f"<resultMsg>OK</resultMsg></header><body><items>{body}</items><numOfRows>{num_rows}</numOfRows>"
+        f"<pageNo>{page_no}</pageNo><totalCount>{len(items)}</totalCount></body></response>"
+    ).encode("utf-8")
+
+
+def rone_body(rows, sigungu_name, start, end):
+    """R-ONE 통계표 응답 JSON(dict). WRTTIME_IDTFR_ID가 start~end('YYYYMMDD')인 행만 담는다."""
+    picked = [dict(r, CLS_NM=sigungu_name) for r in rows if start <= r["WRTTIME_IDTFR_ID"] <= end]
+    head = [{"list_total_count": len(picked)}, {"RESULT": {"CODE": "INFO-000", "MESSAGE": "정상 처리되었습니다."}}]
+    return {"SttsApiTblData": [{"head": head}, {"row": picked}]}
+
+
+def applyhome_body(rows, query):
+    """청약홈 odcloud 응답 JSON(dict). cond[필드::EQ/GTE] 조건을 적용하고 page·perPage로 자른다."""
+    matched = rows
+    for key, values in query.items():
+        m = re.fullmatch(r"cond\[(\w+)::(EQ|GTE)\]", key)
+        if not m:
+            continue
+        field, op, value = m.group(1), m.group(2), values[0]
+        if op == "EQ":
+            matched = [r for r in matched if str(r.get(field, "")) == value]
+        else:
+            matched = [r for r in matched if str(r.get(field, "")) >= value]
+    page, per_page = int(_param(query, "page", 1)), int(_param(query, "perPage", 10))
+    chunk = matched[(page - 1) * per_page:page * per_page]
+    return {"currentCount": len(chunk), "data": chunk, "matchCount": len(matched), "page": page,
+            "perPage": per_page, "totalCount": len(rows)}
+
+
+def _make_handler(server_state):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # 기본 구현은 요청마다 stderr에 한 줄씩 찍는다.
+            pass
+
+        def _send(self, upstream, status, payload, content_type):
+            with server_state["lock"]:
+                server_state["calls"][(upstream, status)] += 1
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            upstream = parts.path.strip("/").split("/")[0]
+            if upstream not in UPSTREAMS:
+                self._send(upstream or "unknown", 404, b"not found", "text/plain")
+                return
+            profile = server_state["profile"][upstream]
+            delay = max(0.0, profile["latency_ms"] + random.uniform(-1, 1) * profile["jitter_ms"]) / 1000
+            time.sleep(delay)
+
+            roll = random.random()
+            if roll < profile["rate_429"]:
+                self._send(upstream, 429, b'{"error": "Too Many Requests"}', "application/json")
+                return
+            if roll < profile["rate_429"] + profile["rate_503"]:
+                self._send(upstream, 503, b'{"error": "Service Unavailable"}', "application/json")
+                return
+
+            query, replay = parse_qs(parts.query), server_state["replay"]
+            if upstream == "molit":
+                kind = "rent" if "AptRent" in parts.path else "trade"
+                by_region = replay["molit"][kind]
+                lawd_cd = _param(query, "LAWD_CD", "")
+                # 녹화되지 않은 지역은 녹화된 지역 중 하나를 지역 코드로 고정해 돌려 쓴다.
+                items = by_region.get(lawd_cd) or by_region[sorted(by_region)[int(lawd_cd or 0) % len(by_region)]]
+                deal_ymd = _param(query, "DEAL_YMD", datetime.now().strftime("%Y%m"))
+                payload = molit_body(items, deal_ymd, int(_param(query, "pageNo", 1)), int(_param(query, "numOfRows", 10)))
+                self._send(upstream, 200, payload, "application/xml")
+            elif upstream == "rone":
+                data = rone_body(replay["rone"], _param(query, "CLS_ID", ""), _param(query, "START_WRTTIME", ""),
+                                 _param(query, "END_WRTTIME", "99999999"))
+                self._send(upstream, 200, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json")
+            else:
+                data = applyhome_body(replay["applyhome"], query)
+                self._send(upstream, 200, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    return StubHandler
+
+
+def start_stub_server(profile=None, applyhome_rows=APPLYHOME_ROWS, host="127.0.0.1", port=0):
+    """
+    대역 서버를 백그라운드 스레드로 띄운다. profile은 DEFAULT_PROFILE 형식이며 일부 대역·항목만 넘겨도 된다.
+    반환 dict: base_url, urls(app secrets에 넣을 MOLIT_API_BASE/REB_API_URL/APPLYHOME_API_URL), state, server
+    state["profile"]을 바꾸면 실행 중에도 지연·오류 비율이 바로 바뀐다(오류 폭주 구간 재현용).
+    """
+    merged = {name: dict(DEFAULT_PROFILE[name], **(profile or {}).get(name, {})) for name in UPSTREAMS}
+    state = {"profile": merged, "replay": load_replay(applyhome_rows), "calls": Counter(), "lock": threading.Lock()}
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="loadtest-stubs", daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}"
+    return {
+        "base_url": base_url, "state": state, "server": server,
+        "urls": {"MOLIT_API_BASE": f"{base_url}/molit", "REB_API_URL": f"{base_url}/rone",
+                 "APPLYHOME_API_URL": f"{base_url}/applyhome"},
+    }
+
+
+def call_counts(stub):
+    """(대역, HTTP 상태)별 호출 수 행 목록."""
+    with stub["state"]["lock"]:
+        items = sorted(stub["state"]["calls"].items())
+    return [{"대역": upstream, "상태": status, "호출 수": n} for (upstream, status), n in items]
@@ -0,0 +1,16 @@
+"""
+로컬 SQLite 저장소(LOCAL_STORE_PATH) 연결.
+
+단지 레지스트리·전월세·청약 공고·자문 이력 인덱스·예열 수요 기록이 한 파일을 함께 쓰며,
+각 모듈은 자기 테이블 스키마(CREATE ... IF NOT EXISTS)만 넘긴다.
+"""
+import os
+import sqlite3
+
+
+def connect(db_path, schema):
+    """저장소 디렉터리를 만들고 연결한 뒤 schema를 적용한다. 다른 세션이 쓰는 중이면 최대 30초 기다린다."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    con = sqlite3.connect(db_path, timeout=30)
+    con.executescript(schema)
+    return con
@@ -0,0 +1,50 @@
+"""
+결과 테이블 서버 측 정렬·페이지 나누기.
+
+전체 결과를 Styler로 서식 지정해 브라우저로 보내는 대신, 서버에서 정렬 순서(행 위치)만 구하고
+현재 페이지에 해당하는 행만 잘라 렌더링한다. 전송량·렌더링 시간은 결과 건수가 아니라 페이지 크기에 비례한다.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+TABLE_PAGE_SIZE = 50
+
+
+def page_count(n_rows, page_size=TABLE_PAGE_SIZE):
+    """행 수에 필요한 페이지 수 (빈 결과도 1페이지)."""
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def sort_positions(df, sort_by=None, ascending=True, limit=None):
+    """
+    정렬 후 행 위치 배열. sort_by가 없으면 현재 순서를 그대로 쓴다.
+    결측값은 방향과 관계없이 맨 뒤로 보내고, 값이 같으면 원래 순서를 유지한다.
+    limit을 주면 앞쪽 limit개만 보장한다. 숫자 컬럼의 앞 페이지는 전체 정렬 대신 부분 선택으로 구한다.
+    """
+    if not sort_by or sort_by not in df.columns:
+        return np.arange(len(df))
+    values = df[sort_by].reset_index(drop=True)
+    if limit is not None and limit < len(values) // 4 and pd.api.types.is_numeric_dtype(values.dtype):
+        keys = values.to_numpy(dtype='float64', na_value=np.nan)
+        keys = np.where(np.isnan(keys), np.inf, keys if ascending else -keys)
+        kth = np.partition(keys, limit - 1)[limit - 1]
+        # k번째 값 이하인 행만 원래 순서대로 모아 안정 정렬하므로 동점 처리도 전체 정렬과 같다.
+        candidates = np.flatnonzero(keys <= kth)
+        return candidates[np.argsort(keys[candidates], kind='stable')][:limit]
+    return values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+
+def page_slice(df, page, sort_by=None, ascending=True, page_size=TABLE_PAGE_SIZE):
+    """
+    정렬된 결과의 한 페이지와 (보정된 페이지 번호, 전체 페이지 수)를 반환한다.
+    page는 1부터 시작하며 범위를 벗어나면 가장 가까운 페이지로 보정한다.
+    """
+    total_pages = page_count(len(df), page_size)
+    page = min(max(int(page), 1), total_pages)
+    start = (page - 1) * page_size
+    if not sort_by or sort_by not in df.columns:
+        return df.iloc[start:start + page_size], page, total_pages
+    positions = sort_positions(df, sort_by, ascending, limit=start + page_size)
+    return df.iloc[positions[start:start + page_size]], page, total_pages
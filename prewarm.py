@@ -0,0 +1,145 @@
+"""
+캐시 예열(prewarm) 대상 선정·계획.
+
+그날 처음 강남구를 고른 사용자가 국토부 수집·R-ONE 지수 조회·요약 집계 비용을 모두 치르지 않도록,
+한가한 시간에 많이 찾는 구를 미리 수집해 둔다. 이 모듈은 '무엇을·얼마나' 예열할지만 정하고, 실제 호출과 캐시는 앱이 한다.
+- 수요: 최근 구 선택(수집·추천 요청, SQLite에 기록)과 AI자문이력 대상에 나온 구를 반감기 가중으로 센다.
+- 계획: 수요 순으로, API별 예열 예산(오늘 남은 호출 한도의 일부) 안에 들어오는 구만 고른다. 캐시에 있는 월은 호출 수에서 뺀다.
+- 일정: 매일 정해진 시각(기본 새벽 5시)에 한 번 실행한다.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from local_store import connect
+
+DEMAND_WINDOW_DAYS = 14
+DEMAND_HALF_LIFE_DAYS = 3
+# 자문 이력 한 건의 가중치 (구 선택 한 번 = 1). 저장까지 한 자문은 관심이 더 확실하다고 본다.
+ADVISORY_WEIGHT = 2.0
+PREWARM_MAX_DISTRICTS = 8
+# 오늘 남은 호출 한도 중 예열 한 번이 쓸 수 있는 최대 비율 (나머지는 사용자 요청 몫)
+PREWARM_QUOTA_SHARE = 0.2
+# 구 선택 기록 보관 기간(일). 기록할 때 이보다 오래된 행을 지운다.
+REQUEST_RETENTION_DAYS = 90
+# 국토부는 (구, 월)마다 매매·전월세 1회씩. R-ONE은 거래일별 경과 주 수마다 1회라 월당 최대 주 수로 어림한다.
+MOLIT_APIS = ("molit.trade", "molit.rent")
+RONE_API = "rone.weekly_index"
+RONE_CALLS_PER_MONTH = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS district_requests (
+    requested_at TEXT NOT NULL,
+    district TEXT NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS district_requests_at ON district_requests (requested_at);
+"""
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def record_district_requests(db_path, districts, source, at=None):
+    """구 선택(source: '수집'·'추천' 등)을 기록하고 보관 기간이 지난 기록을 지운다."""
+    at = at or datetime.now()
+    con = connect(db_path, _SCHEMA)
+    try:
+        with con:
+            con.executemany("INSERT INTO district_requests (requested_at, district, source) VALUES (?, ?, ?)",
+                            [(at.strftime(_TIME_FORMAT), d, source) for d in districts])
+            con.execute("DELETE FROM district_requests WHERE requested_at < ?",
+                        ((at - timedelta(days=REQUEST_RETENTION_DAYS)).strftime(_TIME_FORMAT),))
+    finally:
+        con.close()
+
+
+def load_district_requests(db_path, since):
+    """since 이후의 구 선택 기록. 반환 컬럼: requested_at, district, source"""
+    con = connect(db_path, _SCHEMA)
+    try:
+        return pd.read_sql_query("SELECT requested_at, district, source FROM district_requests WHERE requested_at >= ?",
+                                 con, params=(since.strftime(_TIME_FORMAT),))
+    finally:
+        con.close()
+
+
+def match_districts(texts, districts):
+    """자문 대상 등 자유 문자열 Series → 포함된 구 이름 Series(없으면 None). 긴 이름부터 맞춰 접두어가 겹쳐도 정확히 고른다."""
+    texts = texts.astype(str)
+    matched = pd.Series(None, index=texts.index, dtype=object)
+    for name in sorted(districts, key=len, reverse=True):
+        hit = matched.isna() & texts.str.contains(name, regex=False)
+        matched[hit] = name
+    return matched
+
+
+def _decay(timestamps, now, half_life_days):
+    age_days = (now - pd.to_datetime(timestamps, errors='coerce')).dt.total_seconds() / 86400
+    return np.power(0.5, age_days.clip(lower=0) / half_life_days).fillna(0.0)
+
+
+def district_demand(requests, advisories, districts, now=None, window_days=DEMAND_WINDOW_DAYS,
+                    half_life_days=DEMAND_HALF_LIFE_DAYS, advisory_weight=ADVISORY_WEIGHT):
+    """
+    구별 수요 점수. requests는 load_district_requests() 결과, advisories는 (saved_at, target) 컬럼 프레임.
+    최근 window_days일 기록만 세고, 한 건의 가중치는 반감기마다 절반이 된다.
+    반환 컬럼: 구, 선택, 자문, 수요점수 (점수 내림차순, 0점인 구는 빠진다)
+    """
+    now = pd.Timestamp(now or datetime.now())
+    since = now - pd.Timedelta(days=window_days)
+    known = set(districts)
+
+    req = requests[requests['district'].isin(known)]
+    req = req[pd.to_datetime(req['requested_at'], errors='coerce') >= since]
+    adv = advisories.assign(district=match_districts(advisories['target'], districts)).dropna(subset=['district'])
+    adv = adv[pd.to_datetime(adv['saved_at'], errors='coerce') >= since]
+
+    demand = pd.DataFrame({
+        '선택': req.groupby('district').size(),
+        '자문': adv.groupby('district').size(),
+        '수요점수': pd.concat([
+            _decay(req['requested_at'], now, half_life_days).groupby(req['district']).sum(),
+            (_decay(adv['saved_at'], now, half_life_days) * advisory_weight).groupby(adv['district']).sum(),
+        ]).groupby(level=0).sum(),
+    }).fillna(0)
+    demand = demand[demand['수요점수'] > 0].astype({'선택': int, '자문': int})
+    return demand.rename_axis('구').reset_index().sort_values(['수요점수', '구'], ascending=[False, True], kind='stable',
+                                                              ignore_index=True)
+
+
+def prewarm_budget(limits, used, share=PREWARM_QUOTA_SHARE):
+    """API별 예열 예산 = min(일일 한도 × share, 오늘 남은 호출 수). limits·used는 {API: 호출 수}."""
+    return {api: max(0, min(int(limit * share), limit - used.get(api, 0))) for api, limit in limits.items()}
+
+
+def plan_prewarm(demand, district_codes, months, budget, cached=frozenset(), max_districts=PREWARM_MAX_DISTRICTS):
+    """
+    수요 순으로 예산 안에 드는 구를 고른다. cached는 이미 캐시에 있는 (API, 법정동 코드, 월) 집합.
+    반환: (plan, skipped)
+    - plan: [{"구", "코드", "fetch": {API: [월, ...]}, "calls": {API: 호출 수}}]
+    - skipped: [{"구", "사유"}]  — 예산이 모자란 구와 max_districts를 넘는 구
+    """
+    remaining = dict(budget)
+    plan, skipped = [], []
+    for district in demand['구']:
+        if len(plan) >= max_districts:
+            skipped.append({"구": district, "사유": f"예열 구 수 상한({max_districts})"})
+            continue
+        code = district_codes[district]
+        fetch = {api: [ym for ym in months if (api, code, ym) not in cached] for api in MOLIT_APIS}
+        calls = {api: len(yms) for api, yms in fetch.items()}
+        calls[RONE_API] = RONE_CALLS_PER_MONTH * len(months)
+        short = [api for api, n in calls.items() if n > remaining.get(api, 0)]
+        if short:
+            skipped.append({"구": district, "사유": f"호출 한도 부족({', '.join(short)})"})
+            continue
+        for api, n in calls.items():
+            remaining[api] -= n
+        plan.append({"구": district, "코드": code, "fetch": fetch, "calls": calls})
+    return plan, skipped
+
+
+def next_run_at(now, hour):
+    """now 이후 처음 오는 hour시 정각."""
+    run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
@@ -0,0 +1,153 @@
+"""
+재실행 단위 온디맨드 프로파일러.
+
+- cprofile: 결정적 프로파일(cProfile). 함수별 호출 수·자체·누적 시간을 잰다. 결과 파일(.prof)은 pstats 형식이라
+  snakeviz 등으로 그대로 열 수 있다.
+- sample: 표본 추출 프로파일. 별도 스레드가 일정 간격으로 대상 스레드의 호출 스택을 읽어 줄 단위로 센다.
+  함수로 묶이지 않은 스크립트 최상위 코드도 줄 번호까지 보인다. 결과 파일은 collapsed stack 텍스트
+  (speedscope / flamegraph.pl 입력 형식)다.
+start_profile()을 부르지 않은 실행에는 아무 훅도 걸리지 않는다.
+"""
+import cProfile
+import linecache
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_MODES = ("sample", "cprofile")
+SAMPLE_INTERVAL = 0.005
+# 프로파일이 정상 종료되지 못한 경우(중간에 실행이 끊긴 경우 등)에도 표본 추출 스레드가 무한히 돌지 않도록 한다.
+MAX_PROFILE_SECONDS = 300
+HOTSPOT_LIMIT = 30
+
+_active = {}  # 스레드 ID → 진행 중인 프로파일 상태
+_active_lock = threading.Lock()
+
+
+def _sample_loop(state):
+    frames_of = sys._current_frames
+    deadline = state["started"] + MAX_PROFILE_SECONDS
+    while not state["stop"].wait(state["interval"]):
+        frame = frames_of().get(state["thread_id"])
+        if frame is None or time.perf_counter() > deadline:
+            break
+        stack = []
+        while frame is not None:
+            # 실행 직전·직후 프레임은 f_lineno가 None일 수 있다.
+            stack.append((frame.f_code.co_filename, frame.f_lineno or 0, frame.f_code.co_name))
+            frame = frame.f_back
+        state["stacks"][tuple(stack)] += 1
+
+
+def take_unfinished_profile():
+    """
+    현재 스레드에서 시작됐지만 stop_profile()로 닫히지 못한 프로파일(예외 등으로 실행이 끊긴 경우)을 꺼낸다.
+    없으면 None. 꺼낸 상태는 stop_profile()로 닫아 결과를 얻는다.
+    """
+    with _active_lock:
+        return _active.pop(threading.get_ident(), None)
+
+
+def start_profile(mode, interval=SAMPLE_INTERVAL):
+    """
+    현재 스레드의 프로파일을 시작하고 상태 dict를 반환한다. 같은 스레드에 끝나지 않은 프로파일이 있으면 버리고 멈춘다.
+    mode: 'sample' 또는 'cprofile'.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"알 수 없는 프로파일 모드: {mode}")
+    thread_id = threading.get_ident()
+    stale = take_unfinished_profile()
+    if stale is not None:
+        _halt(stale)
+    state = {"mode": mode, "thread_id": thread_id, "started": time.perf_counter(), "started_at": time.time()}
+    if mode == "cprofile":
+        state["profiler"] = cProfile.Profile()
+        state["profiler"].enable()
+    else:
+        state.update(interval=interval, stacks=Counter(), stop=threading.Event())
+        state["sampler"] = threading.Thread(target=_sample_loop, args=(state,), name="rerun-sampler", daemon=True)
+        state["sampler"].start()
+    with _active_lock:
+        _active[thread_id] = state
+    return state
+
+
+def _halt(state):
+    if state["mode"] == "cprofile":
+        state["profiler"].disable()
+    else:
+        state["stop"].set()
+        state["sampler"].join()
+
+
+def _location(filename, lineno, focus_dir):
+    if focus_dir and filename.startswith(focus_dir):
+        filename = os.path.relpath(filename, focus_dir)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{lineno}"
+
+
+def _source(filename, lineno):
+    return linecache.getline(filename, lineno).strip()[:100]
+
+
+def _sample_report(state, focus_dir):
+    stacks, total = state["stacks"], sum(state["stacks"].values()) or 1
+    leaf, inclusive = Counter(), Counter()
+    for stack, n in stacks.items():
+        leaf[stack[0]] += n
+        for key in set(stack):
+            inclusive[key] += n
+    hotspots = [
+        {"위치": _location(f, line, focus_dir), "함수": name, "자체(%)": n / total * 100,
+         "포함(%)": inclusive[(f, line, name)] / total * 100, "코드": _source(f, line)}
+        for (f, line, name), n in leaf.most_common(HOTSPOT_LIMIT)
+    ]
+    app_lines = [
+        {"위치": _location(f, line, focus_dir), "함수": name, "포함(%)": n / total * 100, "코드": _source(f, line)}
+        for (f, line, name), n in inclusive.most_common() if focus_dir and f.startswith(focus_dir)
+    ][:HOTSPOT_LIMIT]
+    collapsed = "".join(
+        ";".join(f"{name} ({_location(f, line, focus_dir)})" for f, line, name in reversed(stack)) + f" {n}\n"
+        for stack, n in stacks.most_common()
+    )
+    return hotspots, app_lines, collapsed.encode("utf-8"), sum(stacks.values())
+
+
+def _cprofile_report(state, focus_dir):
+    stats = pstats.Stats(state["profiler"]).stats
+    rows = []
+    for (f, line, name), (_, ncalls, tottime, cumtime, _) in stats.items():
+        rows.append({"위치": _location(f, line, focus_dir), "함수": name, "호출 수": ncalls,
+                     "자체(ms)": tottime * 1000, "누적(ms)": cumtime * 1000, "_file": f})
+    hotspots = sorted(rows, key=lambda r: -r["자체(ms)"])[:HOTSPOT_LIMIT]
+    app_lines = sorted((r for r in rows if focus_dir and r["_file"].startswith(focus_dir)), key=lambda r: -r["누적(ms)"])[:HOTSPOT_LIMIT]
+    strip = lambda items: [{k: v for k, v in r.items() if k != "_file"} for r in items]
+    return strip(hotspots), strip(app_lines), marshal.dumps(stats), len(rows)
+
+
+def stop_profile(state, label, focus_dir=None):
+    """
+    프로파일을 멈추고 결과를 반환한다. label은 결과를 구분할 이름(실행 유형 등)이다.
+    focus_dir 아래 파일(앱 코드)은 따로 모아 app_lines로 보여 준다.
+    반환 dict: mode, label, started_at, seconds, hotspots(자체 시간 상위), app_lines(앱 코드 포함 시간 상위),
+              data(내려받을 파일 bytes), file_ext, size(표본 수 또는 함수 수)
+    """
+    seconds = time.perf_counter() - state["started"]
+    _halt(state)
+    with _active_lock:
+        if _active.get(state["thread_id"]) is state:
+            del _active[state["thread_id"]]
+    focus_dir = os.path.abspath(focus_dir) + os.sep if focus_dir else None
+    report = _cprofile_report if state["mode"] == "cprofile" else _sample_report
+    hotspots, app_lines, data, size = report(state, focus_dir)
+    return {
+        "mode": state["mode"], "label": label, "started_at": state["started_at"], "seconds": seconds,
+        "hotspots": hotspots, "app_lines": app_lines, "data": data,
+        "file_ext": "prof" if state["mode"] == "cprofile" else "collapsed.txt", "size": size,
+    }
@@ -0,0 +1,112 @@
+"""
+Tab 2 랭킹 필터 인덱스.
+
+데이터 버전마다 한 번만 만들어 두고 슬라이더를 움직일 때마다 재사용한다.
+- 지역별(및 전체)로 평형·추정시세·갭 정렬 배열을 갖고 있어 범위 조건은 이진 탐색(searchsorted) 슬라이스가 된다.
+- 가장 좁은 슬라이스를 후보로 잡고 나머지 조건만 벡터 비교한다.
+- 실거주(하락률↓, 입지점수↓)·갭투자(갭↑, 입지점수↓) 순위를 미리 매겨 두어 결과가 정렬 없이 랭킹 순서로 나온다.
+"""
+import numpy as np
+import pandas as pd
+
+ALL_REGIONS = "전체"
+_RANGE_COLUMNS = {'평형': '평형', 'price': '추정현재시세(억)', 'gap': '갭(억)'}
+
+
+def _group_entry(df, ids):
+    """한 그룹(지역 또는 전체)에 대한 정렬 배열과 랭킹 순서."""
+    entry = {}
+    for key, col in _RANGE_COLUMNS.items():
+        values = df[col].to_numpy(dtype=float)[ids]
+        order = np.argsort(values, kind='stable')
+        entry[key] = (values[order], ids[order])
+    sub = df.iloc[ids]
+    # lexsort는 마지막 키가 1순위. 내림차순은 부호를 뒤집어 처리한다.
+    entry['order_live'] = ids[np.lexsort((-sub['입지점수'].to_numpy(dtype=float), -sub['하락률(%)'].to_numpy(dtype=float)))]
+    entry['order_gap'] = ids[np.lexsort((-sub['입지점수'].to_numpy(dtype=float), sub['갭(억)'].to_numpy(dtype=float)))]
+    return entry
+
+
+def build_rank_index(df_summary):
+    """
+    단지×평형 요약으로 필터 인덱스를 만든다.
+    반환 dict: df(원본 순서), regions(정렬된 지역명), region_pos(지역명→코드), region_codes,
+    groups({지역 코드 또는 -1(전체): entry}).
+    """
+    df = df_summary.reset_index(drop=True)
+    region_codes, regions = pd.factorize(df['지역'].astype(str), sort=True)
+    all_ids = np.arange(len(df))
+    groups = {-1: _group_entry(df, all_ids)}
+    if len(df):
+        region_order = np.argsort(region_codes, kind='stable')
+        bounds = np.searchsorted(region_codes[region_order], np.arange(len(regions) + 1))
+        for code in range(len(regions)):
+            groups[code] = _group_entry(df, region_order[bounds[code]:bounds[code + 1]])
+    return {
+        "df": df,
+        "regions": list(regions),
+        "region_pos": {name: code for code, name in enumerate(regions)},
+        "region_codes": region_codes,
+        "groups": groups,
+    }
+
+
+def _slice(entry, key, lo=None, hi=None):
+    values, ids = entry[key]
+    start = 0 if lo is None else np.searchsorted(values, lo, side='left')
+    stop = len(values) if hi is None else np.searchsorted(values, hi, side='right')
+    return ids[start:stop]
+
+
+def _match_mask(index, entry, bounds):
+    """
+    bounds: {key: (lo, hi)}. 가장 좁은 범위 슬라이스를 후보로 삼고, 나머지 조건은 후보에만 벡터 비교한다.
+    반환: 전체 행 길이의 bool 마스크.
+    """
+    df = index["df"]
+    slices = {key: _slice(entry, key, lo, hi) for key, (lo, hi) in bounds.items()}
+    seed_key = min(slices, key=lambda k: len(slices[k]))
+    candidates = slices[seed_key]
+    keep = np.ones(len(candidates), dtype=bool)
+    for key, (lo, hi) in bounds.items():
+        if key == seed_key:
+            continue
+        values = df[_RANGE_COLUMNS[key]].to_numpy(dtype=float)[candidates]
+        if lo is not None:
+            keep &= values >= lo
+        if hi is not None:
+            keep &= values <= hi
+    mask = np.zeros(len(df), dtype=bool)
+    mask[candidates[keep]] = True
+    return mask
+
+
+def available_regions(index, pyung_lo, pyung_hi, price_max):
+    """평형·가격 조건을 만족하는 단지가 있는 지역 목록(정렬됨)."""
+    mask = _match_mask(index, index["groups"][-1], {'평형': (pyung_lo, pyung_hi), 'price': (None, price_max)})
+    codes = np.unique(index["region_codes"][mask])
+    return [index["regions"][c] for c in codes]
+
+
+def query_rankings(index, pyung_lo, pyung_hi, price_max, gap_max, region=ALL_REGIONS):
+    """
+    실거주·갭투자 랭킹을 이미 정렬된 상태로 반환한다: (df_live, df_invest).
+    - 실거주: 평형·추정시세 조건, 하락률↓·입지점수↓ 순
+    - 갭투자: 위 조건 + 갭 ≤ gap_max, 갭↑·입지점수↓ 순
+    """
+    df = index["df"]
+    if region != ALL_REGIONS:
+        if region not in index["region_pos"]:
+            return df.head(0), df.head(0)
+        entry = index["groups"][index["region_pos"][region]]
+    else:
+        entry = index["groups"][-1]
+
+    live_mask = _match_mask(index, entry, {'평형': (pyung_lo, pyung_hi), 'price': (None, price_max)})
+    order_live, order_gap = entry['order_live'], entry['order_gap']
+    live_ids = order_live[live_mask[order_live]]
+
+    gap_ok = np.zeros(len(df), dtype=bool)
+    gap_ok[_slice(entry, 'gap', None, gap_max)] = True
+    invest_ids = order_gap[(live_mask & gap_ok)[order_gap]]
+    return df.iloc[live_ids], df.iloc[invest_ids]
@@ -0,0 +1,105 @@
+"""
+아파트 단지 레지스트리.
+
+단지명 표기(띄어쓰기, '아파트'/'APT' 접미사, 전각 문자)를 한 번만 정규화하고, (정규화명, 시군구, 법정동)마다
+안정적인 정수 ID(단지ID)를 부여한다. 병합·집계는 한글 문자열 대신 이 정수 키로 수행한다.
+같은 이름이라도 법정동이 다르면 다른 단지로 구분된다.
+"""
+import re
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from local_store import connect
+
+_SUFFIX_PATTERN = re.compile(r"(아파트|APT\.?)$")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apt_registry (
+    complex_id INTEGER PRIMARY KEY,
+    canon_name TEXT NOT NULL,
+    sigungu TEXT NOT NULL,
+    dong TEXT NOT NULL,
+    display_name TEXT NOT NULL,
+    UNIQUE (canon_name, sigungu, dong)
+);
+"""
+
+# db_path → {(정규화명, 시군구, 법정동): 단지ID}. 프로세스 안에서 한 번만 읽어 두고 신규 등록분만 추가한다.
+_registry_cache = {}
+_registry_lock = threading.Lock()
+
+
+def canonical_name(names):
+    """단지명 Series → 정규화명 Series (NFKC, 공백 제거, 영문 대문자화, 끝의 '아파트'/'APT' 제거)."""
+    def _canon(name):
+        text = re.sub(r"\s+", "", unicodedata.normalize("NFKC", str(name))).upper()
+        stripped = _SUFFIX_PATTERN.sub("", text)
+        return stripped or text
+
+    uniques = pd.unique(names.astype(str))
+    mapping = {n: _canon(n) for n in uniques}
+    return names.astype(str).map(mapping)
+
+
+def split_region(regions):
+    """'서울 강남구 대치동' 형식의 지역 Series → (시군구, 법정동). 시군구는 사이드바 구 이름과 같다."""
+    parts = regions.astype(str).str.rsplit(' ', n=1)
+    return parts.str[0].fillna(''), parts.str[1].fillna('')
+
+
+def _load_registry(db_path):
+    con = connect(db_path, _SCHEMA)
+    try:
+        rows = con.execute("SELECT canon_name, sigungu, dong, complex_id FROM apt_registry").fetchall()
+    finally:
+        con.close()
+    return {(c, s, d): cid for c, s, d, cid in rows}
+
+
+def resolve_complex_ids(db_path, names, sigungu, dong):
+    """
+    단지명·시군구·법정동으로 단지ID 배열(int64)을 반환한다. 처음 보는 단지는 레지스트리에 등록한다.
+    sigungu·dong은 names와 같은 길이의 Series이거나 스칼라일 수 있다.
+    """
+    names = pd.Series(names).reset_index(drop=True)
+    if names.empty:
+        return np.array([], dtype='int64')
+    keys = pd.DataFrame({
+        'canon': canonical_name(names),
+        'sigungu': (pd.Series(sigungu).reset_index(drop=True) if not np.isscalar(sigungu) else sigungu),
+        'dong': (pd.Series(dong).reset_index(drop=True) if not np.isscalar(dong) else dong),
+    })
+    keys['sigungu'] = keys['sigungu'].fillna('').astype(str)
+    keys['dong'] = keys['dong'].fillna('').astype(str).str.strip()
+    uniq = keys.drop_duplicates()
+    first_display = names.groupby([keys['canon'], keys['sigungu'], keys['dong']], sort=False).first()
+
+    with _registry_lock:
+        cache = _registry_cache.get(db_path)
+        if cache is None:
+            cache = _registry_cache[db_path] = _load_registry(db_path)
+        missing = [t for t in uniq.itertuples(index=False, name=None) if t not in cache]
+        if missing:
+            con = connect(db_path, _SCHEMA)
+            try:
+                with con:
+                    con.executemany(
+                        "INSERT OR IGNORE INTO apt_registry (canon_name, sigungu, dong, display_name) VALUES (?, ?, ?, ?)",
+                        [(c, s, d, str(first_display.get((c, s, d), c))) for c, s, d in missing],
+                    )
+            finally:
+                con.close()
+            cache.update(_load_registry(db_path))
+        ids = np.array([cache[t] for t in uniq.itertuples(index=False, name=None)], dtype='int64')
+
+    lookup = pd.Series(ids, index=pd.MultiIndex.from_frame(uniq))
+    return lookup.reindex(pd.MultiIndex.from_frame(keys)).to_numpy(dtype='int64')
+
+
+def resolve_complex_ids_by_region(db_path, names, regions):
+    """'시군구 법정동' 형식의 지역 컬럼을 가진 데이터(구글 시트 등)의 단지ID를 구한다."""
+    sigungu, dong = split_region(pd.Series(regions))
+    return resolve_complex_ids(db_path, names, sigungu, dong)
+
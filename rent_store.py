@@ -0,0 +1,180 @@
+"""
+전월세 집계 저장소 (시간 가중 평균).
+
+(단지ID, 평형)별 전세·월세 평균을 매번 전체 groupby로 다시 구하지 않고, SQLite에 가중합/가중치합을 누적해 둔다.
+- 가중치: 계약일 기준 지수 가중 w = 2^((계약일 - 기준일) / 반감기). 고정 기준일을 쓰므로 새 계약은 단순 덧셈으로 반영되고,
+  평균(Σw·x / Σw)은 최근 계약일수록 반감기마다 두 배 비중을 갖는다.
+- 같은 (구, 계약월)을 다시 수집하면 이전 월 기여분을 빼고 새 값으로 교체하므로 중복 집계되지 않는다.
+- 조회는 (단지ID, 평형) 키당 한 행인 합계 테이블만 읽는다. 단지ID는 registry.resolve_complex_ids()로 구한다.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from local_store import connect
+
+RENT_HALF_LIFE_DAYS = 90
+RENT_WEIGHT_EPOCH = pd.Timestamp("2020-01-01")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rent_month_agg (
+    sigungu TEXT NOT NULL,
+    ym TEXT NOT NULL,
+    complex_id INTEGER NOT NULL,
+    pyung_key INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    w REAL NOT NULL,
+    w_deposit REAL NOT NULL,
+    w_rent REAL NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (sigungu, ym, complex_id, pyung_key, kind)
+);
+CREATE TABLE IF NOT EXISTS rent_agg (
+    complex_id INTEGER NOT NULL,
+    pyung_key INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    w REAL NOT NULL,
+    w_deposit REAL NOT NULL,
+    w_rent REAL NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (complex_id, pyung_key, kind)
+);
+"""
+
+
+def pyung_key(area_series):
+    """전용면적(㎡) 또는 평형 Series → 조인용 정수 평형. 실거래 측과 같은 반올림 규칙을 쓴다."""
+    return area_series.apply(lambda x: round(x))
+
+
+def _to_number(series):
+    return pd.to_numeric(series.astype(str).str.replace(',', '').str.strip(), errors='coerce').fillna(0)
+
+
+def aggregate_rent_month(df_raw_rent, ym, complex_ids, half_life_days=RENT_HALF_LIFE_DAYS):
+    """
+    한 (구, 계약월)의 전월세 원본 행을 (단지ID, 평형, 전세/월세)별 가중합으로 줄인다.
+    complex_ids는 df_raw_rent 각 행의 단지ID 배열이다.
+    반환 컬럼: complex_id, pyung_key, kind, w, w_deposit(억), w_rent(만원), n
+    """
+    cols = ['complex_id', 'pyung_key', 'kind', 'w', 'w_deposit', 'w_rent', 'n']
+    if df_raw_rent is None or df_raw_rent.empty:
+        return pd.DataFrame(columns=cols)
+
+    df = pd.DataFrame(index=df_raw_rent.index)
+    df['complex_id'] = np.asarray(complex_ids, dtype='int64')
+    pyung = pd.to_numeric(df_raw_rent['전용면적'], errors='coerce').fillna(0).apply(lambda x: round(x / 3.3, 1))
+    df['pyung_key'] = pyung_key(pyung).astype(int)
+    df['deposit'] = _to_number(df_raw_rent['보증금액']).astype(int) / 10000
+    df['rent'] = _to_number(df_raw_rent['월세금액']).astype(int)
+    df['kind'] = np.where(df['rent'] > 0, 'monthly', 'jeonse')
+
+    # 계약일이 비어 있으면 해당 월 중순으로 간주한다.
+    deal = pd.to_datetime(
+        df_raw_rent['년'].astype(str).str.zfill(4) + "-" + df_raw_rent['월'].astype(str).str.zfill(2) + "-"
+        + df_raw_rent['일'].astype(str).str.zfill(2),
+        errors='coerce',
+    ).fillna(pd.to_datetime(f"{ym}15", format="%Y%m%d"))
+    df['w'] = np.exp2((deal - RENT_WEIGHT_EPOCH).dt.days.to_numpy() / half_life_days)
+    df['w_deposit'] = df['w'] * df['deposit']
+    df['w_rent'] = df['w'] * df['rent']
+    df['n'] = 1
+
+    agg = df.groupby(['complex_id', 'pyung_key', 'kind'], as_index=False)[['w', 'w_deposit', 'w_rent', 'n']].sum()
+    return agg[cols]
+
+
+def ingest_rent_month(db_path, sigungu, ym, df_raw_rent, complex_ids, half_life_days=RENT_HALF_LIFE_DAYS):
+    """
+    한 (구, 계약월) 수집 결과를 저장소에 반영한다. 같은 월을 다시 넣으면 이전 기여분을 빼고 교체한다.
+    반환: 반영된 (단지ID, 평형, 유형) 키 수.
+    """
+    agg = aggregate_rent_month(df_raw_rent, ym, complex_ids, half_life_days)
+    new_rows = [
+        (sigungu, ym, int(r.complex_id), int(r.pyung_key), r.kind, float(r.w), float(r.w_deposit), float(r.w_rent), int(r.n))
+        for r in agg.itertuples(index=False)
+    ]
+    con = connect(db_path, _SCHEMA)
+    try:
+        with con:
+            # 1) 이전 월 기여분을 합계에서 뺀다.
+            con.execute(
+                "UPDATE rent_agg SET "
+                "w = w - m.mw, w_deposit = w_deposit - m.mw_deposit, w_rent = w_rent - m.mw_rent, n = n - m.mn "
+                "FROM (SELECT complex_id AS m_id, pyung_key AS m_pyung, kind AS m_kind, w AS mw, "
+                "             w_deposit AS mw_deposit, w_rent AS mw_rent, n AS mn "
+                "      FROM rent_month_agg WHERE sigungu = ? AND ym = ?) AS m "
+                "WHERE rent_agg.complex_id = m.m_id AND rent_agg.pyung_key = m.m_pyung AND rent_agg.kind = m.m_kind",
+                (sigungu, ym),
+            )
+            con.execute("DELETE FROM rent_month_agg WHERE sigungu = ? AND ym = ?", (sigungu, ym))
+            # 2) 새 월 기여분을 기록하고 합계에 더한다.
+            con.executemany("INSERT INTO rent_month_agg VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", new_rows)
+            con.executemany(
+                "INSERT INTO rent_agg (complex_id, pyung_key, kind, w, w_deposit, w_rent, n) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(complex_id, pyung_key, kind) DO UPDATE SET "
+                "w = w + excluded.w, w_deposit = w_deposit + excluded.w_deposit, "
+                "w_rent = w_rent + excluded.w_rent, n = n + excluded.n",
+                [row[2:] for row in new_rows],
+            )
+            con.execute("DELETE FROM rent_agg WHERE n <= 0")
+    finally:
+        con.close()
+    return len(new_rows)
+
+
+def load_rent_averages(db_path, since_ym=None):
+    """
+    (단지ID, 평형)별 시간 가중 평균을 반환한다.
+    - since_ym('YYYYMM')을 주면 그 계약월 이후 월별 기여분만 합산한다(최근 데이터만 사용 옵션).
+    반환 컬럼: 단지ID, 조인키_평형, 평균전세가(억), 평균월세보증금(억), 평균월세액(만), 전세표본수, 월세표본수
+    """
+    con = connect(db_path, _SCHEMA)
+    try:
+        if since_ym:
+            df = pd.read_sql_query(
+                "SELECT complex_id, pyung_key, kind, SUM(w) AS w, SUM(w_deposit) AS w_deposit, "
+                "SUM(w_rent) AS w_rent, SUM(n) AS n FROM rent_month_agg WHERE ym >= ? "
+                "GROUP BY complex_id, pyung_key, kind",
+                con, params=(since_ym,),
+            )
+        else:
+            df = pd.read_sql_query("SELECT complex_id, pyung_key, kind, w, w_deposit, w_rent, n FROM rent_agg", con)
+    finally:
+        con.close()
+
+    out_cols = ['단지ID', '조인키_평형', '평균전세가(억)', '평균월세보증금(억)', '평균월세액(만)', '전세표본수', '월세표본수']
+    df = df[df['w'] > 0].copy()
+    if df.empty:
+        return pd.DataFrame({c: pd.Series(dtype='int64' if c in ('단지ID', '조인키_평형') else 'float64') for c in out_cols})
+    df['avg_deposit'] = df['w_deposit'] / df['w']
+    df['avg_rent'] = df['w_rent'] / df['w']
+    wide = df.pivot(index=['complex_id', 'pyung_key'], columns='kind', values=['avg_deposit', 'avg_rent', 'n'])
+    res = pd.DataFrame(index=wide.index)
+    res['평균전세가(억)'] = wide.get(('avg_deposit', 'jeonse'), np.nan)
+    res['평균월세보증금(억)'] = wide.get(('avg_deposit', 'monthly'), np.nan)
+    res['평균월세액(만)'] = wide.get(('avg_rent', 'monthly'), np.nan)
+    res['전세표본수'] = wide.get(('n', 'jeonse'), np.nan)
+    res['월세표본수'] = wide.get(('n', 'monthly'), np.nan)
+    res = res.reset_index().rename(columns={'complex_id': '단지ID', 'pyung_key': '조인키_평형'})
+    return res[out_cols]
+
+
+def estimate_jeonse_fallback(df_trades, default_ratio=0.6):
+    """
+    전세 실거래가 없는 (단지, 평형)의 전세가를 추정한다. df_trades에는 매매가(억)·평균전세가(억)·단지ID·시군구가 있어야 한다.
+    같은 단지의 다른 평형 전세가율 → 같은 시군구 전세가율(중위값) → default_ratio 순으로 대체한다.
+    """
+    price = df_trades['매매가(억)']
+    ratio = (df_trades['평균전세가(억)'] / price.where(price > 0)).where(lambda r: (r > 0) & (r < 1.5))
+    complex_ratio = ratio.groupby(df_trades['단지ID']).transform('median')
+    region_ratio = ratio.groupby(df_trades['시군구'], observed=True).transform('median')
+    fallback_ratio = complex_ratio.fillna(region_ratio).fillna(default_ratio)
+    return df_trades['평균전세가(억)'].fillna(price * fallback_ratio)
+
+
+def recent_since_ym(days, now=None):
+    """최근 days일에 걸치는 가장 이른 계약월('YYYYMM')."""
+    now = now or datetime.now()
+    return (pd.Timestamp(now) - pd.Timedelta(days=days)).strftime("%Y%m")
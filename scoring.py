@@ -0,0 +1,78 @@
+"""
+지역 기반 단지 추천 점수 엔진.
+
+네 가지 투자 목적 점수(실거주·시세차익·갭투자·월세 수익형)를 모든 지역(시군구)에 대해 한 번의 벡터 연산으로 계산한다.
+정규화는 지역별(groupby transform)로 수행하므로 결과는 지역 하나만 골라 계산했을 때와 같다.
+가중치·추천 수가 바뀌면 weighted_top_n()으로 미리 계산된 점수 컬럼만 다시 가중합한다.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+PURPOSE_SCORE_COLUMNS = {
+    "실거주 (장기보유)": '_점수_실거주',
+    "시세차익 투자": '_점수_시세차익',
+    "갭투자 (전세 레버리지)": '_점수_갭투자',
+    "월세 수익형": '_점수_월세',
+}
+# 건축년도가 비어 있을 때 가정하는 연식
+DEFAULT_BUILD_YEAR = 1990
+
+
+def normalize_by_group(series, groups, ascending=False):
+    """
+    그룹별 min-max 정규화(0~100). ascending=True면 작을수록 높은 점수.
+    그룹 내 값이 모두 같으면(또는 한 건뿐이면) 50점을 준다.
+    """
+    grouped = series.groupby(groups)
+    lo = grouped.transform('min')
+    span = grouped.transform('max') - lo
+    normalized = ((series - lo) / span.where(span > 0) * 100).fillna(50.0)
+    normalized = normalized.where(span > 0, 50.0)
+    return (100 - normalized) if ascending else normalized
+
+
+def compute_purpose_scores(df_candidates, region_col='시군구', current_year=None):
+    """
+    후보 단지 전체에 네 가지 목적 점수 컬럼(PURPOSE_SCORE_COLUMNS)을 붙여 반환한다.
+    df_candidates는 단지×평형 요약(complex_summary) 형식이어야 한다. 원본은 변경하지 않는다.
+    """
+    current_year = current_year or datetime.now().year
+    df = df_candidates.copy()
+    if df.empty:
+        for col in PURPOSE_SCORE_COLUMNS.values():
+            df[col] = pd.Series(dtype=float)
+        return df
+
+    groups = df[region_col]
+    location = normalize_by_group(df['입지점수'], groups)
+
+    age = current_year - pd.to_numeric(df['건축년도'], errors='coerce').fillna(DEFAULT_BUILD_YEAR)
+    df['_점수_실거주'] = location * 0.6 + normalize_by_group(age, groups, ascending=True) * 0.4
+
+    df['_점수_시세차익'] = normalize_by_group(df['하락률(%)'], groups) * 0.7 + location * 0.3
+
+    # 갭투자: 갭이 양수인 단지끼리만 정규화하고 나머지는 0점 (역전세·무갭 단지는 대상 아님)
+    has_gap = df['갭(억)'] > 0
+    gap_score = pd.Series(0.0, index=df.index)
+    if has_gap.any():
+        gap_groups = groups[has_gap]
+        gap_score[has_gap] = (normalize_by_group(df.loc[has_gap, '갭(억)'], gap_groups, ascending=True) * 0.7
+                              + normalize_by_group(df.loc[has_gap, '입지점수'], gap_groups) * 0.3)
+    df['_점수_갭투자'] = gap_score
+
+    df['_점수_월세'] = normalize_by_group(df['연수익률(%)'], groups)
+    return df
+
+
+def weighted_top_n(df_scored, region, weights, top_n, region_col='시군구'):
+    """미리 계산된 점수 컬럼을 가중합해 지정 지역의 상위 top_n 단지를 반환한다."""
+    df_region = df_scored[df_scored[region_col] == region]
+    if df_region.empty or not weights:
+        return df_region.head(0)
+    total = np.zeros(len(df_region))
+    for purpose, w in weights.items():
+        total += df_region[PURPOSE_SCORE_COLUMNS[purpose]].to_numpy() * w
+    df_region = df_region.assign(종합점수=total)
+    return df_region.sort_values(by='종합점수', ascending=False, kind='stable').head(top_n)
@@ -0,0 +1,149 @@
+"""
+단지명·지역 typeahead 검색 인덱스.
+
+- 접두 검색: 정규화된 단지명을 정렬해 두고 이진 탐색으로 접두 일치 범위를 찾는다. 문서마다 정렬 순위를 저장해
+  후보가 접두 일치인지는 순위가 그 범위 안에 드는지로 판정한다.
+- 부분 검색: '지역+단지명' 텍스트를 한 배열(코드포인트)로 이어 두고, 2-gram 위치 역색인에서 가장 드문 2-gram의
+  위치를 시작 후보로 잡아 질의 전체를 배열 연산 한 번으로 비교한다. 1자 질의는 글자 역색인을 그대로 쓴다.
+- 초성 검색: 질의가 한글 자음(ㄱ~ㅎ)으로만 이루어지면 같은 방식을 초성 문자열에 적용한다. (예: 'ㄹㅁㅇ' → 래미안)
+결과는 접두 일치 → 짧은 이름 → 원래 순서로 정렬한 상위 k개 문서 번호다.
+"""
+import bisect
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+_CHOSUNG = ['ㄱ', 'ㄲ', 'ㄴ', 'ㄷ', 'ㄸ', 'ㄹ', 'ㅁ', 'ㅂ', 'ㅃ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅉ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+_CHOSUNG_QUERY = re.compile(r"^[ㄱ-ㅎ]+$")
+SEARCH_TOP_K = 20
+
+
+def normalize_text(text):
+    """NFKC 정규화 + 공백 제거 + 소문자화."""
+    return re.sub(r"\s+", "", unicodedata.normalize("NFKC", str(text))).lower()
+
+
+def to_chosung(text):
+    """한글 음절을 초성으로 바꾼다. 한글이 아닌 문자는 그대로 둔다."""
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        out.append(_CHOSUNG[code // 588] if 0 <= code < 11172 else ch)
+    return "".join(out)
+
+
+def _build_space(names, fulls):
+    """
+    한 검색 공간(일반 문자열 또는 초성 문자열)의 접두 정렬 배열과 역색인.
+    - text: 모든 '지역+단지명'을 구분자(0)로 이어 붙인 코드포인트 배열, doc_of: text 위치 → 문서 번호
+    - postings: 글자 → 문서 번호 배열, bigram_offsets: 2-gram → text 안의 시작 위치 배열(오름차순)
+    - name_ranks: 문서 번호 → sorted_names에서의 위치
+    """
+    order = sorted(range(len(names)), key=names.__getitem__)
+    postings = defaultdict(list)
+    bigram_offsets = defaultdict(list)
+    offset = 0
+    for doc_id, text in enumerate(fulls):
+        for ch in set(text):
+            postings[ch].append(doc_id)
+        for i in range(len(text) - 1):
+            bigram_offsets[text[i:i + 2]].append(offset + i)
+        offset += len(text) + 1
+    joined = "\0".join(fulls) + "\0"
+    return {
+        "names": names,
+        "text": np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32),
+        "doc_of": np.repeat(np.arange(len(fulls), dtype=np.int64), [len(t) + 1 for t in fulls]),
+        "sorted_names": [names[i] for i in order],
+        "name_ranks": np.argsort(np.array(order, dtype=np.int64), kind='stable'),
+        "postings": {g: np.array(ids, dtype=np.int64) for g, ids in postings.items()},
+        "bigram_offsets": {g: np.array(offs, dtype=np.int64) for g, offs in bigram_offsets.items()},
+    }
+
+
+def build_search_index(names, regions):
+    """
+    단지명·지역 리스트(같은 길이, 문서 번호 = 리스트 위치)로 검색 인덱스를 만든다.
+    부분 검색 대상은 '지역+단지명', 접두 검색 대상은 단지명이다.
+    """
+    norm_names = [normalize_text(n) for n in names]
+    norm_fulls = [normalize_text(r) + n for r, n in zip(regions, norm_names)]
+    return {
+        "size": len(norm_names),
+        "lengths": np.array([len(n) for n in norm_names], dtype=np.int64),
+        "plain": _build_space(norm_names, norm_fulls),
+        "chosung": _build_space([to_chosung(n) for n in norm_names], [to_chosung(f) for f in norm_fulls]),
+    }
+
+
+def _prefix_mask(space, doc_ids, query):
+    """doc_ids 중 단지명이 query로 시작하는 문서 여부."""
+    lo = bisect.bisect_left(space["sorted_names"], query)
+    hi = bisect.bisect_left(space["sorted_names"], query + "\U0010ffff")
+    ranks = space["name_ranks"][doc_ids]
+    return (ranks >= lo) & (ranks < hi)
+
+
+def _substring_ids(space, query):
+    """query를 연속으로 포함하는 문서 번호(오름차순)."""
+    if len(query) == 1:
+        return space["postings"].get(query, np.empty(0, dtype=np.int64))
+    # 가장 드문 2-gram의 위치로 질의 시작 위치 후보를 잡고, 나머지 글자는 text 배열에서 글자별로 한꺼번에 비교한다.
+    best = None
+    for j in range(len(query) - 1):
+        offsets = space["bigram_offsets"].get(query[j:j + 2])
+        if offsets is None:
+            return np.empty(0, dtype=np.int64)
+        if best is None or len(offsets) < len(best[1]):
+            best = (j, offsets)
+    j, starts = best
+    if len(query) > 2:
+        text = space["text"]
+        starts = starts - j
+        starts = starts[(starts >= 0) & (starts + len(query) <= len(text))]
+        # 구분자(0)는 질의에 없으므로 문서 경계를 넘는 일치는 생기지 않는다.
+        for i, ch in enumerate(query):
+            if i != j and i != j + 1:
+                starts = starts[text[starts + i] == ord(ch)]
+    docs = space["doc_of"][starts]
+    # 위치가 오름차순이므로 같은 문서는 붙어 있다.
+    return docs[np.r_[True, docs[1:] != docs[:-1]]] if len(docs) else docs
+
+
+def search(index, query, k=SEARCH_TOP_K):
+    """
+    질의와 일치하는 문서 번호 배열. k=None이면 일치하는 전체를, 아니면 상위 k개만 반환한다.
+    공백으로 나뉜 여러 단어는 모두 포함(AND)해야 일치한다. (예: '강남 래미')
+    순서: 단지명 접두 일치 → 이름이 짧은 순 → 문서 번호 순.
+    """
+    raw_tokens = str(query).lower().split()
+    if not raw_tokens or index["size"] == 0:
+        return np.empty(0, dtype=np.int64)
+    # NFKC는 호환 자모(ㄹ)를 조합형 자모로 바꾸므로, 초성 질의는 정규화 전에 판별한다.
+    if all(_CHOSUNG_QUERY.match(t) for t in raw_tokens):
+        space, tokens = index["chosung"], raw_tokens
+    else:
+        space, tokens = index["plain"], [normalize_text(t) for t in raw_tokens]
+        tokens = [t for t in tokens if t]
+        if not tokens:
+            return np.empty(0, dtype=np.int64)
+
+    matched = None
+    for token in tokens:
+        ids = _substring_ids(space, token)
+        matched = ids if matched is None else np.intersect1d(matched, ids, assume_unique=True)
+        if not len(matched):
+            return matched
+
+    # 단지명 접두 일치는 마지막 단어 기준(타이핑 중인 단어)으로 판정한다.
+    is_prefix = _prefix_mask(space, matched, tokens[-1])
+    lengths = index["lengths"][matched]
+    if k is not None and len(matched) > k:
+        # 상위 k개만 필요하므로 전체 정렬 대신 부분 선택 후 정렬한다.
+        score = (~is_prefix).astype(np.int64) * (1 << 40) + lengths * (1 << 20) + np.arange(len(matched))
+        top = np.argpartition(score, k - 1)[:k]
+        return matched[top[np.argsort(score[top], kind='stable')]]
+    order = np.lexsort((matched, lengths, ~is_prefix))
+    return matched[order]
@@ -0,0 +1,68 @@
+"""
+Tab 1 구글 시트 저장 로직 (기준정보 반영 + 단지×평형 upsert).
+
+행 단위 iterrows/딕셔너리 루프 대신 단지ID·평형 키로 벡터 병합한다.
+"""
+import pandas as pd
+
+from registry import canonical_name
+
+SHEET_COLUMNS = ['아파트명', '지역', '평형', '층', '건축년도', '매매가(억)', '추정현재시세(억)', '지수추정시세(억)', '누적변동률(%)',
+                 '데이터신선도', '전세가(억)', '월세보증금(억)', '월세액(만원)', '거래일', '전고점(억)', '입지점수']
+# 기존 행이 있을 때 새 거래로 덮어쓰는 컬럼 (전고점·입지점수는 새 값이 0보다 클 때만 덮어쓴다)
+_UPDATE_COLUMNS = ['매매가(억)', '추정현재시세(억)', '지수추정시세(억)', '누적변동률(%)', '데이터신선도',
+                   '층', '건축년도', '전세가(억)', '월세보증금(억)', '월세액(만원)', '거래일']
+_KEY = ['_단지ID', '_평형']
+
+
+def apply_master_info(df_new, df_master):
+    """
+    기준정보 시트의 전고점(억)·입지점수를 정규화 단지명 기준으로 df_new에 반영한 사본을 반환한다.
+    기준정보에 없는 단지는 기존 값을 유지한다.
+    """
+    df_new = df_new.copy()
+    if df_master is None or df_master.empty or '아파트명' not in df_master.columns:
+        return df_new
+    master = pd.DataFrame({
+        'canon': canonical_name(df_master['아파트명']),
+        '전고점(억)': pd.to_numeric(df_master.get('전고점(억)', 0), errors='coerce'),
+        '입지점수': pd.to_numeric(df_master.get('입지점수', 0), errors='coerce'),
+    }).fillna(0).drop_duplicates('canon', keep='last').set_index('canon')
+
+    canon_new = canonical_name(df_new['아파트명'])
+    for c in ['전고점(억)', '입지점수']:
+        mapped = canon_new.map(master[c])
+        df_new[c] = mapped.where(mapped.notna(), df_new[c])
+    return df_new
+
+
+def _keyed(df, complex_ids):
+    df = df.copy()
+    df['_단지ID'] = pd.Series(complex_ids, index=df.index).astype('int64')
+    df['_평형'] = pd.to_numeric(df['평형'], errors='coerce').round(1)
+    return df
+
+
+def upsert_sheet_rows(df_current, current_ids, df_new, new_ids, cols=SHEET_COLUMNS):
+    """
+    시트의 기존 행(df_current)에 새 수집 결과(df_new)를 (단지ID, 평형) 키로 upsert 한다.
+    - 같은 키의 새 거래가 여러 건이면 거래일이 가장 최근인 거래를 반영한다.
+    - 기존 키: _UPDATE_COLUMNS를 새 값으로 덮어쓰고, 전고점·입지점수는 새 값이 0보다 클 때만 덮어쓴다.
+    - 신규 키: 행을 뒤에 추가한다.
+    """
+    new = _keyed(df_new[cols], new_ids).sort_values('거래일', kind='stable').drop_duplicates(_KEY, keep='last')
+    if df_current is None or df_current.empty:
+        return new[cols].reset_index(drop=True)
+
+    cur = _keyed(df_current[cols], current_ids).drop_duplicates(_KEY, keep='last')
+    merged = cur.merge(new, on=_KEY, how='left', suffixes=('', '_new'), indicator=True)
+    matched = merged['_merge'] == 'both'
+    for c in _UPDATE_COLUMNS:
+        merged[c] = merged[c + '_new'].where(matched, merged[c])
+    for c in ['전고점(억)', '입지점수']:
+        incoming = pd.to_numeric(merged[c + '_new'], errors='coerce')
+        merged[c] = incoming.where(matched & (incoming > 0), merged[c])
+
+    existing_keys = pd.MultiIndex.from_frame(cur[_KEY])
+    added = new[~pd.MultiIndex.from_frame(new[_KEY]).isin(existing_keys)]
+    return pd.concat([merged[cols], added[cols]], ignore_index=True)
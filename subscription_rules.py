@@ -0,0 +1,203 @@
+"""
+청약 가점·특별공급 자격 계산 엔진.
+
+사용자 조건(무주택 기간, 신혼부부·생애최초 여부, 미성년 자녀 수, 청약통장 가입기간, 연소득)으로
+84점 만점 가점과 특별공급(신혼부부·생애최초·다자녀) 자격을 계산하고, 청약 공고 목록 전체에 한 번의 벡터 연산으로 붙인다.
+사용자 값은 공고와 무관하므로 한 번만 계산하고, 공고마다 달라지는 것(접수 상태, 규제지역에 따른 1순위 요건,
+민영/국민 구분)만 열 단위로 계산한다. 프롬프트에는 shortlist_announcements()로 고른 공고만 계산 결과와 함께 넣는다.
+
+민영주택 기준으로 단순화한 규칙이다(주택공급에 관한 규칙 별표 1·특별공급 조항).
+- 부양가족은 입력이 없어 '신혼부부면 배우자 1명 + 미성년 자녀 수'로 추정한다(직계존속 미반영).
+- 맞벌이 여부를 알 수 없어 소득 기준은 외벌이 기준(더 엄격한 쪽)을 쓴다.
+- 자산 기준(부동산 3.31억 이하 등)·세대주 여부·당첨 이력은 확인하지 않는다.
+최종 자격은 모집공고문으로 확인해야 한다.
+"""
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+GAJEOM_MAX = {"무주택기간": 32, "부양가족": 35, "청약통장": 17}  # 합계 84점
+# 특별공급 소득 기준의 100%: 전년도 도시근로자 3인 이하 가구 월평균소득(원). 2024년 공고 적용값. (앱에서 secrets로 갱신)
+URBAN_MONTHLY_INCOME = 7_004_509
+# 특별공급 소득 구간: (상한 %, 공급 구분). 상한을 넘으면 추첨(자산 기준 충족 시).
+NEWLYWED_INCOME_TIERS = ((100, "우선공급"), (140, "일반공급"))
+FIRST_TIME_INCOME_TIERS = ((130, "우선공급"), (160, "일반공급"))
+MULTI_CHILD_MIN_CHILDREN = 2
+# 특별공급 공통: 청약통장 가입 6개월 이상. 입력이 '년' 단위라 1년 이상일 때만 충족으로 본다.
+SPECIAL_MIN_ACCOUNT_YEARS = 1
+# 수도권 1순위 청약통장 가입기간(년): 투기과열지구·조정대상지역 / 그 밖의 지역
+FIRST_RANK_ACCOUNT_YEARS = {True: 2, False: 1}
+# 투기과열지구·조정대상지역 (2025-10-16 지정: 서울 전역 + 경기 12곳). 이름은 앱의 DISTRICT_CODES 키와 같은 형식이다.
+# 경기 수원 장안은 앱 수집 대상이 아니지만 공고 주소 판정을 위해 넣어 둔다.
+REGULATED_DISTRICTS = frozenset({
+    "서울 강남구", "서울 강동구", "서울 강북구", "서울 강서구", "서울 관악구", "서울 광진구", "서울 구로구", "서울 금천구",
+    "서울 노원구", "서울 도봉구", "서울 동대문구", "서울 동작구", "서울 마포구", "서울 서대문구", "서울 서초구", "서울 성동구",
+    "서울 성북구", "서울 송파구", "서울 양천구", "서울 영등포구", "서울 용산구", "서울 은평구", "서울 종로구", "서울 중구",
+    "서울 중랑구",
+    "경기 과천시", "경기 광명시", "경기 하남시", "경기 의왕시",
+    "경기 성남 분당", "경기 성남 수정", "경기 성남 중원", "경기 안양 동안",
+    "경기 수원 영통", "경기 수원 장안", "경기 수원 팔달", "경기 용인 수지",
+})
+# 주소 토큰 뒤에 붙을 수 있는 행정구역 접미어 ('경기도 성남시 분당구 …'와 '경기 성남 분당 …'을 같게 본다)
+_ADMIN_SUFFIX = "(?:특별시|광역시|도|시|구)?"
+_REGULATED_PATTERN = re.compile(
+    "^(?:" + "|".join(r"\s+".join(re.escape(tok) + _ADMIN_SUFFIX for tok in name.split())
+                      for name in sorted(REGULATED_DISTRICTS, key=len, reverse=True)) + r")(?:\s|$)"
+)
+APPLY_STATUS_ORDER = {"접수중": 0, "접수예정": 1, "일정미정": 2, "마감": 3}
+TRACK_COLUMNS = ("신혼부부특공", "생애최초특공", "다자녀특공")
+# 추천 전형 우선순위 점수: 특공 우선공급 > 특공 일반공급 > 특공 추첨 > 일반공급 1순위
+_TRACK_SCORE = {"우선공급": 3, "일반공급": 2, "추첨": 1}
+SHORTLIST_SIZE = 8
+
+
+def gajeom_breakdown(is_homeless, homeless_years, dependents, sub_account_years):
+    """
+    84점 가점 항목별 점수 dict(무주택기간·부양가족·청약통장·합계).
+    - 무주택기간: 1년 미만 2점, 1년마다 2점씩, 15년 이상 32점. 유주택자는 0점.
+    - 부양가족: 0명 5점, 1명마다 5점씩, 6명 이상 35점.
+    - 청약통장: 6개월 미만 1점, 1년 이상부터 1년마다 1점씩(1~2년 3점), 15년 이상 17점.
+      입력이 '년' 단위라 0년은 6개월 미만(1점)으로 본다.
+    """
+    homeless = min(GAJEOM_MAX["무주택기간"], 2 + 2 * int(homeless_years)) if is_homeless else 0
+    family = min(GAJEOM_MAX["부양가족"], 5 + 5 * int(dependents))
+    account = min(GAJEOM_MAX["청약통장"], int(sub_account_years) + 2) if sub_account_years >= 1 else 1
+    return {"무주택기간": homeless, "부양가족": family, "청약통장": account, "합계": homeless + family + account}
+
+
+def estimate_dependents(is_newlywed, children_count):
+    """입력만으로 추정한 부양가족 수(배우자 + 미성년 자녀). 직계존속은 입력이 없어 빠진다."""
+    return int(children_count) + (1 if is_newlywed else 0)
+
+
+def income_ratio(annual_income_won, base_monthly=URBAN_MONTHLY_INCOME):
+    """연소득(원)이 도시근로자 월평균소득의 몇 %인지."""
+    return annual_income_won / 12 / base_monthly * 100
+
+
+def _income_track(ratio, tiers):
+    for limit, label in tiers:
+        if ratio <= limit:
+            return label
+    return "추첨"
+
+
+def special_supply_tracks(applicant, annual_income_won, base_monthly=URBAN_MONTHLY_INCOME):
+    """
+    사용자 조건만으로 정해지는 특별공급 자격 dict(신혼부부특공·생애최초특공·다자녀특공).
+    값은 '우선공급' / '일반공급' / '추첨'(소득 초과, 자산 기준 충족 시) 또는 'X (사유)'.
+    """
+    ratio = income_ratio(annual_income_won, base_monthly)
+    common = None
+    if not applicant["is_homeless"]:
+        common = "X (무주택 아님)"
+    elif applicant["sub_account_years"] < SPECIAL_MIN_ACCOUNT_YEARS:
+        common = "X (통장 가입 6개월 확인 필요)"
+    tracks = {}
+    tracks["신혼부부특공"] = common or (
+        _income_track(ratio, NEWLYWED_INCOME_TIERS) if applicant["is_newlywed"] else "X (혼인 7년 초과/미혼)")
+    tracks["생애최초특공"] = common or (
+        _income_track(ratio, FIRST_TIME_INCOME_TIERS) if applicant["is_first_time"] else "X (주택 소유 이력)")
+    tracks["다자녀특공"] = common or (
+        "일반공급" if applicant["children_count"] >= MULTI_CHILD_MIN_CHILDREN
+        else f"X (미성년 자녀 {MULTI_CHILD_MIN_CHILDREN}명 미만)")
+    return tracks
+
+
+def _flag(df, col):
+    """Y/N 필드 → 1.0/0.0, 비었거나 없으면 NaN."""
+    if col not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return df[col].astype(str).str.strip().str.upper().map({"Y": 1.0, "N": 0.0})
+
+
+def regulated_mask(addresses):
+    """
+    주소 Series → 규제지역(REGULATED_DISTRICTS) 여부 bool 배열.
+    앱 지역 표기('경기 과천시 중앙동')와 공고 주소('경기도 과천시 중앙동 …')를 모두 받는다.
+
+    >>> regulated_mask(pd.Series(["경기 성남 분당 정자동", "경기도 안양시 동안구 평촌동 1", "경기 안양 만안 안양동"])).tolist()
+    [True, True, False]
+    """
+    return addresses.astype(str).str.strip().str.contains(_REGULATED_PATTERN).to_numpy()
+
+
+def _is_regulated(df):
+    """공고별 투기과열지구·조정대상지역 여부(둘 중 하나라도 Y면 규제지역). 두 필드가 모두 비어 있으면 공급위치 주소로 판정한다."""
+    flags = pd.concat([_flag(df, "투기과열지구"), _flag(df, "조정대상지역")], axis=1).max(axis=1)
+    by_address = pd.Series(regulated_mask(df["지역(공급위치)"]), index=df.index)
+    return flags.fillna(by_address.astype(float)) > 0
+
+
+def evaluate_announcements(df_apply, applicant, annual_income_won, base_monthly=URBAN_MONTHLY_INCOME, now=None):
+    """
+    청약 공고 표시용 프레임(load_applyhome_display 결과)에 사용자 기준 계산 컬럼을 붙여 반환한다. 원본은 변경하지 않는다.
+    applicant: is_homeless, homeless_years, is_newlywed, is_first_time, children_count, sub_account_years
+    추가 컬럼: 접수상태, 규제지역, 1순위, 내 가점, 신혼부부특공, 생애최초특공, 다자녀특공, 추천전형, 적합도
+    - 국민주택은 일반공급이 가점제가 아니라 납입 횟수 순차제라 내 가점을 비운다.
+    """
+    now = pd.Timestamp(now or datetime.now()).normalize()
+    df = df_apply.copy()
+    if df.empty:
+        for col in ("접수상태", "규제지역", "1순위", "내 가점", *TRACK_COLUMNS, "추천전형", "적합도"):
+            df[col] = pd.Series(dtype=object)
+        return df
+
+    score = gajeom_breakdown(applicant["is_homeless"], applicant["homeless_years"],
+                             estimate_dependents(applicant["is_newlywed"], applicant["children_count"]),
+                             applicant["sub_account_years"])["합계"]
+    tracks = special_supply_tracks(applicant, annual_income_won, base_monthly)
+
+    start = pd.to_datetime(df["청약시작일"], errors="coerce")
+    end = pd.to_datetime(df["청약종료일"], errors="coerce").fillna(start)
+    df["접수상태"] = np.select([start.isna(), end < now, start > now], ["일정미정", "마감", "접수예정"], "접수중")
+
+    regulated = _is_regulated(df)
+    df["규제지역"] = np.where(regulated, "투기과열·조정", "비규제")
+    required_years = np.where(regulated, FIRST_RANK_ACCOUNT_YEARS[True], FIRST_RANK_ACCOUNT_YEARS[False])
+    first_rank = applicant["sub_account_years"] >= required_years
+    df["1순위"] = np.where(first_rank, "O", [f"X (가입 {y}년 필요)" for y in required_years])
+
+    public = df["주택구분"].astype(str).str.contains("국민") if "주택구분" in df.columns else pd.Series(False, index=df.index)
+    df["내 가점"] = pd.Series(score, index=df.index, dtype="Int64").mask(public)
+
+    # 생애최초 특공은 일반공급 1순위여야 하므로 공고의 1순위 요건에 따라 달라진다.
+    for col, value in tracks.items():
+        df[col] = value
+    if not tracks["생애최초특공"].startswith("X"):
+        df["생애최초특공"] = np.where(first_rank, tracks["생애최초특공"], "X (1순위 아님)")
+
+    # 추천 전형: 열린 특공 중 가장 유리한 것(우선공급 > 일반공급 > 추첨). 없으면 일반공급.
+    track_scores = np.column_stack([df[col].map(_TRACK_SCORE).fillna(0).to_numpy() for col in TRACK_COLUMNS])
+    best_score = track_scores.max(axis=1)
+    labels = np.column_stack([(col.replace("특공", " 특공 (") + df[col] + ")").to_numpy() for col in TRACK_COLUMNS])
+    best_label = labels[np.arange(len(df)), track_scores.argmax(axis=1)]
+    general = np.where(first_rank, np.where(public, "일반공급 (순차제)", "일반공급 (가점·추첨)"), "일반공급 2순위")
+    df["추천전형"] = np.where(best_score > 0, best_label, general)
+    # 적합도: 특공 등급 + 1순위 + 가점 비율(0~1). 마감 공고는 0.
+    fit = best_score + first_rank.astype(float) + (score / sum(GAJEOM_MAX.values()) if applicant["is_homeless"] else 0.0)
+    df["적합도"] = np.where(df["접수상태"] == "마감", 0.0, np.round(fit, 2))
+    return df
+
+
+def shortlist_announcements(df_evaluated, limit=SHORTLIST_SIZE):
+    """마감되지 않은 공고를 적합도 내림차순·청약시작일 오름차순으로 limit건 고른다."""
+    open_rows = df_evaluated[df_evaluated["접수상태"] != "마감"]
+    order = open_rows.assign(_상태순=open_rows["접수상태"].map(APPLY_STATUS_ORDER))
+    order = order.sort_values(["적합도", "_상태순", "청약시작일"], ascending=[False, True, True])
+    return order.drop(columns="_상태순").head(limit)
+
+
+def describe_applicant(applicant, annual_income_won, base_monthly=URBAN_MONTHLY_INCOME):
+    """프롬프트·화면에 넣을 사용자 계산 결과 요약 문자열(가점 항목·추정 부양가족·소득 비율·특공 자격)."""
+    dependents = estimate_dependents(applicant["is_newlywed"], applicant["children_count"])
+    score = gajeom_breakdown(applicant["is_homeless"], applicant["homeless_years"], dependents, applicant["sub_account_years"])
+    tracks = special_supply_tracks(applicant, annual_income_won, base_monthly)
+    return (
+        f"가점 {score['합계']}/84점 (무주택기간 {score['무주택기간']}/32, 부양가족 {score['부양가족']}/35 "
+        f"[추정 {dependents}명], 청약통장 {score['청약통장']}/17) · "
+        f"소득 도시근로자 월평균의 {income_ratio(annual_income_won, base_monthly):.0f}% · "
+        + ", ".join(f"{k.replace('특공', '')} {v}" for k, v in tracks.items())
+    )
@@ -0,0 +1,226 @@
+"""
+경량 구간 추적(span)과 지연 히스토그램.
+
+수집·분석 파이프라인의 각 구간(API 호출, 재시도 대기, XML 파싱, 시세 추정, 시트 입출력, Gemini 호출)을
+span()으로 감싸 소요 시간을 프로세스 단위로 모은다.
+- 구간 이름·상태(ok/error)별 누적 히스토그램(고정 버킷)과 이벤트 카운터(재시도 횟수, 토큰 수 등).
+- 최근 구간 기록(링 버퍼): 부모 구간과 속성(지역 코드, 모델, 행 수, 오류 등)을 함께 남겨 진단 화면에서 보여 준다.
+- 내보내기: metrics_json() / metrics_prometheus() (Prometheus 텍스트 형식), write_metrics_file().
+구간 하나의 비용은 perf_counter 두 번과 잠금 한 번 정도라 운영 중에도 켜 둔다.
+"""
+import bisect
+import contextlib
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# 히스토그램 버킷 상한(초). 로컬 연산(ms 단위)부터 Gemini 검색 호출(수십 초)까지 덮는다.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RECENT_SPAN_LIMIT = 500
+METRIC_PREFIX = "realestate"
+
+_lock = threading.Lock()
+_histograms = {}  # (구간 이름, 상태) → {"buckets": [버킷별 건수..., +Inf], "sum": 초, "count": 건수, "max": 초}
+_counters = {}    # (이벤트 이름, ((라벨, 값), ...)) → 누적값
+_recent = deque(maxlen=RECENT_SPAN_LIMIT)
+_span_ids = itertools.count(1)
+_current = contextvars.ContextVar("tracing_current_span", default=None)
+_last_export = {}  # 파일 경로 → 마지막 기록 시각(monotonic)
+
+
+def observe(name, seconds, status="ok"):
+    """구간 이름·상태별 히스토그램에 소요 시간(초)을 더한다."""
+    slot = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+    with _lock:
+        hist = _histograms.get((name, status))
+        if hist is None:
+            hist = _histograms[(name, status)] = {"buckets": [0] * (len(LATENCY_BUCKETS) + 1), "sum": 0.0, "count": 0, "max": 0.0}
+        hist["buckets"][slot] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+        hist["max"] = max(hist["max"], seconds)
+
+
+def incr(name, value=1, **labels):
+    """이벤트 카운터를 value만큼 늘린다. (예: incr("gemini.tokens", 812, model=..., kind="prompt"))"""
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """
+    구간 하나를 측정한다. with 블록 안에서 받은 dict에 속성을 추가할 수 있다.
+    attrs에 'error'가 들어 있거나 예외가 전파되면 상태는 error가 된다.
+    (Streamlit의 st.rerun()/st.stop() 같은 제어 흐름 예외는 BaseException이라 오류로 세지 않는다.)
+    """
+    parent = _current.get()
+    span_id = next(_span_ids)
+    token = _current.set((span_id, attrs))
+    started_at = time.time()
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs.setdefault("error", f"{type(e).__name__}: {str(e)[:120]}")
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _current.reset(token)
+        status = "error" if "error" in attrs else "ok"
+        observe(name, seconds, status)
+        with _lock:
+            _recent.append({
+                "id": span_id, "parent_id": parent[0] if parent else None, "name": name,
+                "started_at": started_at, "seconds": seconds, "status": status, "attrs": attrs,
+            })
+
+
+def traced(name):
+    """함수 호출 전체를 name 구간으로 측정하는 데코레이터. 함수 안에서는 current_span()으로 속성을 단다."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    """가장 안쪽 구간의 속성 dict. 측정 중인 구간이 없으면 버려지는 빈 dict."""
+    current = _current.get()
+    return current[1] if current else {}
+
+
+def traced_sleep(seconds, name="sleep"):
+    """time.sleep을 대기 구간으로 기록한다. 재시도 백오프·호출 간격이 전체 시간에서 차지하는 몫을 보여 준다."""
+    with span(name, sleep_s=round(seconds, 3)):
+        time.sleep(seconds)
+
+
+def _quantile(hist, q):
+    """버킷 안에서 선형 보간으로 분위수를 추정한다(초). 표본이 적을 때 과대 추정되지 않도록 최댓값으로 자른다."""
+    rank, seen = q * hist["count"], 0
+    for i, n in enumerate(hist["buckets"]):
+        if n and seen + n >= rank:
+            if i == len(LATENCY_BUCKETS):
+                return hist["max"]
+            lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+            return min(lower + (LATENCY_BUCKETS[i] - lower) * (rank - seen) / n, hist["max"])
+        seen += n
+    return 0.0
+
+
+def span_summary():
+    """구간·상태별 횟수·합계·평균·p50·p95·최대(ms) 행 목록. 합계가 큰 구간부터."""
+    with _lock:
+        items = [(key, dict(hist, buckets=list(hist["buckets"]))) for key, hist in _histograms.items()]
+    rows = []
+    for (name, status), hist in items:
+        count = hist["count"]
+        rows.append({
+            "구간": name, "상태": status, "횟수": count, "합계(s)": hist["sum"],
+            "평균(ms)": hist["sum"] / count * 1000 if count else 0.0,
+            "p50(ms)": _quantile(hist, 0.5) * 1000,
+            "p95(ms)": _quantile(hist, 0.95) * 1000,
+            "최대(ms)": hist["max"] * 1000,
+        })
+    return sorted(rows, key=lambda r: -r["합계(s)"])
+
+
+def counter_summary():
+    """이벤트 카운터 행 목록 (이벤트, 라벨, 값)."""
+    with _lock:
+        items = list(_counters.items())
+    return [
+        {"이벤트": name, "라벨": ", ".join(f"{k}={v}" for k, v in labels), "값": value}
+        for (name, labels), value in sorted(items)
+    ]
+
+
+def recent_spans(limit=100):
+    """최근 구간 기록(최신순). 속성은 사본이다."""
+    with _lock:
+        records = list(_recent)[-limit:]
+    return [dict(r, attrs=dict(r["attrs"])) for r in reversed(records)]
+
+
+def metrics_json(recent_limit=RECENT_SPAN_LIMIT):
+    """히스토그램(누적 버킷)·카운터·최근 구간을 담은 JSON 문자열."""
+    with _lock:
+        histograms = [
+            {"span": name, "status": status, "count": hist["count"], "sum_seconds": hist["sum"], "max_seconds": hist["max"],
+             "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], itertools.accumulate(hist["buckets"])))}
+            for (name, status), hist in sorted(_histograms.items())
+        ]
+        counters = [{"event": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(_counters.items())]
+    spans = [
+        dict(r, started_at=datetime.fromtimestamp(r["started_at"]).isoformat(timespec="milliseconds"))
+        for r in recent_spans(recent_limit)
+    ]
+    return json.dumps(
+        {"generated_at": datetime.now().isoformat(timespec="seconds"), "histograms": histograms,
+         "counters": counters, "recent_spans": spans},
+        ensure_ascii=False, indent=2, default=str,
+    )
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metrics_prometheus():
+    """Prometheus 텍스트 노출 형식. 구간 히스토그램은 {prefix}_span_seconds, 카운터는 {prefix}_events_total."""
+    with _lock:
+        histograms = sorted((key, dict(hist, buckets=list(hist["buckets"]))) for key, hist in _histograms.items())
+        counters = sorted(_counters.items())
+    metric = f"{METRIC_PREFIX}_span_seconds"
+    lines = [f"# HELP {metric} 구간별 소요 시간(초)", f"# TYPE {metric} histogram"]
+    for (name, status), hist in histograms:
+        labels = f'span="{_label(name)}",status="{status}"'
+        for bound, cumulative in zip([*map(str, LATENCY_BUCKETS), "+Inf"], itertools.accumulate(hist["buckets"])):
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum{{{labels}}} {hist['sum']:.6f}")
+        lines.append(f"{metric}_count{{{labels}}} {hist['count']}")
+    metric = f"{METRIC_PREFIX}_events_total"
+    lines += [f"# HELP {metric} 이벤트 누적값(재시도, 토큰 수 등)", f"# TYPE {metric} counter"]
+    for (name, labels), value in counters:
+        label_text = ",".join([f'event="{_label(name)}"', *(f'{k}="{_label(v)}"' for k, v in labels)])
+        lines.append(f"{metric}{{{label_text}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path, min_interval=15.0):
+    """
+    Prometheus 텍스트를 파일로 내보낸다(node_exporter textfile collector 등에서 수집).
+    min_interval초 안에 다시 부르면 건너뛴다. 임시 파일에 쓴 뒤 교체하므로 수집기가 반쯤 쓴 파일을 읽지 않는다.
+    반환: 기록했으면 True.
+    """
+    now = time.monotonic()
+    with _lock:
+        if now - _last_export.get(path, -min_interval) < min_interval:
+            return False
+        _last_export[path] = now
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(metrics_prometheus())
+    os.replace(tmp_path, path)
+    return True
+
+
+def reset():
+    """수집된 히스토그램·카운터·최근 구간을 모두 지운다. (벤치마크·테스트 격리용)"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _recent.clear()
+        _last_export.clear()